@@ -0,0 +1,270 @@
+"""
+Disponibilités des aidants et index d'intervalles par jour de la semaine.
+
+Les `disponibilites` des profils sont du texte libre ('Lundi-Vendredi
+8h-18h', 'samedi matin', 'semaine 09:00-12:00') ou des objets
+{jour, debut, fin} ; elles sont converties en intervalles de minutes
+[début, fin) fusionnés, par jour (0 = lundi).
+
+`AvailabilityIndex` range, pour chaque jour, tous les intervalles dans une
+liste triée par début, tenue à jour par insertion dichotomique. Pour un
+créneau [début, fin), seuls les intervalles commençant avant `fin` sont
+examinés, et seuls ceux commençant au plus tard à `début` peuvent le couvrir
+entièrement. Le résultat par créneau est mis en cache jusqu'à la prochaine
+modification de l'index.
+"""
+
+import bisect
+import re
+import unicodedata
+from datetime import date
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from cache import LRUCache, NamespacedCache
+
+WEEKDAYS = ['lundi', 'mardi', 'mercredi', 'jeudi', 'vendredi', 'samedi', 'dimanche']
+
+Interval = Tuple[int, int]
+DAY_MINUTES = 24 * 60
+ALL_DAYS = tuple(range(7))
+
+PERIODS = {
+    'matin': (8 * 60, 12 * 60),
+    'midi': (12 * 60, 14 * 60),
+    'apres-midi': (12 * 60, 18 * 60),
+    'apres midi': (12 * 60, 18 * 60),
+    'journee': (8 * 60, 18 * 60),
+    'soir': (18 * 60, 22 * 60),
+    'soiree': (18 * 60, 22 * 60),
+    'nuit': (22 * 60, DAY_MINUTES),
+}
+DAY_GROUPS = {
+    'semaine': range(0, 5),
+    'week-end': range(5, 7),
+    'weekend': range(5, 7),
+    'tous les jours': ALL_DAYS,
+}
+
+_DAY_NAMES = '|'.join(WEEKDAYS)
+_DAY_RANGE = re.compile(rf'\b({_DAY_NAMES})\s*(?:-|au|a)\s*({_DAY_NAMES})\b')
+_DAY = re.compile(rf'\b({_DAY_NAMES})\b')
+_TIME = r'(\d{1,2})\s*(?:[h:]\s*(\d{2})?)?'
+_TIME_RANGE = re.compile(rf'{_TIME}\s*(?:-|a)\s*{_TIME}')
+_PERIOD = re.compile(r'\b(' + '|'.join(sorted(PERIODS, key=len, reverse=True)) + r')\b')
+_GROUP = re.compile(r'\b(' + '|'.join(DAY_GROUPS) + r')\b')
+_CLAUSE_SEPARATOR = re.compile(r'[,;/]|\bet\b')
+_DATE_FR = re.compile(r'^(\d{1,2})/(\d{1,2})(?:/(\d{4}))?$')
+
+
+def normalize(value) -> str:
+    """Minuscules sans accents ni espaces superflus ('Aide à domicile' -> 'aide a domicile')."""
+    text = unicodedata.normalize('NFKD', str(value or ''))
+    return ' '.join(''.join(c for c in text if not unicodedata.combining(c)).lower().split())
+
+
+def _minutes(hours: str, minutes: Optional[str]) -> Optional[int]:
+    value = int(hours) * 60 + int(minutes or 0)
+    return value if 0 <= value <= DAY_MINUTES else None
+
+
+def parse_days(text: str) -> Set[int]:
+    """Jours cités dans un texte normalisé ; vide si aucun."""
+    days: Set[int] = set()
+    for first, last in _DAY_RANGE.findall(text):
+        start, end = WEEKDAYS.index(first), WEEKDAYS.index(last)
+        span = range(start, end + 1) if start <= end else [*range(start, 7), *range(0, end + 1)]
+        days.update(span)
+    days.update(WEEKDAYS.index(day) for day in _DAY.findall(text))
+    for group in _GROUP.findall(text):
+        days.update(DAY_GROUPS[group])
+    return days
+
+
+def parse_times(text: str) -> List[Interval]:
+    """Plages horaires d'un texte normalisé ('8h-18h', '09:00 a 12:30', 'matin') ; vide si aucune."""
+    intervals = []
+    for h1, m1, h2, m2 in _TIME_RANGE.findall(text):
+        start, end = _minutes(h1, m1), _minutes(h2, m2)
+        if start is None or end is None or start == end:
+            continue
+        if start < end:
+            intervals.append((start, end))
+        else:
+            # Plage de nuit (22h-6h) : la partie du jour même
+            intervals.append((start, DAY_MINUTES))
+    intervals.extend(PERIODS[period] for period in _PERIOD.findall(text))
+    return intervals
+
+
+def merge(intervals: Iterable[Interval]) -> List[Interval]:
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _entry_intervals(entry) -> Dict[int, List[Interval]]:
+    if isinstance(entry, dict):
+        horaires = entry.get('horaires')
+        if isinstance(horaires, dict):
+            horaires = f"{horaires.get('debut', '')}-{horaires.get('fin', '')}"
+        elif entry.get('debut') and entry.get('fin'):
+            horaires = f"{entry['debut']}-{entry['fin']}"
+        clauses = [(normalize(entry.get('jour')), normalize(horaires))]
+    else:
+        clauses = [(part, part) for part in _CLAUSE_SEPARATOR.split(normalize(entry)) if part.strip()]
+
+    by_day: Dict[int, List[Interval]] = {}
+    pending: Set[int] = set()
+    for days_text, times_text in clauses:
+        days = parse_days(days_text)
+        times = parse_times(times_text)
+        if not times:
+            # 'lundi, mardi 8h-12h' : les jours seuls prennent les horaires suivants
+            pending |= days
+            continue
+        for day in (days | pending) or ALL_DAYS:
+            by_day.setdefault(day, []).extend(times)
+        pending = set()
+    for day in pending:
+        by_day.setdefault(day, []).append((0, DAY_MINUTES))
+    if not by_day and clauses:
+        # Texte sans jour ni horaire reconnu : disponible sans précision
+        by_day = {day: [(0, DAY_MINUTES)] for day in ALL_DAYS}
+    return by_day
+
+
+def parse_availability(data: dict) -> Dict[int, List[Interval]]:
+    """Intervalles fusionnés par jour (0 = lundi) d'un profil aidant ; vide si rien de déclaré."""
+    entries = list(data.get('disponibilites') or [])
+    if isinstance(data.get('horaires'), dict):
+        # Profils de démonstration : jour + horaires {debut, fin} au premier niveau
+        entries.append({'jour': weekday_of(data.get('jour')), 'horaires': data['horaires']})
+    by_day: Dict[int, List[Interval]] = {}
+    for entry in entries:
+        for day, intervals in _entry_intervals(entry).items():
+            by_day.setdefault(day, []).extend(intervals)
+    return {day: merge(intervals) for day, intervals in by_day.items()}
+
+
+def weekday_of(jour) -> Optional[str]:
+    """Nom du jour pour 'lundi', '2025-03-17', '17/03' ou '17/03/2025' ; None sinon."""
+    text = normalize(jour)
+    if not text:
+        return None
+    days = parse_days(text)
+    if days:
+        return WEEKDAYS[min(days)]
+    try:
+        match = _DATE_FR.match(text)
+        if match:
+            day, month, year = match.groups()
+            when = date(int(year or date.today().year), int(month), int(day))
+        else:
+            when = date.fromisoformat(text[:10])
+    except ValueError:
+        return None
+    return WEEKDAYS[when.weekday()]
+
+
+def parse_slot(jour, horaires) -> Optional[Tuple[Tuple[int, ...], int, int]]:
+    """Créneau demandé (jours, début, fin) ; None si ni jour ni horaire exploitable."""
+    day = weekday_of(jour)
+    times = merge(parse_times(normalize(horaires)))
+    if day is None and not times:
+        return None
+    days = (WEEKDAYS.index(day),) if day else ALL_DAYS
+    start, end = (times[0][0], times[-1][1]) if times else (0, DAY_MINUTES)
+    return days, start, end
+
+
+class _DayIndex:
+    """Intervalles d'un jour, en une liste (début, fin, aidant) triée par début."""
+
+    def __init__(self):
+        self.rows: List[Tuple[int, int, str]] = []
+
+    def add(self, aidant_id: str, intervals: List[Interval]):
+        for start, end in intervals:
+            bisect.insort(self.rows, (start, end, aidant_id))
+
+    def remove(self, aidant_id: str, intervals: List[Interval]):
+        for start, end in intervals:
+            row = (start, end, aidant_id)
+            index = bisect.bisect_left(self.rows, row)
+            if index < len(self.rows) and self.rows[index] == row:
+                del self.rows[index]
+
+    def match(self, start: int, end: int) -> Tuple[Set[str], Set[str]]:
+        """(aidants couvrant tout [start, end), aidants le recoupant)."""
+        rows = self.rows
+        # Seuls les intervalles commençant avant `end` peuvent recouper le
+        # créneau, et seuls ceux commençant au plus tard à `start` le couvrir.
+        limit = bisect.bisect_left(rows, (end,))
+        covering = bisect.bisect_right(rows, (start, DAY_MINUTES + 1))
+        full = {aidant_id for _, row_end, aidant_id in islice(rows, covering) if row_end >= end}
+        overlapping = {aidant_id for _, row_end, aidant_id in islice(rows, limit) if row_end > start}
+        return full, overlapping
+
+
+class SlotMatch:
+    """Aidants qui couvrent tout le créneau, et ceux qui le couvrent en partie."""
+
+    __slots__ = ('full', 'partial')
+
+    def __init__(self, full: Set[str], partial: Set[str]):
+        self.full = full
+        self.partial = partial
+
+
+def overlap_minutes(intervals: List[Interval], start: int, end: int) -> int:
+    return sum(max(0, min(end, row_end) - max(start, row_start)) for row_start, row_end in intervals)
+
+
+class AvailabilityIndex:
+    def __init__(self, cache_entries: int = 128):
+        self._days = [_DayIndex() for _ in ALL_DAYS]
+        self._intervals: Dict[str, Dict[int, List[Interval]]] = {}
+        self.slots = NamespacedCache(LRUCache(cache_entries, name="availability"), "availability", ttl=3600)
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def set(self, aidant_id: str, by_day: Dict[int, List[Interval]]):
+        if self._intervals.get(aidant_id, {}) == by_day:
+            # Jours et horaires inchangés : les créneaux en cache restent valables
+            return
+        for day, intervals in self._intervals.pop(aidant_id, {}).items():
+            self._days[day].remove(aidant_id, intervals)
+        for day, intervals in by_day.items():
+            self._days[day].add(aidant_id, intervals)
+        if by_day:
+            self._intervals[aidant_id] = by_day
+        self.slots.invalidate()
+
+    def remove(self, aidant_id: str):
+        self.set(aidant_id, {})
+
+    def match(self, days: Tuple[int, ...], start: int, end: int) -> SlotMatch:
+        """Aidants disponibles sur le créneau ; sur plusieurs jours, un seul jour suffit."""
+        key = f"{','.join(map(str, days))}:{start}:{end}"
+        match = self.slots.get(key)
+        if match is None:
+            full: Set[str] = set()
+            overlapping: Set[str] = set()
+            for day in days:
+                day_full, day_overlapping = self._days[day].match(start, end)
+                full |= day_full
+                overlapping |= day_overlapping
+            match = SlotMatch(full, overlapping - full)
+            self.slots.set(key, match)
+        return match
+
+    def overlap(self, aidant_id: str, days: Tuple[int, ...], start: int, end: int) -> int:
+        """Minutes de recouvrement du meilleur jour, pour un aidant."""
+        by_day = self._intervals.get(aidant_id, {})
+        return max((overlap_minutes(by_day.get(day, []), start, end) for day in days), default=0)
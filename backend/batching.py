@@ -0,0 +1,61 @@
+"""
+Écritures Firestore groupées.
+
+Firestore accepte jusqu'à 500 opérations par WriteBatch. Les documents sont
+découpés en lots de cette taille et les lots sont validés en parallèle sur
+le pool Firestore, ce qui remplace N allers-retours par N / 500.
+"""
+
+import asyncio
+import logging
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from firestore_executor import FirestoreExecutor
+
+logger = logging.getLogger(__name__)
+
+FIRESTORE_BATCH_LIMIT = 500
+MAX_CONCURRENT_COMMITS = 8
+
+
+def chunked(items: Sequence, size: int) -> Iterable[Sequence]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def commit_in_batches(
+    db,
+    executor: FirestoreExecutor,
+    collection: str,
+    documents: Sequence[Tuple[str, dict]],
+    batch_size: int = FIRESTORE_BATCH_LIMIT,
+) -> List[Optional[str]]:
+    """
+    Écrit les couples (id, données) dans `collection` par WriteBatch.
+
+    Retourne, pour chaque document et dans l'ordre d'entrée, `None` si
+    l'écriture a réussi ou le message d'erreur du lot qui l'a contenu.
+    """
+    batch_size = min(batch_size, FIRESTORE_BATCH_LIMIT)
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_COMMITS)
+    collection_ref = db.collection(collection)
+
+    async def _commit(chunk: Sequence[Tuple[str, dict]]) -> Optional[str]:
+        batch = db.batch()
+        for doc_id, data in chunk:
+            batch.set(collection_ref.document(doc_id), data)
+        async with semaphore:
+            try:
+                await executor.run(batch.commit, collection=collection, operation='batch_commit')
+                return None
+            except Exception as e:
+                logger.error(f"❌ Échec d'un lot de {len(chunk)} écritures dans {collection}: {e}")
+                return str(e)
+
+    chunks = list(chunked(documents, batch_size))
+    outcomes = await asyncio.gather(*(_commit(chunk) for chunk in chunks))
+
+    errors: List[Optional[str]] = []
+    for chunk, error in zip(chunks, outcomes):
+        errors.extend([error] * len(chunk))
+    return errors
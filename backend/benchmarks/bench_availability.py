@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark : recherche d'aidants avec créneau (jour + horaires).
+
+Charge N aidants synthétiques dans `AidantSearchIndex`, puis mesure une
+recherche par créneau comme à chaque frappe dans l'application : premier
+appel après une modification de l'index (reconstruction de l'index
+d'intervalles du jour), puis appels suivants (créneau en cache).
+
+Usage : python benchmarks/bench_availability.py [--aidants 50000] [--queries 2000]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from search_index import AidantSearchIndex  # noqa: E402
+
+SECTEURS = ['Aide à domicile', "Garde d'enfants", 'Ménage', 'Courses', 'Jardinage']
+DISPONIBILITES = [
+    'Lundi-Vendredi 8h-18h', 'samedi matin', 'Mercredi 14h-18h', 'semaine soir',
+    'week-end', 'mardi, jeudi 9h-12h', 'Lundi 07:30-11:00; vendredi après-midi',
+]
+CRENEAUX = [('lundi', 'matin'), ('mercredi', '15h-17h'), ('samedi', None), (None, 'soir'), ('vendredi', '13h-14h')]
+
+
+def build_index(count: int, seed: int) -> AidantSearchIndex:
+    rng = random.Random(seed)
+    index = AidantSearchIndex(db=None, executor=None)
+    for i in range(count):
+        index.apply(f'aidant-{i}', {
+            'isAidant': True,
+            'isVerified': True,
+            'secteur': rng.choice(SECTEURS),
+            'genre': rng.choice(['femme', 'homme']),
+            'averageRating': round(rng.uniform(0, 5), 1),
+            'disponibilites': rng.sample(DISPONIBILITES, rng.randint(0, 2)),
+        })
+    return index
+
+
+def measure(fn, rounds: int):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.mean(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--aidants", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = build_index(args.aidants, args.seed)
+    print(f"📊 Recherche par créneau sur {args.aidants} aidants")
+    print(f"   Chargement de l'index : {time.perf_counter() - started:8.2f} s")
+
+    rng = random.Random(args.seed)
+
+    def query():
+        jour, horaires = rng.choice(CRENEAUX)
+        index.search(secteur=rng.choice(SECTEURS), jour=jour, horaires=horaires, limit=20)
+
+    def query_after_change():
+        # Une mise à jour invalide le cache des créneaux et l'index du jour
+        index.apply('aidant-0', {'isAidant': True, 'isVerified': True, 'secteur': SECTEURS[0],
+                                 'disponibilites': [rng.choice(DISPONIBILITES)]})
+        query()
+
+    cold_mean, cold_p99 = measure(query_after_change, max(args.queries // 20, 10))
+    warm_mean, warm_p99 = measure(query, args.queries)
+    print(f"   Après modification    : {cold_mean:8.3f} ms en moyenne, p99 {cold_p99:8.3f} ms")
+    print(f"   Créneau en cache      : {warm_mean:8.3f} ms en moyenne, p99 {warm_p99:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark : diffusion des messages d'une conversation à N clients connectés.
+
+Abonne N clients au sujet 'conversation:<id>' du hub (`realtime`), sur le
+client Firestore en mémoire, écrit M messages puis mesure le temps jusqu'à
+la réception par tous les clients, les lectures Firestore facturées (une
+par message, quel que soit N) et les pertes des clients trop lents.
+
+Usage : python benchmarks/bench_fanout.py [--clients 5000] [--messages 200] [--slow 0.05]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from firestore_executor import FirestoreExecutor  # noqa: E402
+from memory_store import InMemoryFirestore  # noqa: E402
+from realtime import create_hub  # noqa: E402
+
+
+async def run(clients: int, messages: int, slow_ratio: float, queue_size: int, seed: int):
+    rng = random.Random(seed)
+    db = InMemoryFirestore()
+    executor = FirestoreExecutor()
+    hub = create_hub(db, executor, queue_size=queue_size)
+    collection = db.collection('conversations/bench/messages')
+
+    started = time.perf_counter()
+    subscribers = await asyncio.gather(*(hub.subscribe('conversation:bench') for _ in range(clients)))
+    print(f"📊 Diffusion de {messages} messages à {clients} clients")
+    print(f"   Abonnement            : {time.perf_counter() - started:8.3f} s")
+
+    received = [0] * clients
+    done = asyncio.Event()
+    remaining = clients
+
+    async def consume(index, subscriber, slow):
+        nonlocal remaining
+        while True:
+            try:
+                batch = await subscriber.get_batch(timeout=2)
+            except asyncio.TimeoutError:
+                break
+            received[index] += len(batch)
+            if slow:
+                await asyncio.sleep(0.01)
+            if received[index] + subscriber.dropped >= messages:
+                break
+        remaining -= 1
+        if remaining == 0:
+            done.set()
+
+    consumers = [
+        asyncio.create_task(consume(index, subscriber, rng.random() < slow_ratio))
+        for index, subscriber in enumerate(subscribers)
+    ]
+    reads = db.reads
+    started = time.perf_counter()
+    for i in range(messages):
+        await executor.run(collection.document(f'm{i:06}').set, {
+            'texte': f'message {i}', 'expediteurId': 'bench', 'createdAt': datetime.now(timezone.utc)
+        })
+    written = time.perf_counter() - started
+    await done.wait()
+    elapsed = time.perf_counter() - started
+
+    stats = hub.stats()
+    print(f"   Écriture              : {written:8.3f} s")
+    print(f"   Réception par tous    : {elapsed:8.3f} s ({stats['delivered'] / elapsed:,.0f} livraisons/s)")
+    print(f"   Par message           : {elapsed / messages * 1000:8.2f} ms pour les {clients} clients")
+    print(f"   Lectures Firestore    : {db.reads - reads:8d} (sources amont : {stats['upstreams_started']})")
+    print(f"   Éléments écartés      : {stats['dropped']:8d} (clients lents, file de {queue_size})")
+
+    await asyncio.gather(*consumers)
+    await asyncio.gather(*(hub.unsubscribe(subscriber) for subscriber in subscribers))
+    executor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--slow", type=float, default=0.05, help="part des clients lents")
+    parser.add_argument("--queue-size", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    asyncio.run(run(args.clients, args.messages, args.slow, args.queue_size, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark : recherche des aidants les plus proches dans un rayon.
+
+Place N aidants aléatoirement sur La Réunion et compare la grille
+(`GeoGridIndex`, anneaux de cellules autour du client) au parcours de tous
+les aidants avec calcul de distance, pour les 20 plus proches dans 10 km.
+
+Usage : python benchmarks/bench_geo_search.py [--aidants 100000] [--queries 1000]
+"""
+
+import argparse
+import heapq
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from geo_index import GeoGridIndex, haversine_km  # noqa: E402
+
+# Emprise approximative de l'île
+LAT_RANGE = (-21.39, -20.87)
+LON_RANGE = (55.22, 55.84)
+
+
+def linear_scan(points, latitude, longitude, radius_km, limit):
+    distances = ((haversine_km(latitude, longitude, lat, lon), item_id) for item_id, (lat, lon) in points.items())
+    return heapq.nsmallest(limit, (pair for pair in distances if pair[0] <= radius_km))
+
+
+def measure(fn, queries):
+    samples = []
+    for query in queries:
+        started = time.perf_counter()
+        fn(*query)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.mean(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--aidants", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--radius", type=float, default=10.0)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--cell-km", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    points = {f'aidant-{i}': (rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)) for i in range(args.aidants)}
+    index = GeoGridIndex(cell_km=args.cell_km)
+    started = time.perf_counter()
+    for item_id, point in points.items():
+        index.set(item_id, point)
+    loaded = time.perf_counter() - started
+
+    queries = [
+        (rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE), args.radius, args.limit)
+        for _ in range(args.queries)
+    ]
+    for query in queries[:20]:
+        assert index.nearest(*query) == linear_scan(points, *query)
+
+    grid_mean, grid_p99 = measure(index.nearest, queries)
+    scan_mean, scan_p99 = measure(lambda *q: linear_scan(points, *q), queries[:max(args.queries // 50, 5)])
+
+    print(f"📊 {args.limit} plus proches dans {args.radius} km parmi {args.aidants} aidants")
+    print(f"   Chargement de la grille ({args.cell_km} km) : {loaded:8.2f} s")
+    print(f"   Grille          : {grid_mean:8.3f} ms en moyenne, p99 {grid_p99:8.3f} ms")
+    print(f"   Parcours total  : {scan_mean:8.3f} ms en moyenne, p99 {scan_p99:8.3f} ms")
+    print(f"   Gain            : x{scan_mean / grid_mean:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark : coût de sérialisation de GET /api/status pour 1000 documents.
+
+Compare l'ancien chemin (modèles StatusCheck, revalidation par
+`response_model`, `jsonable_encoder` puis `json.dumps`) au chemin actuel
+(projection des dicts Firestore + encodeur rapide).
+
+Usage : python benchmarks/bench_serialization.py [--items 1000] [--rounds 200]
+"""
+
+import argparse
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+import fastjson  # noqa: E402
+from server import StatusCheck, status_document_to_json  # noqa: E402
+
+
+def make_documents(count: int) -> List[dict]:
+    start = datetime(2025, 1, 1)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "client_name": f"client-{i % 50}",
+            "timestamp": (start + timedelta(seconds=i)).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_path(documents: List[dict], adapter: TypeAdapter) -> bytes:
+    status_checks = []
+    for data in documents:
+        data = dict(data)
+        if isinstance(data.get('timestamp'), str):
+            data['timestamp'] = datetime.fromisoformat(data['timestamp'])
+        status_checks.append(StatusCheck(**data))
+    # Ce que fait FastAPI avec response_model=List[StatusCheck]
+    validated = adapter.validate_python(status_checks)
+    content = jsonable_encoder(adapter.dump_python(validated, mode="json"))
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(documents: List[dict]) -> bytes:
+    return fastjson.dumps([status_document_to_json(data) for data in documents])
+
+
+def measure(fn, rounds: int) -> float:
+    fn()  # échauffement
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - started) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    documents = make_documents(args.items)
+    adapter = TypeAdapter(List[StatusCheck])
+
+    assert json.loads(legacy_path(documents, adapter)) == json.loads(fast_path(documents))
+
+    legacy = measure(lambda: legacy_path(documents, adapter), args.rounds)
+    fast = measure(lambda: fast_path(documents), args.rounds)
+    per_thousand = 1000 / args.items
+
+    print(f"📊 Sérialisation de {args.items} status checks ({args.rounds} tours)")
+    print(f"   Encodeur rapide : {'orjson' if fastjson.ORJSON_AVAILABLE else 'json (stdlib)'}")
+    print(f"   Avant  : {legacy * 1000 * per_thousand:8.3f} ms / 1000 éléments")
+    print(f"   Après  : {fast * 1000 * per_thousand:8.3f} ms / 1000 éléments")
+    print(f"   Gain   : x{legacy / fast:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark : démarrage à froid du backend et profil des imports.
+
+Lance N processus Python neufs qui importent `server`, démarrent le
+lifespan et appellent `/api/health/live`, et mesure chaque étape ainsi que
+le temps total depuis le lancement du processus (interpréteur compris).
+La connexion à la base se fait en tâche de fond : elle ne compte pas dans
+le délai avant la première réponse de liveness.
+
+Avec --importtime, affiche aussi le profil `python -X importtime` de
+`import server` : modules les plus coûteux (cumulé) et coût propre par
+paquet de premier niveau.
+
+Le code de sortie est 1 si la médiane dépasse le budget (--budget).
+
+Usage : python benchmarks/bench_startup.py [--runs 5] [--budget 1.5] [--storage firestore] [--importtime]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+CHILD = """
+import json, time
+started = time.perf_counter()
+import server
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(server.app) as client:
+    lifespan = time.perf_counter()
+    response = client.get('/api/health/live')
+    live = time.perf_counter()
+    assert response.status_code == 200, response.status_code
+    print(json.dumps({
+        'import_s': imported - started,
+        'lifespan_s': lifespan - imported,
+        'live_s': live - lifespan,
+        'to_live_s': live - started,
+    }))
+"""
+
+
+def child_env(storage: str) -> dict:
+    env = dict(os.environ, STORAGE_BACKEND=storage, PYTHONPATH=str(BACKEND_DIR))
+    env.pop('PYTHONPROFILEIMPORTTIME', None)
+    return env
+
+
+def run_once(storage: str) -> dict:
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD],
+        cwd=BACKEND_DIR, env=child_env(storage), capture_output=True, text=True, check=True
+    )
+    total = time.perf_counter() - started
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    # Le processus entier : interpréteur, imports, lifespan, première réponse, arrêt
+    timings['process_s'] = total
+    return timings
+
+
+def import_profile(storage: str, top: int):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import server'],
+        cwd=BACKEND_DIR, env=child_env(storage), capture_output=True, text=True, check=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(self_us), int(cumulative_us), len(name) - len(name.lstrip())))
+    total_us = sum(self_us for _, self_us, _, _ in modules)
+
+    print(f"\n📦 Profil des imports de `server` ({len(modules)} modules, {total_us / 1000:.1f} ms)")
+    print("   Modules les plus coûteux (cumulé) :")
+    for name, _, cumulative_us, depth in sorted(modules, key=lambda m: -m[2])[:top]:
+        print(f"   {cumulative_us / 1000:9.1f} ms  {'  ' * ((depth - 1) // 2)}{name}")
+
+    packages = defaultdict(int)
+    for name, self_us, _, _ in modules:
+        packages[name.split('.')[0]] += self_us
+    print("   Coût propre par paquet :")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"   {self_us / 1000:9.1f} ms  {package} ({self_us / total_us:.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=1.5, help="budget (s) pour la médiane du processus jusqu'à la liveness")
+    parser.add_argument("--storage", default="firestore", choices=("firestore", "memory"))
+    parser.add_argument("--importtime", action="store_true", help="affiche le profil des imports")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [run_once(args.storage) for _ in range(args.runs)]
+
+    def median(key):
+        return statistics.median(run[key] for run in runs)
+
+    print(f"📊 Démarrage à froid ({args.runs} processus, STORAGE_BACKEND={args.storage})")
+    print(f"   Import de server      : {median('import_s') * 1000:8.1f} ms")
+    print(f"   Démarrage (lifespan)  : {median('lifespan_s') * 1000:8.1f} ms")
+    print(f"   /api/health/live      : {median('live_s') * 1000:8.1f} ms")
+    print(f"   Jusqu'à la liveness   : {median('to_live_s') * 1000:8.1f} ms (depuis le début de l'import)")
+    print(f"   Processus complet     : {median('process_s') * 1000:8.1f} ms (max {max(run['process_s'] for run in runs) * 1000:.1f} ms)")
+
+    if args.importtime:
+        import_profile(args.storage, args.top)
+
+    within = median('process_s') <= args.budget
+    print(f"\n{'✅' if within else '❌'} Budget {args.budget * 1000:.0f} ms : médiane {median('process_s') * 1000:.1f} ms")
+    sys.exit(0 if within else 1)
+
+
+if __name__ == "__main__":
+    main()
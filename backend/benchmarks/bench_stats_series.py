@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark : séries mensuelles de revenus sur un historique de transactions.
+
+Compare le filtrage des dicts document par document, mois par mois (comme
+statisticsService.js), au chemin en colonnes de `stats_columnar` :
+chargement dans des tableaux typés puis calcul vectorisé.
+
+Usage : python benchmarks/bench_stats_series.py [--transactions 1000000] [--months 12]
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import stats_columnar  # noqa: E402
+from statistics_service import (  # noqa: E402
+    APP_COMMISSION_RATE, MONTHS, _shift_month, r0, r2, to_datetime, to_number
+)
+
+STATUSES = ['completed', 'succeeded', 'pending', 'failed', 'refunded']
+TYPES = ['final', 'final_payment', 'acompte', 'deposit']
+
+
+def make_transactions(count: int, months: int, seed: int = 42) -> List[dict]:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    span = months * 31 * 86400
+    documents = []
+    for _ in range(count):
+        amount = round(rng.uniform(10, 300), 2)
+        data = {
+            'amount': amount,
+            'status': rng.choice(STATUSES),
+            'type': rng.choice(TYPES),
+            'createdAt': now - timedelta(seconds=rng.randrange(span)),
+        }
+        if rng.random() < 0.5:
+            data['commission'] = round(amount * 0.35, 2)
+        documents.append(data)
+    return documents
+
+
+def dict_path(documents: List[dict], months: int) -> List[dict]:
+    """Chemin historique : filtres puis une passe complète par mois."""
+    tx_final = [
+        t for t in documents
+        if str(t.get('status') or '').lower() in ('completed', 'succeeded')
+        and str(t.get('type') or '').lower() in ('final', 'final_payment')
+    ]
+    today = datetime.now().astimezone()
+    series = []
+    for offset in range(months - 1, -1, -1):
+        year, month = _shift_month(today.year, today.month, -offset)
+        count, revenus, commission = 0, 0.0, 0.0
+        for t in tx_final:
+            when = to_datetime(t.get('completedAt') or t.get('createdAt'))
+            if when and when.year == year and when.month == month:
+                amount = to_number(t.get('amount', t.get('montant')))
+                count += 1
+                revenus += amount
+                value = t.get('commission')
+                commission += to_number(value) if value is not None else amount * APP_COMMISSION_RATE
+        series.append({
+            'mois': f"{MONTHS[month - 1]} {year}",
+            'transactions': count,
+            'revenus': r0(revenus),
+            'commission': r2(commission),
+            'partAidants': r2(revenus - commission),
+        })
+    return series
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=1_000_000)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--skip-dict", action="store_true", help="Ne pas mesurer le chemin historique")
+    args = parser.parse_args()
+
+    print(f"📊 Séries de revenus sur {args.transactions} transactions ({args.months} mois)")
+    print(f"   Moteur colonnes : {'numpy' if stats_columnar.NUMPY_AVAILABLE else 'python'}")
+    documents, generated = timed(lambda: make_transactions(args.transactions, args.months))
+    print(f"   Génération      : {generated:8.2f} s")
+
+    columns, loaded = timed(lambda: stats_columnar.TransactionColumns.from_documents(documents))
+    columnar, computed = timed(lambda: stats_columnar.revenue_series(columns, args.months))
+    print(f"   Colonnes        : {loaded:8.2f} s chargement + {computed * 1000:8.1f} ms calcul")
+    # Une fois les colonnes chargées, un autre découpage ne coûte que le calcul
+    _, recomputed = timed(lambda: stats_columnar.revenue_series(columns, args.months * 2))
+    print(f"   Recalcul x2 mois: {recomputed * 1000:8.1f} ms")
+
+    if not args.skip_dict:
+        legacy, elapsed = timed(lambda: dict_path(documents, args.months))
+        print(f"   Dicts par mois  : {elapsed:8.2f} s")
+        print(f"   Gain            : x{elapsed / (loaded + computed):.1f} (x{elapsed / computed:.0f} hors chargement)")
+        if legacy != columnar:
+            # Seuls des écarts d'arrondi flottant sont attendus (ordre de sommation)
+            for old, new in zip(legacy, columnar):
+                if old != new:
+                    print(f"   ⚠️ {old} != {new}")
+
+
+if __name__ == "__main__":
+    main()
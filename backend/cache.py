@@ -0,0 +1,201 @@
+"""
+Cache de lecture avec TTL et éviction LRU.
+
+`CacheBackend` reprend le sous-ensemble de commandes Redis utilisé par
+l'application (`get`, `set` avec expiration, `delete`, `incr`) : un
+serveur compatible Redis peut donc remplacer `LRUCache`, l'implémentation
+en mémoire du processus. `NamespacedCache` ajoute un espace de noms et une
+invalidation en O(1) par compteur de génération.
+
+Avec une table `GenerationCounters` partagée (plusieurs workers), les
+générations sont lues dans cette table : une invalidation faite par un
+worker s'applique aux caches de tous les autres.
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+from generations import GenerationCounters
+from metrics import REGISTRY
+
+CACHE_REQUESTS = REGISTRY.counter(
+    "cache_requests_total", "Lectures de cache", ("cache", "result")
+)
+CACHE_EVICTIONS = REGISTRY.counter(
+    "cache_evictions_total", "Entrées évincées du cache (LRU)", ("cache",)
+)
+CACHE_INVALIDATIONS = REGISTRY.counter(
+    "cache_invalidations_total", "Invalidations de cache", ("cache",)
+)
+
+
+class CacheBackend(ABC):
+    """Interface minimale d'un stockage clé/valeur avec expiration."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        ...
+
+
+class LRUCache(CacheBackend):
+    """
+    Cache en mémoire du processus, borné en nombre d'entrées.
+
+    Avec `generations`, chaque entrée garde la génération de sa clé au
+    moment de la lecture source ; `invalidate(key)` incrémente celle-ci,
+    ce qui périme l'entrée dans tous les processus qui partagent la table.
+    """
+
+    def __init__(self, max_entries: int = 256, name: str = "default",
+                 generations: Optional[GenerationCounters] = None):
+        self.max_entries = max_entries
+        self.name = name
+        self.generations = generations
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def generation(self, key: str) -> Optional[int]:
+        """Génération courante de `key`, à lire avant de charger la valeur."""
+        if self.generations is None:
+            return None
+        return self.generations.get(self.name, key)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at, generation = entry
+            if ((expires_at is not None and expires_at <= time.monotonic())
+                    or (generation is not None and generation != self.generation(key))):
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, generation: Optional[int] = None):
+        """`generation` : celle lue avant le chargement (par défaut, la courante)."""
+        expires_at = time.monotonic() + ttl if ttl else None
+        if generation is None:
+            generation = self.generation(key)
+        with self._lock:
+            self._data[key] = (value, expires_at, generation)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                CACHE_EVICTIONS.inc(cache=self.name)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate(self, key: str):
+        """Supprime `key` ici et, avec une table partagée, dans les autres processus."""
+        if self.generations is not None:
+            self.generations.bump(self.name, key)
+        self.delete(key)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value, expires_at, _ = self._data.get(key, (0, None, None))
+            value = int(value) + 1
+            self._data[key] = (value, expires_at, None)
+            self._data.move_to_end(key)
+            return value
+
+    def __len__(self):
+        return len(self._data)
+
+
+class NamespacedCache:
+    """
+    Vue d'un backend sous un préfixe, invalidable en bloc.
+
+    Les clés réelles incluent la génération courante : `invalidate()`
+    l'incrémente, ce qui rend toutes les entrées précédentes inaccessibles
+    (elles sortent ensuite par TTL ou LRU).
+    """
+
+    def __init__(self, backend: CacheBackend, namespace: str, ttl: float,
+                 generations: Optional[GenerationCounters] = None):
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+        self.generations = generations
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _generation(self) -> int:
+        if self.generations is not None:
+            return self.generations.get(self.namespace)
+        return int(self.backend.get(f"{self.namespace}:gen") or 0)
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{self._generation()}:{key}"
+
+    def _lookup(self, full_key: str) -> Optional[Any]:
+        value = self.backend.get(full_key)
+        result = "miss" if value is None else "hit"
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        CACHE_REQUESTS.inc(cache=self.namespace, result=result)
+        return value
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        return self._lookup(self._key(key))
+
+    def set(self, key: str, value: Any):
+        if self.enabled:
+            self.backend.set(self._key(key), value, self.ttl)
+
+    def invalidate(self):
+        if self.generations is not None:
+            self.generations.bump(self.namespace)
+        else:
+            self.backend.incr(f"{self.namespace}:gen")
+        CACHE_INVALIDATIONS.inc(cache=self.namespace)
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Lecture traversante : `loader` n'est appelé qu'en cas d'absence."""
+        if not self.enabled:
+            return await loader()
+        # Clé figée avant le chargement : une invalidation concurrente
+        # ne doit pas publier une valeur lue avant elle.
+        full_key = self._key(key)
+        value = self._lookup(full_key)
+        if value is None:
+            value = await loader()
+            self.backend.set(full_key, value, self.ttl)
+        return value
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "ttl_s": self.ttl,
+        }
@@ -0,0 +1,254 @@
+"""
+Écriture groupée des messages de chat (WebSocket).
+
+Avant : un message = une écriture du message puis une mise à jour séparée
+de `lastMessage` sur la conversation, soit deux allers-retours et deux
+écritures. `ChatWriter` accumule les messages d'une conversation pendant
+une courte fenêtre (`window`, quelques dizaines de ms) et les valide en un
+seul WriteBatch avec la mise à jour de la conversation.
+
+Sous une rafale, la conversation n'est mise à jour qu'une fois par
+`metadata_interval` : les lots intermédiaires n'écrivent que les messages,
+et une dernière mise à jour garantit que `lastMessage` finit sur le
+message le plus récent. Chaque envoi reçoit un futur résolu au commit de
+son lot, ce qui permet d'acquitter les clients par lots.
+
+Un lot en échec n'est pas rejoué : ses envois reçoivent l'erreur, et la
+conversation reprend le dernier message effectivement écrit. Une mise à
+jour de conversation en échec est retentée après un délai croissant, puis
+abandonnée (MAX_METADATA_ATTEMPTS).
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from batching import FIRESTORE_BATCH_LIMIT
+from conversations import CONVERSATIONS_COLLECTION, MESSAGES_COLLECTION, messages_path
+from firestore_executor import FirestoreExecutor
+
+logger = logging.getLogger(__name__)
+
+# Place réservée à la mise à jour de la conversation dans un WriteBatch
+MAX_MESSAGES_PER_BATCH = FIRESTORE_BATCH_LIMIT - 1
+# Mise à jour de la conversation en échec : nouvelles tentatives espacées
+# (metadata_interval, puis le double…), abandonnée au-delà
+MAX_METADATA_ATTEMPTS = 3
+
+
+def message_metadata(data: dict) -> dict:
+    """Mise à jour de la conversation pointant sur ce message."""
+    return {'lastMessage': {'texte': data['texte'], 'createdAt': data['createdAt']}, 'updatedAt': data['createdAt']}
+
+
+class _Pending:
+    """Messages d'une conversation en attente du prochain commit."""
+
+    def __init__(self):
+        self.messages: List[Tuple[str, dict, asyncio.Future]] = []
+        self.flush: Optional[asyncio.TimerHandle] = None
+        self.metadata: Optional[dict] = None
+        self.metadata_written_at = 0.0
+        self.metadata_failures = 0
+        self.metadata_retry_at = 0.0
+        # Mise à jour pointant sur le dernier message effectivement écrit
+        self.last_written: Optional[dict] = None
+        self.last_created: Optional[datetime] = None
+        self.lock = asyncio.Lock()
+
+
+class ChatWriter:
+    def __init__(
+        self,
+        db,
+        executor: FirestoreExecutor,
+        window: float = 0.02,
+        metadata_interval: float = 1.0,
+    ):
+        self.db = db
+        self.executor = executor
+        self.window = window
+        self.metadata_interval = metadata_interval
+        self._pending: Dict[str, _Pending] = {}
+        self._tasks: set = set()
+        self._closed = False
+
+        self.messages = 0
+        self.commits = 0
+        self.failed = 0
+        self.conversation_updates = 0
+        self.coalesced_updates = 0
+        self.dropped_updates = 0
+        self.last_commit_ms = 0.0
+
+    def submit(self, conversation_id: str, texte: str, expediteur_id: Optional[str]) -> asyncio.Future:
+        """
+        Met un message en attente d'écriture. Le futur renvoie le message
+        enregistré ({id, texte, expediteurId, timestamp}) après le commit.
+        """
+        if self._closed:
+            raise RuntimeError("Écriture des messages arrêtée")
+        pending = self._pending.get(conversation_id)
+        if pending is None:
+            pending = self._pending[conversation_id] = _Pending()
+
+        # Horodatage strictement croissant : l'ordre d'envoi est celui de l'historique
+        created = datetime.now(timezone.utc)
+        if pending.last_created is not None and created <= pending.last_created:
+            created = pending.last_created + timedelta(microseconds=1)
+        pending.last_created = created
+
+        message_id = uuid.uuid4().hex
+        data = {'texte': texte, 'expediteurId': expediteur_id, 'createdAt': created}
+        future = asyncio.get_running_loop().create_future()
+        pending.messages.append((message_id, data, future))
+        pending.metadata = message_metadata(data)
+        self.messages += 1
+
+        loop = asyncio.get_running_loop()
+        if len(pending.messages) >= MAX_MESSAGES_PER_BATCH:
+            self._schedule(conversation_id, pending, 0)
+        elif pending.flush is None or pending.flush.when() > loop.time() + self.window:
+            # Pas d'écriture prévue, ou seulement la mise à jour différée de la conversation
+            self._schedule(conversation_id, pending, self.window)
+        return future
+
+    def _schedule(self, conversation_id: str, pending: _Pending, delay: float):
+        if pending.flush is not None:
+            pending.flush.cancel()
+        pending.flush = asyncio.get_running_loop().call_later(delay, self._start_flush, conversation_id, pending)
+
+    def _start_flush(self, conversation_id: str, pending: _Pending):
+        pending.flush = None
+        task = asyncio.create_task(self._flush(conversation_id, pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, conversation_id: str, pending: _Pending):
+        # Un commit à la fois par conversation : l'ordre des lots est conservé
+        async with pending.lock:
+            messages, pending.messages = pending.messages[:MAX_MESSAGES_PER_BATCH], pending.messages[MAX_MESSAGES_PER_BATCH:]
+            now = time.monotonic()
+            metadata = None
+            if pending.metadata is not None:
+                due = (now - pending.metadata_written_at >= self.metadata_interval
+                       and now >= pending.metadata_retry_at)
+                if due or self._closed:
+                    metadata, pending.metadata = pending.metadata, None
+                elif messages:
+                    self.coalesced_updates += 1
+            if not messages and metadata is None:
+                self._reschedule(conversation_id, pending)
+                return
+
+            messages_ref = self.db.collection(messages_path(conversation_id))
+            batch = self.db.batch()
+            for message_id, data, _ in messages:
+                batch.create(messages_ref.document(message_id), data)
+            if metadata is not None:
+                conversation_ref = self.db.collection(CONVERSATIONS_COLLECTION).document(conversation_id)
+                # update : échoue si la conversation n'existe pas, sans la créer
+                batch.update(conversation_ref, metadata)
+
+            started = time.perf_counter()
+            try:
+                await self.executor.run(batch.commit, collection=MESSAGES_COLLECTION, operation='chat_batch_commit')
+            except Exception as e:
+                self.failed += len(messages)
+                logger.error(f"❌ Échec de l'écriture de {len(messages)} messages ({conversation_id}): {e}")
+                for _, _, future in messages:
+                    if not future.done():
+                        future.set_exception(e)
+                self._metadata_failed(conversation_id, pending, metadata)
+            else:
+                self.commits += 1
+                self.last_commit_ms = round((time.perf_counter() - started) * 1000, 3)
+                if messages:
+                    pending.last_written = message_metadata(messages[-1][1])
+                if metadata is not None:
+                    pending.metadata_written_at = now
+                    pending.metadata_failures = 0
+                    self.conversation_updates += 1
+                for message_id, data, future in messages:
+                    if not future.done():
+                        future.set_result({
+                            'id': message_id,
+                            'texte': data['texte'],
+                            'expediteurId': data['expediteurId'],
+                            'timestamp': data['createdAt'],
+                        })
+            self._reschedule(conversation_id, pending)
+
+    def _metadata_failed(self, conversation_id: str, pending: _Pending, metadata: Optional[dict]):
+        if metadata is not None:
+            pending.metadata_failures += 1
+            if pending.metadata_failures >= MAX_METADATA_ATTEMPTS:
+                logger.warning(
+                    f"⚠️ Mise à jour de la conversation {conversation_id} abandonnée "
+                    f"après {pending.metadata_failures} échecs"
+                )
+                pending.metadata = None
+                pending.metadata_failures = 0
+                self.dropped_updates += 1
+                return
+            pending.metadata_retry_at = (
+                time.monotonic() + self.metadata_interval * 2 ** (pending.metadata_failures - 1)
+            )
+        if pending.messages:
+            # Messages suivants en attente : leur lot portera la mise à jour
+            if pending.metadata is None:
+                pending.metadata = metadata
+        elif metadata is not None or pending.metadata is not None:
+            # Sinon la mise à jour pointerait sur un message non écrit : la
+            # conversation reprend le dernier message effectivement écrit
+            pending.metadata = pending.last_written
+
+    def _reschedule(self, conversation_id: str, pending: _Pending):
+        if self._closed and (pending.messages or pending.metadata is not None):
+            return  # stop() écrit ce qui reste
+        if pending.messages:
+            self._schedule(conversation_id, pending, 0 if len(pending.messages) >= MAX_MESSAGES_PER_BATCH else self.window)
+        elif pending.metadata is not None:
+            # Fin de rafale : dernière mise à jour de la conversation
+            now = time.monotonic()
+            delay = max(pending.metadata_written_at + self.metadata_interval - now, pending.metadata_retry_at - now, 0)
+            self._schedule(conversation_id, pending, delay)
+        elif not self._closed and pending.metadata_written_at + self.metadata_interval > time.monotonic():
+            # Conversation gardée jusqu'à la fin de l'intervalle : un message
+            # arrivant entre-temps ne déclenche pas de nouvelle mise à jour
+            self._schedule(conversation_id, pending, pending.metadata_written_at + self.metadata_interval - time.monotonic())
+        elif self._pending.get(conversation_id) is pending:
+            del self._pending[conversation_id]
+
+    async def stop(self):
+        """Écrit tout ce qui est en attente (messages et conversations)."""
+        self._closed = True
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        # Quelques passes : un lot en échec garde ses données pour la suivante
+        for _ in range(3):
+            if not self._pending:
+                break
+            for conversation_id, pending in list(self._pending.items()):
+                if pending.flush is not None:
+                    pending.flush.cancel()
+                    pending.flush = None
+                await self._flush(conversation_id, pending)
+                if not pending.messages and pending.metadata is None:
+                    self._pending.pop(conversation_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "messages": self.messages,
+            "commits": self.commits,
+            "messages_per_commit": round(self.messages / self.commits, 2) if self.commits else 0.0,
+            "failed": self.failed,
+            "conversation_updates": self.conversation_updates,
+            "coalesced_updates": self.coalesced_updates,
+            "dropped_updates": self.dropped_updates,
+            "pending_conversations": len(self._pending),
+            "last_commit_ms": self.last_commit_ms,
+        }
+
@@ -0,0 +1,165 @@
+"""
+Connexion à la base de données établie en tâche de fond.
+
+Créer le client Firestore (import de firebase-admin, gRPC, lecture des
+identifiants) prend plusieurs centaines de millisecondes : fait à l'import
+de `server`, cela retardait toute réponse, y compris `/api/health/live`.
+
+`DatabaseConnection` se substitue au client : les services le reçoivent à
+la construction et l'utilisent comme le client lui-même (`collection`,
+`batch`, `transaction`...). La connexion est lancée depuis le lifespan
+sans le bloquer, avec nouvelles tentatives espacées (backoff exponentiel
+avec gigue) ; tant qu'elle n'est pas établie, l'objet est faux (`if not db`
+→ 503) et tout appel lève `DatabaseUnavailable`.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Callable, List, Optional
+
+from firestore_executor import FirestoreExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseUnavailable(RuntimeError):
+    pass
+
+
+class DatabaseConnection:
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        executor: FirestoreExecutor,
+        fallback: Optional[Callable[[], Any]] = None,
+        close: Optional[Callable[[Any], None]] = None,
+        retry_initial: float = 1.0,
+        retry_max: float = 30.0,
+    ):
+        self._connect = connect
+        self._executor = executor
+        # Repli (stockage en mémoire) utilisé si la première tentative échoue
+        self._fallback = fallback
+        self._close = close
+        self.retry_initial = retry_initial
+        self.retry_max = retry_max
+        self._client: Any = None
+        self._connected = asyncio.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._created = time.monotonic()
+
+        self.attempts = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.connect_ms: Optional[float] = None
+        self.connected_after_s: Optional[float] = None
+        self.fallback_used = False
+
+    # -- accès au client ------------------------------------------------------
+
+    @property
+    def client(self) -> Any:
+        return self._client
+
+    def __bool__(self) -> bool:
+        return self._client is not None
+
+    def __getattr__(self, name: str) -> Any:
+        # Appelé seulement pour les attributs absents de la connexion elle-même
+        client = self.__dict__.get('_client')
+        if client is None:
+            raise DatabaseUnavailable("Base de données non connectée")
+        return getattr(client, name)
+
+    def on_ready(self, callback: Callable[[], None]):
+        """`callback()` une fois la connexion établie (tout de suite si elle l'est)."""
+        if self._client is not None:
+            callback()
+        else:
+            self._callbacks.append(callback)
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """Attend la connexion ; False si `timeout` expire avant."""
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    # -- cycle de vie ---------------------------------------------------------
+
+    def connect_now(self):
+        """Connexion immédiate, sans nouvelle tentative (stockage en mémoire, sans coût)."""
+        self.attempts += 1
+        started = time.perf_counter()
+        client = self._connect()
+        self.connect_ms = round((time.perf_counter() - started) * 1000, 3)
+        self._set_client(client)
+
+    def start(self):
+        if self._task is None and self._client is None:
+            self._task = asyncio.create_task(self._loop(), name="database-connection")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        client, self._client = self._client, None
+        if client is not None and self._close is not None:
+            try:
+                self._close(client)
+            except Exception as e:
+                logger.warning(f"⚠️ Fermeture de la base de données: {e}")
+
+    async def _loop(self):
+        delay = self.retry_initial
+        while True:
+            self.attempts += 1
+            started = time.perf_counter()
+            try:
+                client = await self._executor.run(self._connect, collection='_connection', operation='connect')
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                if self._fallback is not None:
+                    logger.warning(f"⚠️ Connexion impossible ({e}) : repli sur le stockage en mémoire")
+                    client = self._fallback()
+                    self.fallback_used = True
+                else:
+                    # Gigue : les pods redémarrés ensemble ne réessaient pas en même temps
+                    wait = random.uniform(delay / 2, delay)
+                    logger.error(f"❌ Connexion à la base impossible ({e}), nouvel essai dans {wait:.1f}s")
+                    await asyncio.sleep(wait)
+                    delay = min(delay * 2, self.retry_max)
+                    continue
+            self.connect_ms = round((time.perf_counter() - started) * 1000, 3)
+            self._set_client(client)
+            return
+
+    def _set_client(self, client: Any):
+        self._client = client
+        self.connected_after_s = round(time.monotonic() - self._created, 3)
+        self._connected.set()
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"❌ Démarrage après connexion: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "connected": int(self._client is not None),
+            "attempts": self.attempts,
+            "failures": self.failures,
+            "fallback": int(self.fallback_used),
+            "connect_ms": self.connect_ms or 0.0,
+            "connected_after_s": self.connected_after_s or 0.0,
+        }
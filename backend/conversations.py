@@ -0,0 +1,108 @@
+"""
+Historique paginé des messages et diffusion en direct.
+
+Les messages sont dans `conversations/{id}/messages`, triés par
+(`createdAt`, id). `page()` lit une page avant ou après une position au
+lieu de toute la conversation.
+
+`listener()` est la source des sujets 'conversation:<id>' du hub de
+diffusion (`fanout`) : un écouteur Firestore (`on_snapshot`) par
+conversation suivie, partagé par tous les clients connectés. Un client
+qui a perdu des messages (file pleine) se resynchronise par une lecture
+paginée à partir du dernier message reçu.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from firestore_executor import FirestoreExecutor
+
+CONVERSATIONS_COLLECTION = 'conversations'
+MESSAGES_COLLECTION = 'messages'
+# Marge de l'écouteur sur les horodatages serveur (décalage d'horloge)
+LISTEN_OVERLAP = timedelta(seconds=5)
+
+# Position d'un message : (createdAt, id)
+Position = Tuple[datetime, str]
+
+
+def messages_path(conversation_id: str) -> str:
+    return f"{CONVERSATIONS_COLLECTION}/{conversation_id}/{MESSAGES_COLLECTION}"
+
+
+def _utc(value: datetime) -> datetime:
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def position_of(message: dict) -> Optional[Position]:
+    created = message.get('timestamp')
+    return (_utc(created), message['id']) if isinstance(created, datetime) else None
+
+
+def to_message(doc_id: str, data: dict) -> dict:
+    """Même forme que la route Express historique."""
+    return {
+        'id': doc_id,
+        'texte': data.get('texte'),
+        'expediteurId': data.get('expediteurId'),
+        'timestamp': data.get('createdAt'),
+    }
+
+
+async def page(
+    db,
+    executor: FirestoreExecutor,
+    conversation_id: str,
+    limit: int,
+    before: Optional[Position] = None,
+    after: Optional[Position] = None,
+) -> Tuple[List[dict], bool]:
+    """
+    Jusqu'à `limit` messages, en ordre chronologique, et s'il en reste au-delà.
+    Sans `after`, la page est celle qui précède `before` (les plus récents
+    si aucune position n'est donnée) ; avec `after`, celle qui le suit.
+    """
+    collection = db.collection(messages_path(conversation_id))
+    descending = after is None
+    direction = 'DESCENDING' if descending else 'ASCENDING'
+    query = collection.order_by('createdAt', direction=direction).order_by('__name__', direction=direction)
+    cursor = after or before
+    if cursor:
+        query = query.start_after({'createdAt': cursor[0], '__name__': collection.document(cursor[1])})
+    query = query.limit(limit + 1)
+    documents = await executor.run(
+        lambda: [(doc.id, doc.to_dict()) for doc in query.stream()],
+        collection=MESSAGES_COLLECTION, operation='query'
+    )
+    messages = [to_message(doc_id, data) for doc_id, data in documents[:limit]]
+    if descending:
+        messages.reverse()
+    return messages, len(documents) > limit
+
+
+def listener(db, executor: FirestoreExecutor):
+    """
+    Source `fanout` des sujets 'conversation:<id>' : un écouteur sur les
+    messages récents (l'historique passe par page()), qui publie chaque
+    message ajouté dans l'ordre chronologique.
+    """
+    async def start(conversation_id: str, publish):
+        since = datetime.now(timezone.utc) - LISTEN_OVERLAP
+        query = db.collection(messages_path(conversation_id)).where('createdAt', '>=', since)
+
+        def on_snapshot(documents, changes, read_time):
+            added = [
+                to_message(change.document.id, change.document.to_dict())
+                for change in changes if change.type.name == 'ADDED'
+            ]
+            added.sort(key=lambda message: position_of(message) or (read_time, message['id']))
+            for message in added:
+                publish(message)
+
+        watch = await executor.run(query.on_snapshot, on_snapshot, collection=MESSAGES_COLLECTION, operation='listen')
+
+        async def stop():
+            await executor.run(watch.unsubscribe, collection=MESSAGES_COLLECTION, operation='unlisten')
+        return stop
+
+    return start
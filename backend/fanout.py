@@ -0,0 +1,210 @@
+"""
+Diffusion en direct dans le processus (pub/sub).
+
+`FanoutHub` associe à chaque sujet ('conversation:<id>', 'service:<id>',
+'payment:<id>') une seule souscription amont — typiquement un écouteur
+Firestore `on_snapshot` — partagée par tous les abonnés locaux (SSE,
+WebSocket). Le coût amont ne dépend donc que du nombre de sujets suivis,
+pas du nombre de clients connectés.
+
+Chaque abonné a une file bornée : quand elle est pleine, l'élément le plus
+ancien est écarté (drop-oldest) et compté, pour qu'un client lent ne
+bloque ni la diffusion ni la mémoire. Un consommateur peut détecter ces
+pertes (`Subscriber.dropped`) et se resynchroniser par une lecture.
+
+Les sujets d'état (statut d'un service, d'un paiement) peuvent garder leur
+dernière valeur : un nouvel abonné la reçoit immédiatement.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# upstream(clé, publier) démarre la source d'un sujet et retourne de quoi l'arrêter
+Publish = Callable[[Any], None]
+Upstream = Callable[[str, Publish], Awaitable[Callable[[], Awaitable[None]]]]
+
+
+def _expire(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_exception(asyncio.TimeoutError())
+
+
+class Subscriber:
+    """File bornée d'un abonné ; la plus ancienne entrée cède sa place."""
+
+    def __init__(self, topic: str, max_size: int):
+        self.topic = topic
+        self.max_size = max_size
+        self._items: Deque[Tuple[float, Any]] = deque()
+        # Consommateur en attente : un futur simple plutôt qu'Event + wait_for,
+        # qui crée une tâche à chaque attente (coût multiplié par les abonnés)
+        self._waiter: Optional[asyncio.Future] = None
+        self.dropped = 0
+        self.received = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def push(self, item: Any) -> bool:
+        """Ajoute un élément ; retourne False si un ancien a dû être écarté."""
+        dropped = len(self._items) >= self.max_size
+        if dropped:
+            self._items.popleft()
+            self.dropped += 1
+        self._items.append((time.monotonic(), item))
+        self.received += 1
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+        return not dropped
+
+    async def get(self, timeout: Optional[float] = None) -> Any:
+        """Prochain élément ; asyncio.TimeoutError si rien n'arrive avant `timeout`."""
+        while not self._items:
+            loop = asyncio.get_running_loop()
+            self._waiter = waiter = loop.create_future()
+            timer = loop.call_later(timeout, _expire, waiter) if timeout is not None else None
+            try:
+                await waiter
+            finally:
+                self._waiter = None
+                if timer is not None:
+                    timer.cancel()
+        return self._items.popleft()[1]
+
+    def get_nowait(self) -> Any:
+        return self._items.popleft()[1]
+
+    async def get_batch(self, timeout: Optional[float] = None, max_items: int = 100) -> List[Any]:
+        """Tout ce qui est en attente (au moins un élément) : un réveil pour une rafale."""
+        items = [await self.get(timeout)]
+        while self._items and len(items) < max_items:
+            items.append(self._items.popleft()[1])
+        return items
+
+    def lag_seconds(self) -> float:
+        """Âge du plus ancien élément en attente."""
+        return time.monotonic() - self._items[0][0] if self._items else 0.0
+
+
+class _Topic:
+    def __init__(self):
+        self.subscribers: Set[Subscriber] = set()
+        self.stop: Optional[Callable[[], Awaitable[None]]] = None
+        self.started: Optional[asyncio.Task] = None
+        self.retained: Any = None
+        self.has_retained = False
+
+
+class FanoutHub:
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._upstreams: Dict[str, Tuple[Upstream, bool]] = {}
+        self._topics: Dict[str, _Topic] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.upstreams_started = 0
+        self.upstream_errors = 0
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def register(self, kind: str, upstream: Upstream, retain: bool = False):
+        """Source des sujets '<kind>:<clé>' ; `retain` garde la dernière valeur pour les nouveaux abonnés."""
+        self._upstreams[kind] = (upstream, retain)
+
+    # -- abonnements ----------------------------------------------------------
+
+    async def subscribe(self, topic: str) -> Subscriber:
+        kind, _, key = topic.partition(':')
+        if kind not in self._upstreams:
+            raise KeyError(f"Sujet inconnu: {topic}")
+        self._loop = asyncio.get_running_loop()
+        state = self._topics.get(topic)
+        if state is None:
+            state = self._topics[topic] = _Topic()
+            state.started = asyncio.create_task(self._start(topic, kind, key, state))
+        subscriber = Subscriber(topic, self.queue_size)
+        state.subscribers.add(subscriber)
+        if state.has_retained:
+            subscriber.push(state.retained)
+        try:
+            await asyncio.shield(state.started)
+        except BaseException:
+            await self.unsubscribe(subscriber)
+            raise
+        return subscriber
+
+    async def unsubscribe(self, subscriber: Subscriber):
+        state = self._topics.get(subscriber.topic)
+        if state is None or subscriber not in state.subscribers:
+            return
+        state.subscribers.discard(subscriber)
+        if state.subscribers:
+            return
+        del self._topics[subscriber.topic]
+        # Source encore en démarrage : _start() l'arrêtera lui-même
+        if state.stop is not None:
+            await self._stop(subscriber.topic, state)
+
+    async def _start(self, topic: str, kind: str, key: str, state: _Topic):
+        upstream, _ = self._upstreams[kind]
+        try:
+            state.stop = await upstream(key, lambda item: self.publish_threadsafe(topic, item))
+        except Exception:
+            self.upstream_errors += 1
+            raise
+        if self._topics.get(topic) is not state:
+            # Tous les abonnés sont partis pendant le démarrage
+            await self._stop(topic, state)
+            return
+        self.upstreams_started += 1
+        logger.info(f"📡 Diffusion démarrée: {topic}")
+
+    async def _stop(self, topic: str, state: _Topic):
+        try:
+            await state.stop()
+        except Exception as e:
+            self.upstream_errors += 1
+            logger.warning(f"⚠️ Arrêt de la source {topic} impossible: {e}")
+
+    # -- publication ----------------------------------------------------------
+
+    def publish(self, topic: str, item: Any):
+        """Distribue `item` aux abonnés du sujet (depuis la boucle asyncio)."""
+        state = self._topics.get(topic)
+        if state is None:
+            return
+        self.published += 1
+        if self._upstreams[topic.partition(':')[0]][1]:
+            state.retained, state.has_retained = item, True
+        for subscriber in state.subscribers:
+            if not subscriber.push(item):
+                self.dropped += 1
+            self.delivered += 1
+
+    def publish_threadsafe(self, topic: str, item: Any):
+        """Publication depuis un autre thread (rappel d'écouteur Firestore)."""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.publish, topic, item)
+
+    # -- métriques ------------------------------------------------------------
+
+    def stats(self) -> dict:
+        subscribers = [subscriber for state in self._topics.values() for subscriber in state.subscribers]
+        return {
+            "topics": len(self._topics),
+            "subscribers": len(subscribers),
+            "upstreams_started": self.upstreams_started,
+            "upstream_errors": self.upstream_errors,
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "queued": sum(len(subscriber) for subscriber in subscribers),
+            "max_queue_depth": max((len(subscriber) for subscriber in subscribers), default=0),
+            "max_lag_s": round(max((subscriber.lag_seconds() for subscriber in subscribers), default=0.0), 3),
+        }
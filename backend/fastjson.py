@@ -0,0 +1,45 @@
+"""
+Encodage JSON rapide pour les réponses volumineuses.
+
+Utilise orjson lorsqu'il est installé, sinon le module `json` standard en
+mode compact. Les listes servies par ce chemin sont construites à partir
+de documents déjà validés à l'écriture : elles ne repassent ni par les
+modèles Pydantic ni par `jsonable_encoder`.
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Type non sérialisable en JSON: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content,
+        default=_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendue par `dumps` (orjson si disponible)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
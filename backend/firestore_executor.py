@@ -0,0 +1,124 @@
+"""
+Exécution des appels Firestore hors de la boucle asyncio.
+
+Le SDK firebase-admin est synchrone : chaque `set`, `get` ou `stream`
+bloque le thread appelant pendant l'aller-retour réseau. Ce module fournit
+un pool de threads dédié et borné sur lequel toutes les opérations de base
+de données sont exécutées, avec des métriques de profondeur de file et de
+temps d'attente.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from metrics import FIRESTORE_ERRORS, FIRESTORE_LATENCY
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 16
+WAIT_SAMPLES = 1024
+
+
+class FirestoreExecutor:
+    """Pool de threads dédié aux appels Firestore bloquants."""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        if max_workers is None:
+            max_workers = int(os.environ.get('FIRESTORE_MAX_WORKERS', DEFAULT_MAX_WORKERS))
+        if max_workers < 1:
+            raise ValueError("FIRESTORE_MAX_WORKERS doit être >= 1")
+
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='firestore'
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._active = 0
+        self._completed = 0
+        self._errors = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+
+    async def run(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        collection: str = "unknown",
+        operation: str = "unknown",
+    ) -> Any:
+        """
+        Exécute `fn(*args)` sur le pool et attend son résultat.
+
+        `collection` et `operation` étiquettent les métriques de latence.
+        """
+        loop = asyncio.get_running_loop()
+        submitted_at = time.perf_counter()
+
+        def _call():
+            waited = time.perf_counter() - submitted_at
+            with self._lock:
+                self._active += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+                self._waits.append(waited)
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            except Exception:
+                with self._lock:
+                    self._errors += 1
+                FIRESTORE_ERRORS.inc(collection=collection, operation=operation)
+                raise
+            finally:
+                FIRESTORE_LATENCY.observe(
+                    time.perf_counter() - started, collection=collection, operation=operation
+                )
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
+
+        with self._lock:
+            self._pending += 1
+        try:
+            return await loop.run_in_executor(self._pool, _call)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def stats(self) -> dict:
+        """Instantané des métriques du pool."""
+        with self._lock:
+            waits = sorted(self._waits)
+            completed = self._completed
+            stats = {
+                "max_workers": self.max_workers,
+                "active": self._active,
+                "queue_depth": max(self._pending - self._active, 0),
+                "completed": completed,
+                "errors": self._errors,
+                "wait_avg_ms": round(self._wait_total / completed * 1000, 3) if completed else 0.0,
+                "wait_max_ms": round(self._wait_max * 1000, 3),
+            }
+        stats["wait_p50_ms"] = _percentile_ms(waits, 0.50)
+        stats["wait_p99_ms"] = _percentile_ms(waits, 0.99)
+        return stats
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
+        logger.info("✅ Pool Firestore arrêté")
+
+
+def _percentile_ms(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(len(sorted_values) * q), len(sorted_values) - 1)
+    return round(sorted_values[index] * 1000, 3)
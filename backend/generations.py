@@ -0,0 +1,89 @@
+"""
+Compteurs de génération partagés entre les workers d'une même machine.
+
+Avec plusieurs workers (voir `launcher`), chaque processus garde ses
+propres caches : une écriture traitée par un worker doit rendre périmées
+les entrées correspondantes des autres. Plutôt qu'un canal de messages,
+une table de compteurs en mémoire partagée (fichier projeté en mémoire,
+de préférence sous /dev/shm) : invalider = incrémenter un compteur, et une
+entrée de cache n'est valide que si elle a été lue sous la génération
+courante. La lecture coûte un accès mémoire, sans appel système.
+
+Une clé (espace de noms, clé éventuelle) correspond à une case de la table
+par hachage stable (crc32, identique dans tous les processus). Deux clés
+peuvent partager une case : une invalidation de l'une rend alors l'autre
+périmée aussi, ce qui ne coûte qu'une relecture.
+
+Sans fichier, la table est anonyme et propre au processus : le même code
+sert en mode worker unique.
+"""
+
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import zlib
+from typing import Optional
+
+_COUNTER = struct.Struct('<Q')
+
+DEFAULT_SLOTS = 4096
+
+
+class GenerationCounters:
+    def __init__(self, path: Optional[str] = None, slots: int = DEFAULT_SLOTS):
+        self.path = path
+        self.slots = slots
+        size = slots * _COUNTER.size
+        self._fd: Optional[int] = None
+        if path:
+            self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            if os.fstat(self._fd).st_size < size:
+                os.ftruncate(self._fd, size)
+            self._map = mmap.mmap(self._fd, size)
+        else:
+            self._map = mmap.mmap(-1, size)
+        self._lock = threading.Lock()
+
+        self.bumps = 0
+
+    @property
+    def shared(self) -> bool:
+        return self._fd is not None
+
+    def _offset(self, namespace: str, key: Optional[str]) -> int:
+        name = namespace if key is None else f"{namespace}\0{key}"
+        return (zlib.crc32(name.encode()) % self.slots) * _COUNTER.size
+
+    def get(self, namespace: str, key: Optional[str] = None) -> int:
+        return _COUNTER.unpack_from(self._map, self._offset(namespace, key))[0]
+
+    def bump(self, namespace: str, key: Optional[str] = None) -> int:
+        """Incrémente la génération (tous processus) et renvoie la nouvelle valeur."""
+        offset = self._offset(namespace, key)
+        with self._lock:
+            # Verrou de fichier : deux workers n'incrémentent pas la même valeur
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                value = _COUNTER.unpack_from(self._map, offset)[0] + 1
+                _COUNTER.pack_into(self._map, offset, value)
+            finally:
+                if self._fd is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self.bumps += 1
+        return value
+
+    def close(self):
+        self._map.close()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def stats(self) -> dict:
+        return {
+            "shared": int(self.shared),
+            "slots": self.slots,
+            "bumps": self.bumps,
+        }
@@ -0,0 +1,189 @@
+"""
+Index spatial des aidants pour la recherche par rayon.
+
+Les coordonnées viennent du profil (`latitude`/`longitude`, `lat`/`lng`,
+ou un GeoPoint / dict dans `location`, `coordonnees`, `geo`). À défaut, le
+centre de la commune (`ville`) est utilisé s'il figure dans CITY_CENTROIDS :
+aucun géocodage d'adresse n'est fait côté serveur.
+
+`GeoGridIndex` range les points dans une grille de cellules carrées en
+degrés. Une recherche parcourt les cellules par anneaux concentriques autour
+du client et s'arrête dès que l'anneau suivant ne peut plus contenir de
+point plus proche que les `limit` déjà trouvés, ou qu'il sort du rayon :
+le travail dépend de la densité locale, pas du nombre total d'aidants. Dans
+une zone peu dense, le parcours est borné par le nombre de cellules occupées.
+"""
+
+import heapq
+import math
+from typing import Callable, Dict, List, Optional, Tuple
+
+from availability import normalize
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+# Centres approximatifs des communes (La Réunion, puis villes des profils de démonstration)
+CITY_CENTROIDS = {
+    'saint-denis': (-20.8789, 55.4481),
+    'sainte-marie': (-20.8969, 55.5490),
+    'sainte-suzanne': (-20.9061, 55.6074),
+    'saint-andre': (-20.9633, 55.6503),
+    'bras-panon': (-21.0017, 55.6772),
+    'saint-benoit': (-21.0339, 55.7128),
+    'la plaine-des-palmistes': (-21.1364, 55.6278),
+    'sainte-rose': (-21.1278, 55.7961),
+    'saint-philippe': (-21.3586, 55.7672),
+    'saint-joseph': (-21.3779, 55.6195),
+    'petite-ile': (-21.3536, 55.5636),
+    'saint-pierre': (-21.3393, 55.4781),
+    'le tampon': (-21.2779, 55.5177),
+    'entre-deux': (-21.2464, 55.4717),
+    'saint-louis': (-21.2861, 55.4111),
+    "l'etang-sale": (-21.2653, 55.3653),
+    'les avirons': (-21.2406, 55.3339),
+    'saint-leu': (-21.1706, 55.2888),
+    'les trois-bassins': (-21.1042, 55.2981),
+    'saint-paul': (-21.0096, 55.2707),
+    'le port': (-20.9373, 55.2919),
+    'la possession': (-20.9253, 55.3358),
+    'salazie': (-21.0275, 55.5392),
+    'cilaos': (-21.1339, 55.4714),
+    'paris': (48.8566, 2.3522),
+    'lyon': (45.7640, 4.8357),
+    'marseille': (43.2965, 5.3698),
+    'bordeaux': (44.8378, -0.5792),
+    'toulouse': (43.6047, 1.4442),
+}
+
+_CITY_KEYS = {name.replace(' ', '-'): point for name, point in CITY_CENTROIDS.items()}
+
+Cell = Tuple[int, int]
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _valid(lat, lon) -> bool:
+    return (
+        isinstance(lat, (int, float)) and isinstance(lon, (int, float))
+        and -90 <= lat <= 90 and -180 <= lon <= 180
+    )
+
+
+def _point(value) -> Optional[Tuple[float, float]]:
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        lat = value.get('latitude', value.get('lat'))
+        lon = value.get('longitude', value.get('lng', value.get('lon')))
+    else:
+        # google.cloud.firestore.GeoPoint
+        lat, lon = getattr(value, 'latitude', None), getattr(value, 'longitude', None)
+    return (float(lat), float(lon)) if _valid(lat, lon) else None
+
+
+def location_of(data: dict) -> Optional[Tuple[float, float]]:
+    """Coordonnées d'un profil, ou centre de sa commune ; None si inconnues."""
+    point = _point(data)
+    for field in ('location', 'coordonnees', 'geo'):
+        point = point or _point(data.get(field))
+    if point is None and data.get('ville'):
+        point = _CITY_KEYS.get(normalize(data['ville']).replace(' ', '-'))
+    return point
+
+
+class GeoGridIndex:
+    def __init__(self, cell_km: float = 1.0):
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self._cells: Dict[Cell, Dict[str, Tuple[float, float]]] = {}
+        self._points: Dict[str, Tuple[float, float]] = {}
+
+    def __len__(self):
+        return len(self._points)
+
+    def _cell(self, lat: float, lon: float) -> Cell:
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def set(self, item_id: str, point: Optional[Tuple[float, float]]):
+        self.remove(item_id)
+        if point is None:
+            return
+        self._points[item_id] = point
+        self._cells.setdefault(self._cell(*point), {})[item_id] = point
+
+    def remove(self, item_id: str):
+        point = self._points.pop(item_id, None)
+        if point is None:
+            return
+        cell = self._cell(*point)
+        members = self._cells[cell]
+        del members[item_id]
+        if not members:
+            del self._cells[cell]
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        limit: int,
+        accept: Optional[Callable[[str], bool]] = None,
+    ) -> List[Tuple[float, str]]:
+        """Jusqu'à `limit` couples (distance km, id) dans le rayon, du plus proche au plus lointain."""
+        row, col = self._cell(latitude, longitude)
+        # Côté le plus court d'une cellule dans le rayon : minore la
+        # distance à tout point d'un anneau plus éloigné.
+        farthest_lat = min(abs(latitude) + radius_km / KM_PER_DEGREE + self.cell_deg, 90)
+        cos_lat = max(math.cos(math.radians(farthest_lat)), 1e-6)
+        step_km = self.cell_deg * KM_PER_DEGREE * cos_lat
+
+        best: List[Tuple[float, str]] = []  # tas max (distances négatives)
+
+        def visit(members: Dict[str, Tuple[float, float]]):
+            for item_id, (lat, lon) in members.items():
+                distance = haversine_km(latitude, longitude, lat, lon)
+                if distance > radius_km or (accept and not accept(item_id)):
+                    continue
+                if len(best) < limit:
+                    heapq.heappush(best, (-distance, item_id))
+                elif distance < -best[0][0]:
+                    heapq.heapreplace(best, (-distance, item_id))
+
+        ring = 0
+        while True:
+            lower_bound = max(ring - 1, 0) * step_km
+            if lower_bound > radius_km:
+                break
+            if len(best) >= limit and lower_bound > -best[0][0]:
+                break
+            if 8 * ring > len(self._cells):
+                # Zone peu dense : l'anneau compte plus de cellules qu'il n'y en
+                # a d'occupées, on parcourt directement les cellules restantes.
+                for (cell_row, cell_col), members in self._cells.items():
+                    if max(abs(cell_row - row), abs(cell_col - col)) >= ring:
+                        visit(members)
+                break
+            for cell in self._ring(row, col, ring):
+                members = self._cells.get(cell)
+                if members:
+                    visit(members)
+            ring += 1
+        return sorted((-distance, item_id) for distance, item_id in best)
+
+    @staticmethod
+    def _ring(row: int, col: int, ring: int):
+        if ring == 0:
+            yield (row, col)
+            return
+        for offset in range(-ring, ring + 1):
+            yield (row - ring, col + offset)
+            yield (row + ring, col + offset)
+        for offset in range(-ring + 1, ring):
+            yield (row + offset, col - ring)
+            yield (row + offset, col + ring)
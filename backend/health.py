@@ -0,0 +1,112 @@
+"""
+Surveillance de la base de données en tâche de fond.
+
+La sonde profonde (lecture Firestore, sans écriture) tourne à intervalle
+fixe avec un délai maximal ; les endpoints de santé répondent depuis le
+dernier résultat mis en cache, sans aucun appel réseau.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    """Exécute périodiquement `probe` et garde le dernier résultat."""
+
+    def __init__(
+        self,
+        probe: Callable[[], Awaitable[None]],
+        interval: float = 10.0,
+        timeout: float = 2.0,
+        ttl: float = 30.0,
+    ):
+        self.interval = interval
+        self.timeout = timeout
+        self.ttl = ttl
+        self._probe = probe
+        self._task: Optional[asyncio.Task] = None
+
+        self.ok = False
+        self.error: Optional[str] = None
+        self.latency_ms: Optional[float] = None
+        self.checked_at: Optional[str] = None
+        self._checked_monotonic: Optional[float] = None
+        self.probes = 0
+        self.failures = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="health-monitor")
+            logger.info(f"✅ Sonde de santé démarrée (toutes les {self.interval}s)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await self.probe_once()
+            await asyncio.sleep(self.interval)
+
+    async def probe_once(self):
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._probe(), timeout=self.timeout)
+            ok, error = True, None
+        except asyncio.TimeoutError:
+            ok, error = False, f"timeout après {self.timeout}s"
+        except Exception as e:
+            ok, error = False, str(e)
+
+        if ok != self.ok or error != self.error:
+            if ok:
+                logger.info("✅ Health check: Base de données OK")
+            else:
+                logger.error(f"❌ Health check: Erreur base de données - {error}")
+
+        self.ok, self.error = ok, error
+        self.latency_ms = round((time.perf_counter() - started) * 1000, 3)
+        self.checked_at = datetime.utcnow().isoformat()
+        self._checked_monotonic = time.monotonic()
+        self.probes += 1
+        if not ok:
+            self.failures += 1
+
+    @property
+    def age(self) -> Optional[float]:
+        if self._checked_monotonic is None:
+            return None
+        return time.monotonic() - self._checked_monotonic
+
+    @property
+    def ready(self) -> bool:
+        """Dernière sonde réussie et plus récente que le TTL."""
+        age = self.age
+        return self.ok and age is not None and age <= self.ttl
+
+    def snapshot(self) -> dict:
+        age = self.age
+        if age is None:
+            state = "unknown"
+        elif age > self.ttl:
+            state = "stale"
+        else:
+            state = "connected" if self.ok else f"error: {self.error}"
+        return {
+            "database": state,
+            "last_probe_latency_ms": self.latency_ms,
+            "last_probe_at": self.checked_at,
+            "last_probe_age_s": round(age, 3) if age is not None else None,
+            "probes": self.probes,
+            "failures": self.failures,
+        }
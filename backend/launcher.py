@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Lanceur de production : plusieurs workers uvicorn sur le même port.
+
+Chaque worker est un processus indépendant (caches, index de recherche,
+pool Firestore) : aucun état partagé hormis la table des générations de
+cache (`generations`), un petit fichier projeté en mémoire créé ici et
+transmis aux workers par WORKER_GENERATIONS_FILE. Une écriture traitée
+par un worker (status check, avis, profil) y incrémente une génération et
+périme les entrées correspondantes des autres workers.
+
+Avec WORKER_WARMUP, chaque worker se connecte à la base et charge l'index
+de recherche et les statistiques pendant le démarrage du lifespan, avant
+d'ouvrir sa file d'acceptation : les requêtes vont aux workers déjà prêts.
+
+Usage : python launcher.py [--workers 8] [--host 0.0.0.0] [--port 8001]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from generations import GenerationCounters
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("launcher")
+
+
+def generations_path() -> str:
+    # /dev/shm : fichier en mémoire, jamais écrit sur disque
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, f"mise-en-relation-{os.getpid()}.generations")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1)))
+    parser.add_argument("--host", default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument("--port", type=int, default=int(os.environ.get('PORT', 8001)))
+    parser.add_argument("--no-warmup", action="store_true", help="accepte le trafic sans préchauffage")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    if args.workers > 1 and 'memory' in (os.environ.get('STORAGE_BACKEND', '').lower(),
+                                         os.environ.get('STORAGE_FALLBACK', '').lower()):
+        logger.warning("⚠️ Stockage en mémoire : chaque worker a sa propre base, les données ne sont pas partagées")
+
+    path = generations_path()
+    GenerationCounters(path).close()
+    # Hérité par les workers (processus lancés après cette affectation)
+    os.environ['WORKER_GENERATIONS_FILE'] = path
+    os.environ['WORKER_WARMUP'] = 'false' if args.no_warmup else 'true'
+    logger.info(f"🚀 {args.workers} workers sur {args.host}:{args.port} (générations de cache : {path})")
+
+    try:
+        uvicorn.run(
+            "server:app",
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            app_dir=str(BACKEND_DIR),
+            log_level=args.log_level,
+        )
+    finally:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,821 @@
+"""
+Client Firestore en mémoire.
+
+Reproduit le sous-ensemble de l'API `google.cloud.firestore` utilisé par
+l'application : collections et sous-collections, `document`, `add`, `set`
+(avec `merge`), `update`, `delete`, `get`, `stream`, requêtes `where` /
+`order_by` / `limit` / `start_after` / `start_at`, `batch()`, les
+transactions (`transaction()` + décorateur `transactional`, concurrence
+optimiste avec nouvelles tentatives, comme le SDK) et les écouteurs
+`on_snapshot` sur les requêtes (rappel après chaque écriture concernée).
+
+Les index composites de `firestore.indexes.json` (`load_indexes`) sont
+reproduits par des listes triées tenues à jour à l'écriture : une requête
+d'égalité sur leurs premiers champs, avec bornes et tri sur le suivant,
+ne parcourt que les documents concernés au lieu de toute la collection.
+
+Sert de stockage local (tests de charge, benchmarks, développement sans
+réseau) et de repli lorsque Firestore est indisponible. Les documents sont
+copiés à l'écriture et à la lecture, comme avec un vrai serveur.
+"""
+
+import bisect
+import copy
+import enum
+import json
+import random
+import string
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+_AUTO_ID_ALPHABET = string.ascii_letters + string.digits
+
+
+def auto_id() -> str:
+    return ''.join(random.choices(_AUTO_ID_ALPHABET, k=20))
+
+
+class NotFound(Exception):
+    """Équivalent de google.api_core.exceptions.NotFound."""
+
+
+class Aborted(Exception):
+    """Équivalent de google.api_core.exceptions.Aborted (conflit de transaction)."""
+
+
+# ---------------------------------------------------------------------------
+# Valeurs : accès par chemin et ordre de tri Firestore
+# ---------------------------------------------------------------------------
+
+_MISSING = object()
+
+
+def get_field(data: dict, field_path: str) -> Any:
+    value: Any = data
+    for part in field_path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def set_field(data: dict, field_path: str, value: Any):
+    parts = field_path.split('.')
+    target = data
+    for part in parts[:-1]:
+        child = target.get(part)
+        if not isinstance(child, dict):
+            child = target[part] = {}
+        target = child
+    target[parts[-1]] = value
+
+
+def _timestamp(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def sort_key(value: Any) -> Tuple:
+    """Ordre de tri inter-types de Firestore (null < bool < nombre < date < texte...)."""
+    if value is None:
+        return (0,)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, datetime):
+        return (3, _timestamp(value))
+    if isinstance(value, str):
+        return (4, value)
+    if isinstance(value, bytes):
+        return (5, value)
+    if isinstance(value, DocumentReference):
+        return (6, value.path)
+    if isinstance(value, (list, tuple)):
+        return (8, tuple(sort_key(item) for item in value))
+    if isinstance(value, dict):
+        return (9, tuple((key, sort_key(item)) for key, item in sorted(value.items())))
+    return (10, str(value))
+
+
+def _matches(value: Any, op: str, expected: Any) -> bool:
+    if op == 'array_contains':
+        return isinstance(value, list) and expected in value
+    if op == 'array_contains_any':
+        return isinstance(value, list) and any(item in value for item in expected)
+    if value is _MISSING:
+        return False
+    if op == '==':
+        return sort_key(value) == sort_key(expected)
+    if op == '!=':
+        return value is not None and sort_key(value) != sort_key(expected)
+    if op == 'in':
+        return any(sort_key(value) == sort_key(item) for item in expected)
+    if op == 'not-in':
+        return value is not None and all(sort_key(value) != sort_key(item) for item in expected)
+
+    # Les comparaisons d'ordre ne portent que sur des valeurs de même type
+    left, right = sort_key(value), sort_key(expected)
+    if left[0] != right[0]:
+        return False
+    if op == '<':
+        return left < right
+    if op == '<=':
+        return left <= right
+    if op == '>':
+        return left > right
+    if op == '>=':
+        return left >= right
+    raise ValueError(f"Opérateur non supporté: {op}")
+
+
+class _Bound:
+    """Borne de recherche dichotomique : avant ou après toute valeur."""
+    __slots__ = ('high',)
+
+    def __init__(self, high: bool):
+        self.high = high
+
+    def __lt__(self, other):
+        return not self.high
+
+    def __gt__(self, other):
+        return self.high
+
+
+_LOW, _HIGH = _Bound(False), _Bound(True)
+_RANGE_OPS = ('<', '<=', '>', '>=')
+
+
+class SortedIndex:
+    """
+    Index composite : (clés de tri des champs..., id) pour chaque document qui
+    a tous les champs, en une liste triée tenue à jour par dichotomie.
+    """
+
+    def __init__(self, fields: List[str]):
+        self.fields = fields
+        self.rows: List[tuple] = []
+
+    def key(self, doc_id: str, data: Optional[dict]) -> Optional[tuple]:
+        if data is None:
+            return None
+        values = []
+        for field in self.fields:
+            value = get_field(data, field)
+            if value is _MISSING:
+                return None
+            values.append(sort_key(value))
+        return (*values, doc_id)
+
+    def update(self, doc_id: str, old: Optional[dict], new: Optional[dict]):
+        old_key, new_key = self.key(doc_id, old), self.key(doc_id, new)
+        if old_key == new_key:
+            return
+        if old_key is not None:
+            index = bisect.bisect_left(self.rows, old_key)
+            if index < len(self.rows) and self.rows[index] == old_key:
+                del self.rows[index]
+        if new_key is not None:
+            bisect.insort(self.rows, new_key)
+
+    def plan(self, filters, orders, cursor_values, cursor_inclusive, limit):
+        """
+        Ids candidats pour la requête, ou None si l'index ne s'applique pas.
+        Le booléen indique un résultat exact (filtres, tri, curseur et limite
+        appliqués) ; sinon les candidats repassent par l'évaluation complète.
+        """
+        equalities = {field: value for field, op, value in filters if op == '=='}
+        prefix = []
+        for field in self.fields:
+            if field not in equalities:
+                break
+            prefix.append(sort_key(equalities[field]))
+        prefix = tuple(prefix)
+        range_field = self.fields[len(prefix)] if len(prefix) < len(self.fields) else None
+        ranges = [(op, value) for field, op, value in filters if field == range_field and op in _RANGE_OPS]
+        # L'index omet les documents sans l'un de ses champs : il ne sert que si
+        # la requête les exclut aussi (égalité, borne ou tri sur le dernier champ)
+        if len(prefix) < len(self.fields) - 1 or not (prefix or ranges):
+            return None
+        if range_field is not None and not ranges and range_field not in (field for field, _ in orders):
+            return None
+        exact = len(prefix) + len(ranges) == len(filters)
+
+        rows = self.rows
+        lo = bisect.bisect_left(rows, prefix)
+        hi = bisect.bisect_right(rows, (*prefix, _HIGH))
+        for op, value in ranges:
+            bound = sort_key(value)
+            # Comparaisons limitées au type de la borne, comme Firestore
+            lo = max(lo, bisect.bisect_left(rows, (*prefix, (bound[0],))))
+            hi = min(hi, bisect.bisect_left(rows, (*prefix, (bound[0] + 1,))))
+            if op == '>=':
+                lo = max(lo, bisect.bisect_left(rows, (*prefix, bound)))
+            elif op == '>':
+                lo = max(lo, bisect.bisect_right(rows, (*prefix, bound, _HIGH)))
+            elif op == '<':
+                hi = min(hi, bisect.bisect_left(rows, (*prefix, bound)))
+            else:
+                hi = min(hi, bisect.bisect_right(rows, (*prefix, bound, _HIGH)))
+
+        # Ordre de l'index : champ de bornes puis id, dans un seul sens
+        expected = ([range_field] if range_field else []) + ['__name__']
+        directions = {direction for _, direction in orders}
+        ordered = len(directions) == 1 and [field for field, _ in orders] == expected
+        descending = ordered and directions == {Query.DESCENDING}
+        if ordered and cursor_values:
+            position = (*prefix, *(
+                sort_key(value) if field != '__name__'
+                else value.id if isinstance(value, DocumentReference) else value
+                for value, (field, _) in zip(cursor_values, orders)
+            ))
+            complete = len(cursor_values) == len(orders)
+            if not descending:
+                after = bisect.bisect_left if cursor_inclusive else bisect.bisect_right
+                lo = max(lo, after(rows, position if complete else (*position, _LOW if cursor_inclusive else _HIGH)))
+            else:
+                before = bisect.bisect_right if cursor_inclusive else bisect.bisect_left
+                hi = min(hi, before(rows, position if complete else (*position, _HIGH if cursor_inclusive else _LOW)))
+        if hi <= lo:
+            return [], exact and ordered
+        if not (exact and ordered):
+            return [row[-1] for row in rows[lo:hi]], False
+        selected = rows[lo:hi] if not descending else rows[hi - 1:lo - 1 if lo else None:-1]
+        if limit is not None:
+            selected = selected[:limit]
+        return [row[-1] for row in selected], True
+
+
+# ---------------------------------------------------------------------------
+# Snapshots et références
+# ---------------------------------------------------------------------------
+
+class DocumentSnapshot:
+    def __init__(self, reference: "DocumentReference", data: Optional[dict]):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[dict]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field_path: str) -> Any:
+        if self._data is None:
+            return None
+        value = get_field(self._data, field_path)
+        if value is _MISSING:
+            raise KeyError(field_path)
+        return copy.deepcopy(value)
+
+
+class DocumentReference:
+    def __init__(self, client: "InMemoryFirestore", path: str):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit('/', 1)[-1]
+
+    @property
+    def parent(self) -> "CollectionReference":
+        return CollectionReference(self._client, self.path.rsplit('/', 1)[0])
+
+    def collection(self, name: str) -> "CollectionReference":
+        return CollectionReference(self._client, f"{self.path}/{name}")
+
+    def get(self, transaction=None) -> DocumentSnapshot:
+        return self._client._read(self, transaction)
+
+    def set(self, data: dict, merge: bool = False):
+        self._client._commit([('set', self, data, merge)])
+
+    def create(self, data: dict):
+        self._client._commit([('create', self, data, False)])
+
+    def update(self, data: dict):
+        self._client._commit([('update', self, data, False)])
+
+    def delete(self):
+        self._client._commit([('delete', self, None, False)])
+
+    def on_snapshot(self, callback: Callable) -> "Watch":
+        """`callback([snapshot], changes, read_time)` ; liste vide si le document n'existe pas."""
+        return self.parent.where('__name__', '==', self).on_snapshot(callback)
+
+    def __eq__(self, other):
+        return isinstance(other, DocumentReference) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+
+class Query:
+    ASCENDING = "ASCENDING"
+    DESCENDING = "DESCENDING"
+
+    def __init__(self, client: "InMemoryFirestore", path: str, filters=(), orders=(),
+                 limit=None, cursor=None):
+        self._client = client
+        self._path = path
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+        # (valeurs, inclusif)
+        self._cursor = cursor
+
+    def _copy(self, **changes) -> "Query":
+        params = dict(filters=self._filters, orders=self._orders, limit=self._limit, cursor=self._cursor)
+        params.update(changes)
+        return Query(self._client, self._path, **params)
+
+    def where(self, field_path: str = None, op_string: str = None, value: Any = None, *, filter=None) -> "Query":
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path: str, direction: str = ASCENDING) -> "Query":
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count: int) -> "Query":
+        return self._copy(limit=count)
+
+    def start_after(self, document_fields) -> "Query":
+        return self._copy(cursor=(document_fields, False))
+
+    def start_at(self, document_fields) -> "Query":
+        return self._copy(cursor=(document_fields, True))
+
+    def _effective_orders(self) -> List[Tuple[str, str]]:
+        orders = list(self._orders)
+        # Firestore trie implicitement par champ d'inégalité puis par id
+        if not orders:
+            for field_path, op, _ in self._filters:
+                if op in ('<', '<=', '>', '>=', '!=', 'not-in'):
+                    orders.append((field_path, self.ASCENDING))
+                    break
+        if not any(field == '__name__' for field, _ in orders):
+            direction = orders[-1][1] if orders else self.ASCENDING
+            orders.append(('__name__', direction))
+        return orders
+
+    def _cursor_values(self, orders) -> List[Any]:
+        fields, _ = self._cursor
+        if isinstance(fields, DocumentSnapshot):
+            data = fields._data or {}
+            return [fields.id if field == '__name__' else get_field(data, field) for field, _ in orders]
+        if isinstance(fields, dict):
+            values = []
+            for field, _ in orders:
+                if field not in fields and get_field(fields, field) is _MISSING:
+                    break
+                value = fields[field] if field in fields else get_field(fields, field)
+                values.append(value.id if isinstance(value, DocumentReference) else value)
+            return values
+        return list(fields)
+
+    @staticmethod
+    def _matches(ref: DocumentReference, data: dict, field_path: str, op: str, expected: Any) -> bool:
+        if field_path == '__name__':
+            # Filtre sur l'identifiant (FieldPath.document_id())
+            if isinstance(expected, DocumentReference):
+                expected = expected.id
+            elif isinstance(expected, (list, tuple)):
+                expected = [value.id if isinstance(value, DocumentReference) else value for value in expected]
+            return _matches(ref.id, op, expected)
+        return _matches(get_field(data, field_path), op, expected)
+
+    def _plan(self, orders):
+        """(ids, exact) via le plus sélectif des index de la collection, ou None."""
+        cursor_values, inclusive = None, False
+        if self._cursor is not None:
+            cursor_values, inclusive = self._cursor_values(orders), self._cursor[1]
+        best = None
+        with self._client._lock:
+            for index in self._client._indexes_for(self._path):
+                plan = index.plan(self._filters, orders, cursor_values, inclusive, self._limit)
+                if plan is not None and (best is None or (plan[1], -len(plan[0])) > (best[1], -len(best[0]))):
+                    best = plan
+        return best
+
+    def _execute(self, count_reads: bool = True) -> List[DocumentSnapshot]:
+        orders = self._effective_orders()
+        plan = self._plan(orders)
+        if plan is not None and plan[1]:
+            documents = self._client._scan(self._path, plan[0])
+            if count_reads:
+                self._client._count_reads(len(documents))
+            return [DocumentSnapshot(ref, copy.deepcopy(data)) for ref, data in documents]
+
+        rows = []
+        for ref, data in self._client._scan(self._path, plan[0] if plan is not None else None):
+            if not all(self._matches(ref, data, f, op, v) for f, op, v in self._filters):
+                continue
+            values = []
+            for field, _ in orders:
+                value = ref.id if field == '__name__' else get_field(data, field)
+                if value is _MISSING:
+                    break
+                values.append(value)
+            else:
+                rows.append((values, ref, data))
+
+        def _key(row):
+            return [
+                _Reversed(sort_key(value)) if direction == self.DESCENDING else sort_key(value)
+                for value, (_, direction) in zip(row[0], orders)
+            ]
+        rows.sort(key=_key)
+
+        if self._cursor is not None:
+            cursor = self._cursor_values(orders)
+            inclusive = self._cursor[1]
+            cursor_key = [
+                _Reversed(sort_key(value)) if direction == self.DESCENDING else sort_key(value)
+                for value, (_, direction) in zip(cursor, orders)
+            ]
+            width = len(cursor_key)
+            rows = [
+                row for row in rows
+                if (_key(row)[:width] >= cursor_key if inclusive else _key(row)[:width] > cursor_key)
+            ]
+
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        if count_reads:
+            self._client._count_reads(len(rows))
+        return [DocumentSnapshot(ref, copy.deepcopy(data)) for _, ref, data in rows]
+
+    def stream(self, transaction=None) -> Iterator[DocumentSnapshot]:
+        return iter(self._execute())
+
+    def get(self, transaction=None) -> List[DocumentSnapshot]:
+        return self._execute()
+
+    def on_snapshot(self, callback: Callable) -> "Watch":
+        """
+        `callback(documents, changes, read_time)` : tout de suite avec les
+        documents actuels (ajoutés), puis après chaque écriture qui modifie
+        le résultat. Comme avec le SDK, seuls les changements sont facturés.
+        """
+        watch = Watch(self, callback)
+        self._client._add_watch(watch)
+        watch._refresh(initial=True)
+        return watch
+
+
+class _Reversed:
+    """Inverse l'ordre d'une clé de tri (tri descendant)."""
+    __slots__ = ('key',)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return self.key > other.key
+
+    def __gt__(self, other):
+        return self.key < other.key
+
+    def __le__(self, other):
+        return self.key >= other.key
+
+    def __ge__(self, other):
+        return self.key <= other.key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+
+class CollectionReference(Query):
+    def __init__(self, client: "InMemoryFirestore", path: str):
+        super().__init__(client, path)
+        self.id = path.rsplit('/', 1)[-1]
+
+    def document(self, document_id: Optional[str] = None) -> DocumentReference:
+        return DocumentReference(self._client, f"{self._path}/{document_id or auto_id()}")
+
+    def add(self, data: dict, document_id: Optional[str] = None):
+        ref = self.document(document_id)
+        ref.create(data)
+        return datetime.now(timezone.utc), ref
+
+    def list_documents(self) -> List[DocumentReference]:
+        return [ref for ref, _ in self._client._scan(self._path)]
+
+
+class ChangeType(enum.Enum):
+    """Équivalent de google.cloud.firestore_v1.watch.ChangeType."""
+    ADDED = 1
+    REMOVED = 2
+    MODIFIED = 3
+
+
+class DocumentChange:
+    __slots__ = ('type', 'document', 'old_index', 'new_index')
+
+    def __init__(self, change_type: ChangeType, document: DocumentSnapshot, old_index: int, new_index: int):
+        self.type = change_type
+        self.document = document
+        self.old_index = old_index
+        self.new_index = new_index
+
+
+class Watch:
+    """Écouteur d'une requête ; le résultat précédent sert à calculer les changements."""
+
+    def __init__(self, query: Query, callback: Callable):
+        self._query = query
+        self._callback = callback
+        self._documents: Dict[str, Tuple[int, DocumentSnapshot]] = {}
+        # Rappels d'un même écouteur sérialisés, dans l'ordre des écritures
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        return self._query._path
+
+    def unsubscribe(self):
+        self._query._client._remove_watch(self)
+
+    def _refresh(self, initial: bool = False):
+        with self._lock:
+            snapshots = self._query._execute(count_reads=False)
+            current = {snapshot.id: (index, snapshot) for index, snapshot in enumerate(snapshots)}
+            changes = []
+            for doc_id, (old_index, snapshot) in self._documents.items():
+                if doc_id not in current:
+                    changes.append(DocumentChange(ChangeType.REMOVED, snapshot, old_index, -1))
+            for doc_id, (new_index, snapshot) in current.items():
+                previous = self._documents.get(doc_id)
+                if previous is None:
+                    changes.append(DocumentChange(ChangeType.ADDED, snapshot, -1, new_index))
+                elif previous[1]._data != snapshot._data:
+                    changes.append(DocumentChange(ChangeType.MODIFIED, snapshot, previous[0], new_index))
+            self._documents = current
+            if not changes and not initial:
+                return
+            self._query._client._count_reads(len(changes))
+            self._callback(snapshots, changes, datetime.now(timezone.utc))
+
+
+class WriteBatch:
+    def __init__(self, client: "InMemoryFirestore"):
+        self._client = client
+        self._writes = []
+
+    def set(self, reference: DocumentReference, data: dict, merge: bool = False):
+        self._writes.append(('set', reference, data, merge))
+
+    def create(self, reference: DocumentReference, data: dict):
+        self._writes.append(('create', reference, data, False))
+
+    def update(self, reference: DocumentReference, data: dict):
+        self._writes.append(('update', reference, data, False))
+
+    def delete(self, reference: DocumentReference):
+        self._writes.append(('delete', reference, None, False))
+
+    def commit(self):
+        writes, self._writes = self._writes, []
+        self._client._commit(writes)
+
+    def __len__(self):
+        return len(self._writes)
+
+
+class Transaction(WriteBatch):
+    """
+    Lectures suivies de version, écritures mises en attente jusqu'au commit.
+    Le commit échoue (Aborted) si un document lu a changé entre-temps.
+    """
+
+    def __init__(self, client: "InMemoryFirestore", max_attempts: int = 5):
+        super().__init__(client)
+        self.max_attempts = max_attempts
+        self._read_versions: Dict[str, int] = {}
+
+    def _begin(self):
+        self._writes = []
+        self._read_versions = {}
+
+    def _record_read(self, path: str, version: int):
+        if self._writes:
+            raise ValueError("Les lectures d'une transaction doivent précéder ses écritures")
+        self._read_versions.setdefault(path, version)
+
+    def commit(self):
+        writes, self._writes = self._writes, []
+        self._client._commit(writes, expected_versions=self._read_versions)
+
+
+def transactional(fn):
+    """
+    Décorateur équivalent à google.cloud.firestore.transactional :
+    `fn(transaction, *args)` est rejouée tant que le commit est en conflit.
+    """
+    def wrapper(transaction: Transaction, *args, **kwargs):
+        for attempt in range(transaction.max_attempts):
+            transaction._begin()
+            result = fn(transaction, *args, **kwargs)
+            try:
+                transaction.commit()
+                return result
+            except Aborted:
+                if attempt == transaction.max_attempts - 1:
+                    raise
+    return wrapper
+
+
+def transactional_for(transaction):
+    """
+    Décorateur `transactional` adapté au client qui a créé `transaction` :
+    celui de ce module, ou celui du SDK (None s'il n'est pas installé).
+    """
+    if isinstance(transaction, Transaction):
+        return transactional
+    # SDK importé à la première transaction, pas au démarrage
+    try:
+        from google.cloud.firestore import transactional as firestore_transactional
+    except ImportError:
+        return None
+    return firestore_transactional
+
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
+class InMemoryFirestore:
+    """Stockage : {chemin de collection: {id: données}}."""
+
+    def __init__(self):
+        self._collections: Dict[str, Dict[str, dict]] = {}
+        # Version de chaque document écrit (concurrence optimiste des transactions)
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self._watches: Dict[str, Set[Watch]] = {}
+        # Index composites : définitions par groupe de collections, index par collection
+        self._index_definitions: Dict[str, List[List[str]]] = {}
+        self._indexes: Dict[str, List[SortedIndex]] = {}
+        self.reads = 0
+        self.writes = 0
+
+    def collection(self, path: str) -> CollectionReference:
+        return CollectionReference(self, path.strip('/'))
+
+    def document(self, path: str) -> DocumentReference:
+        return DocumentReference(self, path.strip('/'))
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def transaction(self, max_attempts: int = 5) -> Transaction:
+        return Transaction(self, max_attempts)
+
+    def get_all(self, references, field_paths=None, transaction: Optional[Transaction] = None) -> Iterator[DocumentSnapshot]:
+        """Lecture groupée de documents (une lecture facturée par document)."""
+        for ref in references:
+            yield self._read(ref, transaction)
+
+    def _count_reads(self, count: int):
+        with self._lock:
+            # Une requête vide est facturée une lecture par Firestore
+            self.reads += max(count, 1)
+
+    def _add_watch(self, watch: Watch):
+        with self._lock:
+            self._watches.setdefault(watch.path, set()).add(watch)
+
+    def _remove_watch(self, watch: Watch):
+        with self._lock:
+            watches = self._watches.get(watch.path)
+            if watches is not None:
+                watches.discard(watch)
+                if not watches:
+                    del self._watches[watch.path]
+
+    def _notify(self, collection_paths):
+        with self._lock:
+            watches = [watch for path in collection_paths for watch in self._watches.get(path, ())]
+        # Hors du verrou : un rappel peut relire ou écrire
+        for watch in watches:
+            watch._refresh()
+
+    def add_index(self, collection_group: str, fields: List[str]):
+        """Déclare un index composite sur les collections nommées `collection_group`."""
+        with self._lock:
+            definitions = self._index_definitions.setdefault(collection_group, [])
+            if fields in definitions:
+                return
+            definitions.append(list(fields))
+            # Collections déjà indexées ; les autres le seront au premier accès
+            for collection_path, indexes in self._indexes.items():
+                if collection_path.rsplit('/', 1)[-1] == collection_group:
+                    indexes.append(self._build_index(collection_path, fields))
+
+    def load_indexes(self, path) -> int:
+        """Index composites d'un fichier `firestore.indexes.json` ; retourne leur nombre."""
+        with open(path, encoding='utf-8') as f:
+            definitions = json.load(f).get('indexes', [])
+        for definition in definitions:
+            if definition.get('queryScope', 'COLLECTION') == 'COLLECTION':
+                self.add_index(definition['collectionGroup'], [field['fieldPath'] for field in definition['fields']])
+        return len(definitions)
+
+    def _build_index(self, collection_path: str, fields: List[str]) -> SortedIndex:
+        index = SortedIndex(fields)
+        documents = self._collections.get(collection_path, {})
+        index.rows = sorted(filter(None, (index.key(doc_id, data) for doc_id, data in documents.items())))
+        return index
+
+    def _indexes_for(self, collection_path: str) -> List[SortedIndex]:
+        indexes = self._indexes.get(collection_path)
+        if indexes is None:
+            group = collection_path.rsplit('/', 1)[-1]
+            indexes = self._indexes[collection_path] = [
+                self._build_index(collection_path, fields) for fields in self._index_definitions.get(group, [])
+            ]
+        return indexes
+
+    def _scan(self, collection_path: str, ids: Optional[List[str]] = None) -> List[Tuple[DocumentReference, dict]]:
+        with self._lock:
+            collection = self._collections.get(collection_path, {})
+            if ids is None:
+                documents = list(collection.items())
+            else:
+                documents = [(doc_id, collection[doc_id]) for doc_id in ids if doc_id in collection]
+        return [(DocumentReference(self, f"{collection_path}/{doc_id}"), data) for doc_id, data in documents]
+
+    def _read(self, ref: DocumentReference, transaction: Optional[Transaction] = None) -> DocumentSnapshot:
+        collection_path = ref.path.rsplit('/', 1)[0]
+        with self._lock:
+            self.reads += 1
+            if transaction is not None:
+                transaction._record_read(ref.path, self._versions.get(ref.path, 0))
+            data = self._collections.get(collection_path, {}).get(ref.id)
+            return DocumentSnapshot(ref, copy.deepcopy(data) if data is not None else None)
+
+    def _commit(self, writes, expected_versions: Optional[Dict[str, int]] = None):
+        """Applique les écritures de façon atomique (tout ou rien)."""
+        with self._lock:
+            for path, version in (expected_versions or {}).items():
+                if self._versions.get(path, 0) != version:
+                    raise Aborted(f"Document modifié pendant la transaction: {path}")
+            staged: Dict[str, Dict[str, Optional[dict]]] = {}
+
+            def current(collection_path, doc_id):
+                pending = staged.get(collection_path, {})
+                if doc_id in pending:
+                    return pending[doc_id]
+                return self._collections.get(collection_path, {}).get(doc_id)
+
+            for kind, ref, data, merge in writes:
+                collection_path, doc_id = ref.path.rsplit('/', 1)
+                existing = current(collection_path, doc_id)
+                if kind == 'delete':
+                    new = None
+                elif kind == 'create':
+                    if existing is not None:
+                        raise ValueError(f"Le document existe déjà: {ref.path}")
+                    new = copy.deepcopy(data)
+                elif kind == 'update':
+                    if existing is None:
+                        raise NotFound(f"Aucun document à mettre à jour: {ref.path}")
+                    new = copy.deepcopy(existing)
+                    for field_path, value in data.items():
+                        set_field(new, field_path, copy.deepcopy(value))
+                elif merge and existing is not None:
+                    new = copy.deepcopy(existing)
+                    _deep_merge(new, copy.deepcopy(data))
+                else:
+                    new = copy.deepcopy(data)
+                staged.setdefault(collection_path, {})[doc_id] = new
+
+            for collection_path, documents in staged.items():
+                target = self._collections.setdefault(collection_path, {})
+                indexes = self._indexes_for(collection_path)
+                for doc_id, data in documents.items():
+                    for index in indexes:
+                        index.update(doc_id, target.get(doc_id), data)
+                    if data is None:
+                        target.pop(doc_id, None)
+                    else:
+                        target[doc_id] = data
+                    path = f"{collection_path}/{doc_id}"
+                    self._versions[path] = self._versions.get(path, 0) + 1
+            self.writes += len(writes)
+        if self._watches:
+            self._notify(staged)
+
+
+def _deep_merge(target: dict, source: dict):
+    for key, value in source.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _deep_merge(target[key], value)
+        else:
+            target[key] = value
@@ -0,0 +1,157 @@
+"""
+Profils aidants (GET /api/services/profile/{aidantId}).
+
+Un profil est assemblé à partir du document `users` et des agrégats d'avis
+(`aidant_stats`, voir `reviews`) : deux lectures de document, faites en
+parallèle. Le résultat est gardé en mémoire (LRU avec TTL) par aidant.
+
+Les requêtes simultanées pour un même aidant absent du cache partagent un
+seul chargement (single-flight) : un profil en tête des résultats de
+recherche ne déclenche pas une rafale de lectures Firestore. Une
+invalidation (avis enregistré, profil modifié) écarte l'entrée et le
+chargement en cours, dont le résultat n'est alors pas mis en cache.
+"""
+
+import asyncio
+from typing import Dict, Optional, Tuple
+
+from cache import CACHE_REQUESTS, LRUCache
+from firestore_executor import FirestoreExecutor
+from generations import GenerationCounters
+from reviews import ReviewService, review_to_json
+from search_index import DEFAULT_PHOTO, DEFAULT_TARIF
+
+USERS_COLLECTION = 'users'
+
+# Entrée de cache : (profil, updatedAt du document `users` lu)
+ProfileEntry = Tuple[dict, object]
+
+
+def is_visible(data: dict) -> bool:
+    return bool(data.get('isAidant') and not data.get('isDeleted') and not data.get('isSuspended'))
+
+
+def to_profile(aidant_id: str, data: dict, review_stats: dict) -> dict:
+    """Même forme que la route Express historique."""
+    avis = [review_to_json(review) for review in review_stats.get('recentReviews', [])]
+    return {
+        'id': aidant_id,
+        'nom': data.get('displayName') or 'Aidant',
+        'age': data.get('age'),
+        'experience': data.get('experience') or '0 ans',
+        'description': data.get('description') or 'Profil aidant professionnel',
+        'certifications': data.get('certifications') or [],
+        'tarif': data.get('tarifHeure') or DEFAULT_TARIF,
+        'rating': review_stats.get('averageRating') or data.get('averageRating') or 0,
+        'nombreAvis': review_stats.get('ratingCount') or data.get('totalReviews') or len(avis),
+        'photo': data.get('photoURL') or DEFAULT_PHOTO,
+        'specialites': data.get('specialites') or ['Accompagnement à domicile'],
+        'disponibilites': data.get('disponibilites') or ['Lundi-Vendredi 8h-18h'],
+        'secteurs': [data['secteur']] if data.get('secteur') else [],
+        'genre': data.get('genre'),
+        'avis': avis,
+    }
+
+
+class ProfileService:
+    def __init__(
+        self,
+        db,
+        executor: FirestoreExecutor,
+        reviews: ReviewService,
+        cache_entries: int = 1000,
+        cache_ttl: float = 60.0,
+        generations: Optional[GenerationCounters] = None,
+    ):
+        self.db = db
+        self.executor = executor
+        self.reviews = reviews
+        self.cache = LRUCache(cache_entries, name="profile", generations=generations)
+        self.cache_ttl = cache_ttl
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.loads = 0
+        self.invalidations = 0
+
+    async def get(self, aidant_id: str) -> Optional[dict]:
+        """Profil public d'un aidant ; None s'il n'existe pas ou n'est pas visible."""
+        entry = self.cache.get(aidant_id)
+        if entry is not None:
+            self.hits += 1
+            CACHE_REQUESTS.inc(cache="profile", result="hit")
+            return entry[0]
+        self.misses += 1
+        CACHE_REQUESTS.inc(cache="profile", result="miss")
+
+        task = self._inflight.get(aidant_id)
+        if task is None:
+            generation = self.cache.generation(aidant_id)
+            task = asyncio.create_task(self._load(aidant_id))
+            task.add_done_callback(lambda done: self._publish(aidant_id, done, generation))
+            self._inflight[aidant_id] = task
+        else:
+            self.coalesced += 1
+        # Une requête annulée (client déconnecté) n'interrompt pas les autres
+        entry = await asyncio.shield(task)
+        return entry[0] if entry else None
+
+    async def _load(self, aidant_id: str) -> Optional[ProfileEntry]:
+        self.loads += 1
+        user_snapshot, review_stats = await asyncio.gather(
+            self.executor.run(
+                self.db.collection(USERS_COLLECTION).document(aidant_id).get,
+                collection=USERS_COLLECTION, operation='get'
+            ),
+            self.reviews.get_stats(aidant_id),
+        )
+        if not user_snapshot.exists:
+            return None
+        data = user_snapshot.to_dict()
+        if not is_visible(data):
+            return None
+        return to_profile(aidant_id, data, review_stats), data.get('updatedAt')
+
+    def _publish(self, aidant_id: str, task: asyncio.Task, generation: Optional[int]):
+        # Chargement écarté par une invalidation : son résultat peut être périmé
+        if self._inflight.get(aidant_id) is not task:
+            return
+        del self._inflight[aidant_id]
+        if not task.cancelled() and task.exception() is None and task.result() is not None:
+            self.cache.set(aidant_id, task.result(), self.cache_ttl, generation)
+
+    def invalidate(self, aidant_id: str):
+        """Profil modifié par ce worker : écarté ici et dans les autres workers."""
+        self.cache.invalidate(aidant_id)
+        self._forget(aidant_id)
+
+    def _forget(self, aidant_id: str):
+        self.cache.delete(aidant_id)
+        self._inflight.pop(aidant_id, None)
+        self.invalidations += 1
+
+    def user_changed(self, aidant_id: str, data: Optional[dict]):
+        """Document `users` créé ou modifié : invalide le profil s'il a changé depuis sa lecture."""
+        entry = self.cache.get(aidant_id)
+        if entry is None and aidant_id not in self._inflight:
+            return
+        if entry is not None and data is not None and entry[1] is not None and entry[1] == data.get('updatedAt'):
+            return
+        # Chaque worker relit `users` avec son propre index : invalidation locale
+        self._forget(aidant_id)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / self.misses, 4) if self.misses else 0.0,
+            "loads": self.loads,
+            "invalidations": self.invalidations,
+            "inflight": len(self._inflight),
+            "cached_profiles": len(self.cache),
+        }
@@ -0,0 +1,56 @@
+"""
+Sujets de diffusion en direct de l'application.
+
+- 'conversation:<id>' : nouveaux messages (`conversations.listener`) ;
+- 'service:<id>'      : statut d'un service (`services/{id}`) ;
+- 'payment:<id>'      : statut d'un paiement (`transactions/{id}`).
+
+Les sujets de statut gardent leur dernière valeur : un client qui se
+connecte reçoit l'état courant sans lecture supplémentaire.
+"""
+
+from typing import Optional, Sequence
+
+import conversations
+from fanout import FanoutHub
+from firestore_executor import FirestoreExecutor
+
+SERVICES_COLLECTION = 'services'
+TRANSACTIONS_COLLECTION = 'transactions'
+
+SERVICE_FIELDS = ('status', 'aidantId', 'clientId', 'createdAt', 'verifiedAt', 'completedAt', 'updatedAt')
+PAYMENT_FIELDS = ('status', 'type', 'amount', 'montant', 'serviceId', 'paymentIntentId', 'createdAt', 'updatedAt')
+
+
+def document_state(doc_id: str, data: Optional[dict], fields: Sequence[str]) -> dict:
+    """État publié d'un document : champs utiles seulement ; `exists` faux s'il a été supprimé."""
+    if data is None:
+        return {'id': doc_id, 'exists': False}
+    return {'id': doc_id, 'exists': True, **{field: data[field] for field in fields if field in data}}
+
+
+def document_listener(db, executor: FirestoreExecutor, collection: str, fields: Sequence[str]):
+    """Source `fanout` qui publie l'état d'un document à chaque modification."""
+    async def start(doc_id: str, publish):
+        reference = db.collection(collection).document(doc_id)
+
+        def on_snapshot(documents, changes, read_time):
+            snapshot = documents[0] if documents else None
+            exists = snapshot is not None and snapshot.exists
+            publish(document_state(doc_id, snapshot.to_dict() if exists else None, fields))
+
+        watch = await executor.run(reference.on_snapshot, on_snapshot, collection=collection, operation='listen')
+
+        async def stop():
+            await executor.run(watch.unsubscribe, collection=collection, operation='unlisten')
+        return stop
+
+    return start
+
+
+def create_hub(db, executor: FirestoreExecutor, queue_size: int = 100) -> FanoutHub:
+    hub = FanoutHub(queue_size)
+    hub.register('conversation', conversations.listener(db, executor))
+    hub.register('service', document_listener(db, executor, SERVICES_COLLECTION, SERVICE_FIELDS), retain=True)
+    hub.register('payment', document_listener(db, executor, TRANSACTIONS_COLLECTION, PAYMENT_FIELDS), retain=True)
+    return hub
@@ -0,0 +1,116 @@
+"""
+Accès aux données des status checks.
+
+`StatusRepository` est l'interface utilisée par les routes ;
+`FirestoreStatusRepository` l'implémente sur n'importe quel client exposant
+l'API Firestore : le SDK firebase-admin ou `memory_store.InMemoryFirestore`.
+
+Les filtres par client et par fenêtre de temps de `page()` sont servis par
+les index composites (client_name, timestamp) de `firestore.indexes.json` :
+seuls les documents de la fenêtre sont lus.
+"""
+
+from abc import ABC, abstractmethod
+from typing import List, Optional, Sequence, Tuple
+
+from batching import commit_in_batches
+from firestore_executor import FirestoreExecutor
+
+STATUS_COLLECTION = 'status_checks'
+
+
+class StatusRepository(ABC):
+    @abstractmethod
+    async def add(self, document: dict):
+        """Enregistre un status check (document déjà sérialisé)."""
+
+    @abstractmethod
+    async def add_many(self, documents: Sequence[Tuple[str, dict]]) -> List[Optional[str]]:
+        """Enregistre des couples (id, document) ; retourne l'erreur éventuelle de chacun."""
+
+    @abstractmethod
+    async def page(
+        self,
+        page_size: int,
+        after: Optional[dict] = None,
+        client_name: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        descending: bool = False,
+    ) -> List[dict]:
+        """
+        Page triée par (timestamp, id), après la position `after` = {timestamp, id}.
+        `since` (inclus) et `until` (exclu) sont des horodatages ISO, comme
+        ceux stockés ; `descending` parcourt du plus récent au plus ancien.
+        """
+
+    @abstractmethod
+    async def delete_before(self, until: str, limit: int) -> int:
+        """Supprime jusqu'à `limit` documents antérieurs à `until` (ISO) ; retourne leur nombre."""
+
+    @abstractmethod
+    async def probe(self):
+        """Lecture minimale pour vérifier que le stockage répond."""
+
+
+class FirestoreStatusRepository(StatusRepository):
+    def __init__(self, db, executor: FirestoreExecutor):
+        self.db = db
+        self.executor = executor
+
+    @property
+    def collection(self):
+        return self.db.collection(STATUS_COLLECTION)
+
+    async def add(self, document: dict):
+        doc_ref = self.collection.document(document['id'])
+        await self.executor.run(doc_ref.set, document, collection=STATUS_COLLECTION, operation='set')
+
+    async def add_many(self, documents: Sequence[Tuple[str, dict]]) -> List[Optional[str]]:
+        return await commit_in_batches(self.db, self.executor, STATUS_COLLECTION, documents)
+
+    async def page(
+        self,
+        page_size: int,
+        after: Optional[dict] = None,
+        client_name: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        descending: bool = False,
+    ) -> List[dict]:
+        query = self.collection
+        if client_name is not None:
+            query = query.where('client_name', '==', client_name)
+        if since is not None:
+            query = query.where('timestamp', '>=', since)
+        if until is not None:
+            query = query.where('timestamp', '<', until)
+        direction = 'DESCENDING' if descending else 'ASCENDING'
+        query = query.order_by('timestamp', direction=direction).order_by('__name__', direction=direction)
+        if after:
+            query = query.start_after({'timestamp': after['timestamp'], '__name__': after['id']})
+        query = query.limit(page_size)
+        return await self.executor.run(
+            lambda: [doc.to_dict() for doc in query.stream()],
+            collection=STATUS_COLLECTION,
+            operation='query'
+        )
+
+    async def delete_before(self, until: str, limit: int) -> int:
+        query = self.collection.where('timestamp', '<', until).order_by('timestamp').limit(limit)
+
+        def delete():
+            references = [doc.reference for doc in query.stream()]
+            if references:
+                batch = self.db.batch()
+                for reference in references:
+                    batch.delete(reference)
+                batch.commit()
+            return len(references)
+
+        return await self.executor.run(delete, collection=STATUS_COLLECTION, operation='batch_delete')
+
+    async def probe(self):
+        # Lecture seule : aucune écriture facturée par sonde
+        query = self.db.collection('_health_check').limit(1)
+        await self.executor.run(lambda: list(query.stream()), collection='_health_check', operation='query')
@@ -0,0 +1,261 @@
+"""
+Appels Firestore bornés dans le temps.
+
+Sans délai, un Firestore dégradé faisait attendre les requêtes jusqu'à
+l'abandon du client, en occupant le pool. `ResilientExecutor` remplace
+`FirestoreExecutor` (même `run(fn, collection=, operation=)`) et ajoute :
+
+- un délai par opération (lecture, écriture, parcours complet) : l'appelant
+  reçoit `DeadlineExceeded` ; le thread du pool, lui, ne peut pas être
+  interrompu et termine l'appel en arrière-plan ;
+- pour les lectures idempotentes seulement, quelques nouvelles tentatives
+  après une erreur transitoire, avec backoff exponentiel et gigue complète ;
+- un disjoncteur commun : au-delà d'un taux d'erreurs transitoires sur une
+  fenêtre glissante, les appels échouent aussitôt (`CircuitOpen`, 503)
+  pendant `open_for` secondes, puis un appel d'essai décide de la reprise.
+
+Les deux erreurs dérivent de `DatabaseUnavailable` : les routes répondent
+503 comme quand la base n'est pas connectée. Chaque changement d'état du
+disjoncteur est compté (`firestore_circuit_transitions_total`).
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Callable, Deque, List, Optional
+
+from connection import DatabaseUnavailable
+from firestore_executor import FirestoreExecutor
+from metrics import CIRCUIT_TRANSITIONS, FIRESTORE_DEADLINES, FIRESTORE_REJECTED, FIRESTORE_RETRIES
+
+logger = logging.getLogger(__name__)
+
+# Lectures : rejouables sans effet de bord
+READ_OPERATIONS = frozenset({
+    'get', 'query', 'search_changes', 'stats_changes',
+    'search_full_scan', 'stats_full_scan', 'stats_columns',
+})
+# Parcours de collections entières : délai plus long
+SCAN_OPERATIONS = frozenset({'search_full_scan', 'stats_full_scan', 'stats_columns'})
+# Hors délai et disjoncteur : la connexion a ses propres tentatives, et un
+# écouteur doit toujours pouvoir être arrêté
+UNGUARDED_OPERATIONS = frozenset({'connect', 'unlisten'})
+
+# Erreurs transitoires du SDK (google.api_core.exceptions), reconnues par
+# leur nom pour ne pas importer le SDK au démarrage
+TRANSIENT_ERRORS = frozenset({
+    'ServiceUnavailable', 'DeadlineExceeded', 'InternalServerError', 'GatewayTimeout',
+    'BadGateway', 'TooManyRequests', 'ResourceExhausted', 'RetryError', 'Unknown',
+})
+
+
+class DeadlineExceeded(DatabaseUnavailable):
+    pass
+
+
+class CircuitOpen(DatabaseUnavailable):
+    pass
+
+
+def is_transient(error: BaseException) -> bool:
+    if isinstance(error, DatabaseUnavailable):
+        return isinstance(error, DeadlineExceeded)
+    return isinstance(error, (ConnectionError, TimeoutError)) or type(error).__name__ in TRANSIENT_ERRORS
+
+
+class CircuitBreaker:
+    """
+    Fermé → ouvert quand, sur `window` secondes et au moins `min_calls`
+    appels, la part d'échecs atteint `failure_ratio`. Ouvert → semi-ouvert
+    après `open_for` secondes : `half_open_calls` appels d'essai, qui le
+    referment s'ils réussissent et le rouvrent sinon.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(
+        self,
+        failure_ratio: float = 0.5,
+        min_calls: int = 20,
+        window: float = 30.0,
+        open_for: float = 10.0,
+        half_open_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.window = window
+        self.open_for = open_for
+        self.half_open_calls = half_open_calls
+        self._clock = clock
+        self.state = self.CLOSED
+        # Une case par seconde : [seconde, appels, échecs]
+        self._buckets: Deque[List[int]] = deque()
+        self._calls = 0
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trials = 0
+
+        self.transitions = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        """True si l'appel peut partir ; le compte comme essai en semi-ouvert."""
+        if self.state == self.OPEN:
+            if self._clock() - self._opened_at < self.open_for:
+                self.rejected += 1
+                return False
+            self._transition(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN:
+            if self._trials >= self.half_open_calls:
+                self.rejected += 1
+                return False
+            self._trials += 1
+        return True
+
+    def record(self, success: bool, trial: bool = False):
+        """Résultat d'un appel ; `trial` si `allow()` l'a admis en semi-ouvert."""
+        if trial:
+            if self.state == self.HALF_OPEN:
+                self._trials = max(self._trials - 1, 0)
+                self._transition(self.CLOSED if success else self.OPEN)
+            return
+        if self.state != self.CLOSED:
+            return  # appel parti avant l'ouverture
+        now = self._clock()
+        self._expire(now)
+        second = int(now)
+        if not self._buckets or self._buckets[-1][0] != second:
+            self._buckets.append([second, 0, 0])
+        self._buckets[-1][1] += 1
+        self._calls += 1
+        if not success:
+            self._buckets[-1][2] += 1
+            self._failures += 1
+            if self._calls >= self.min_calls and self._failures >= self.failure_ratio * self._calls:
+                self._transition(self.OPEN)
+
+    def _expire(self, now: float):
+        horizon = now - self.window
+        while self._buckets and self._buckets[0][0] < horizon:
+            _, calls, failures = self._buckets.popleft()
+            self._calls -= calls
+            self._failures -= failures
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        previous, self.state = self.state, state
+        self.transitions += 1
+        CIRCUIT_TRANSITIONS.inc(from_state=previous, to_state=state)
+        if state == self.OPEN:
+            self._opened_at = self._clock()
+            logger.error(f"🔌 Disjoncteur Firestore ouvert ({self._failures}/{self._calls} échecs), "
+                         f"appels refusés pendant {self.open_for}s")
+        elif state == self.CLOSED:
+            self._buckets.clear()
+            self._calls = self._failures = 0
+            logger.info("✅ Disjoncteur Firestore refermé")
+        else:
+            self._trials = 0
+
+    def stats(self) -> dict:
+        self._expire(self._clock())
+        return {
+            "circuit": self.state,
+            "circuit_state": self.STATE_VALUES[self.state],
+            "window_calls": self._calls,
+            "window_failures": self._failures,
+            "transitions": self.transitions,
+            "rejected": self.rejected,
+        }
+
+
+class ResilientExecutor(FirestoreExecutor):
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        read_deadline: float = 5.0,
+        write_deadline: float = 10.0,
+        scan_deadline: float = 120.0,
+        max_attempts: int = 3,
+        retry_base: float = 0.1,
+        retry_max: float = 2.0,
+    ):
+        super().__init__(max_workers)
+        self.breaker = breaker or CircuitBreaker()
+        self.read_deadline = read_deadline
+        self.write_deadline = write_deadline
+        self.scan_deadline = scan_deadline
+        self.max_attempts = max(max_attempts, 1)
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+
+        self.retries = 0
+        self.deadline_exceeded = 0
+
+    def deadline_for(self, operation: str) -> float:
+        if operation in SCAN_OPERATIONS:
+            return self.scan_deadline
+        return self.read_deadline if operation in READ_OPERATIONS else self.write_deadline
+
+    async def run(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        collection: str = "unknown",
+        operation: str = "unknown",
+    ) -> Any:
+        if operation in UNGUARDED_OPERATIONS:
+            return await super().run(fn, *args, collection=collection, operation=operation)
+
+        deadline = self.deadline_for(operation)
+        attempts = self.max_attempts if operation in READ_OPERATIONS else 1
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                FIRESTORE_REJECTED.inc(collection=collection, operation=operation)
+                raise CircuitOpen("Base de données momentanément indisponible")
+            trial = self.breaker.state == CircuitBreaker.HALF_OPEN
+            try:
+                result = await asyncio.wait_for(
+                    super().run(fn, *args, collection=collection, operation=operation), deadline
+                )
+            except asyncio.TimeoutError:
+                self.deadline_exceeded += 1
+                FIRESTORE_DEADLINES.inc(collection=collection, operation=operation)
+                error: Exception = DeadlineExceeded(f"{operation} sur {collection} : délai de {deadline}s dépassé")
+            except Exception as e:
+                if not is_transient(e):
+                    # Erreur de l'appel (document absent, conflit...) : la base a répondu
+                    self.breaker.record(True, trial)
+                    raise
+                error = e
+            else:
+                self.breaker.record(True, trial)
+                return result
+
+            self.breaker.record(False, trial)
+            attempt += 1
+            if attempt >= attempts:
+                raise error
+            # Gigue complète : les clients en échec ne réessaient pas ensemble
+            delay = random.uniform(0, min(self.retry_max, self.retry_base * 2 ** attempt))
+            self.retries += 1
+            FIRESTORE_RETRIES.inc(collection=collection, operation=operation)
+            logger.warning(f"⚠️ {operation} sur {collection} : {error}, nouvel essai dans {delay * 1000:.0f} ms")
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            **self.breaker.stats(),
+            "retries": self.retries,
+            "deadline_exceeded": self.deadline_exceeded,
+        }
@@ -0,0 +1,230 @@
+"""
+Avis clients et agrégats de notes dénormalisés.
+
+Chaque avis est écrit dans `avis` et, dans la même transaction, met à jour
+`aidant_stats/{aidantId}` : somme et nombre des notes, histogramme 1 à 5,
+moyenne, et les derniers avis (RECENT_REVIEWS). `averageRating` et
+`totalReviews` sont recopiés sur `users/{aidantId}` pour la recherche.
+
+Un profil se lit ainsi en un seul document au lieu d'une requête sur
+`avis` ; les agrégats récents restent aussi en mémoire (LRU avec TTL).
+Pour un aidant sans agrégats, ou dont les agrégats ne portent pas encore
+les derniers avis, ceux-ci sont lus dans `avis`. Les agrégats antérieurs
+(`averageRating`, `totalReviews` seuls) sont recomptés dans `avis` au
+premier avis enregistré.
+"""
+
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from cache import LRUCache
+from generations import GenerationCounters
+from firestore_executor import FirestoreExecutor
+from memory_store import transactional_for
+
+REVIEWS_COLLECTION = 'avis'
+STATS_COLLECTION = 'aidant_stats'
+USERS_COLLECTION = 'users'
+RECENT_REVIEWS = 10
+RATINGS = ('1', '2', '3', '4', '5')
+# Champs propres aux agrégats actuels ; absents des documents antérieurs
+AGGREGATE_FIELDS = ('ratingSum', 'ratingCount', 'histogram')
+
+
+def empty_stats(aidant_id: str) -> dict:
+    return {
+        'aidantId': aidant_id,
+        'ratingSum': 0,
+        'ratingCount': 0,
+        'histogram': {rating: 0 for rating in RATINGS},
+        'averageRating': 0,
+        'recentReviews': [],
+    }
+
+
+def review_to_json(review: dict) -> dict:
+    """Forme des avis dans le profil (route Express historique)."""
+    created = review.get('createdAt')
+    return {
+        'id': review.get('id'),
+        'client': review.get('clientName') or 'Client anonyme',
+        'note': review.get('rating'),
+        'commentaire': review.get('comment'),
+        'date': created.date().isoformat() if isinstance(created, datetime) else str(created or '')[:10],
+    }
+
+
+def normalize_stats(aidant_id: str, data: dict) -> dict:
+    """
+    Agrégats sous leur forme actuelle. Les documents antérieurs ne portent
+    que `averageRating`, `totalReviews` et `lastReviewAt` : somme et nombre
+    en sont déduits, l'histogramme reste vide.
+    """
+    stats = empty_stats(aidant_id)
+    stats.update(data)
+    if 'ratingCount' not in data:
+        stats['ratingCount'] = int(data.get('totalReviews') or 0)
+    if 'ratingSum' not in data:
+        stats['ratingSum'] = round(float(data.get('averageRating') or 0) * stats['ratingCount'], 2)
+    return stats
+
+
+def stats_from_reviews(aidant_id: str, reviews: List[dict]) -> dict:
+    """Agrégats recalculés à partir des avis d'un aidant."""
+    stats = empty_stats(aidant_id)
+    counted = []
+    for review in reviews:
+        try:
+            rating = int(review.get('rating'))
+        except (TypeError, ValueError):
+            continue
+        if str(rating) not in stats['histogram']:
+            continue
+        stats['ratingSum'] += rating
+        stats['ratingCount'] += 1
+        stats['histogram'][str(rating)] += 1
+        counted.append(review)
+    if stats['ratingCount']:
+        stats['averageRating'] = round(stats['ratingSum'] / stats['ratingCount'], 2)
+    counted.sort(key=lambda review: str(review.get('createdAt') or ''), reverse=True)
+    stats['recentReviews'] = counted[:RECENT_REVIEWS]
+    return stats
+
+
+class ReviewService:
+    def __init__(
+        self,
+        db,
+        executor: FirestoreExecutor,
+        cache_entries: int = 1000,
+        cache_ttl: float = 60.0,
+        generations: Optional[GenerationCounters] = None,
+    ):
+        self.db = db
+        self.executor = executor
+        self.cache = LRUCache(cache_entries, name="aidant_stats", generations=generations)
+        self.cache_ttl = cache_ttl
+        self.created = 0
+        self.duplicates = 0
+
+    async def add(self, review: dict) -> Tuple[dict, dict, bool]:
+        """
+        Enregistre un avis et met à jour les agrégats de l'aidant.
+        Retourne (avis, agrégats, créé) ; un avis déjà présent (même id) n'est
+        pas recompté.
+        """
+        review = dict(review)
+        if not review.get('id'):
+            # Un avis par service et par client : renvoyer la requête ne le double pas
+            if review.get('serviceId') and review.get('clientId'):
+                review['id'] = f"{review['serviceId']}_{review['clientId']}"
+            else:
+                review['id'] = str(uuid.uuid4())
+        review.setdefault('createdAt', datetime.now(timezone.utc))
+
+        review, stats, created = await self.executor.run(
+            self._add_sync, review, collection=STATS_COLLECTION, operation='review_transaction'
+        )
+        if created:
+            self.created += 1
+        else:
+            self.duplicates += 1
+        # Agrégats périmés dans les autres workers, à jour dans celui-ci
+        self.cache.invalidate(review['aidantId'])
+        self.cache.set(review['aidantId'], stats, self.cache_ttl)
+        return review, stats, created
+
+    def _add_sync(self, review: dict):
+        transaction = self.db.transaction()
+        transactional = transactional_for(transaction)
+        if transactional is None:
+            raise RuntimeError("Transactions Firestore indisponibles")
+        aidant_id = review['aidantId']
+        review_ref = self.db.collection(REVIEWS_COLLECTION).document(review['id'])
+        stats_ref = self.db.collection(STATS_COLLECTION).document(aidant_id)
+        user_ref = self.db.collection(USERS_COLLECTION).document(aidant_id)
+        reviews_query = self.db.collection(REVIEWS_COLLECTION).where('aidantId', '==', aidant_id)
+
+        @transactional
+        def apply(transaction):
+            # Toutes les lectures avant les écritures
+            existing = review_ref.get(transaction=transaction)
+            stats_snapshot = stats_ref.get(transaction=transaction)
+            user_snapshot = user_ref.get(transaction=transaction)
+            data = stats_snapshot.to_dict() if stats_snapshot.exists else {}
+            stats = normalize_stats(aidant_id, data)
+            if existing.exists:
+                return existing.to_dict(), stats, False
+
+            if not all(field in data for field in AGGREGATE_FIELDS):
+                # Agrégats absents ou antérieurs : recomptés une fois dans `avis`
+                # avant le premier incrément
+                counted = stats_from_reviews(aidant_id, [
+                    {'id': doc.id, **doc.to_dict()} for doc in reviews_query.stream(transaction=transaction)
+                ])
+                if counted['ratingCount'] >= stats['ratingCount']:
+                    stats.update(counted)
+                else:
+                    # Avis historiques absents de `avis` : les totaux existants font foi
+                    stats['histogram'] = counted['histogram']
+                    stats['recentReviews'] = stats['recentReviews'] or counted['recentReviews']
+
+            rating = int(review['rating'])
+            stats['ratingSum'] += rating
+            stats['ratingCount'] += 1
+            stats['histogram'][str(rating)] = stats['histogram'].get(str(rating), 0) + 1
+            stats['averageRating'] = round(stats['ratingSum'] / stats['ratingCount'], 2)
+            stats['recentReviews'] = ([review] + stats.get('recentReviews', []))[:RECENT_REVIEWS]
+            stats['updatedAt'] = review['createdAt']
+
+            transaction.create(review_ref, review)
+            transaction.set(stats_ref, stats)
+            # Jamais de recopie qui ferait disparaître des avis déjà comptés
+            if user_snapshot.exists and stats['ratingCount'] > int(user_snapshot.to_dict().get('totalReviews') or 0):
+                transaction.update(user_ref, {
+                    'averageRating': stats['averageRating'],
+                    'totalReviews': stats['ratingCount'],
+                    'updatedAt': review['createdAt'],
+                })
+            return review, stats, True
+
+        return apply(transaction)
+
+    async def get_stats(self, aidant_id: str) -> dict:
+        """Agrégats et derniers avis d'un aidant : cache mémoire, sinon un seul document."""
+        stats = self.cache.get(aidant_id)
+        if stats is None:
+            generation = self.cache.generation(aidant_id)
+            snapshot = await self.executor.run(
+                self.db.collection(STATS_COLLECTION).document(aidant_id).get,
+                collection=STATS_COLLECTION, operation='get'
+            )
+            data = snapshot.to_dict() if snapshot.exists else {}
+            stats = normalize_stats(aidant_id, data)
+            if 'recentReviews' not in data:
+                # Avis antérieurs aux agrégats dénormalisés : lus dans `avis`
+                stats['recentReviews'] = await self.executor.run(
+                    self._recent_reviews_sync, aidant_id, collection=REVIEWS_COLLECTION, operation='query'
+                )
+            self.cache.set(aidant_id, stats, self.cache_ttl, generation)
+        return stats
+
+    def _recent_reviews_sync(self, aidant_id: str) -> list:
+        query = (
+            self.db.collection(REVIEWS_COLLECTION)
+            .where('aidantId', '==', aidant_id)
+            .order_by('createdAt', direction='DESCENDING')
+            .limit(RECENT_REVIEWS)
+        )
+        return [{'id': doc.id, **doc.to_dict()} for doc in query.stream()]
+
+    def invalidate(self, aidant_id: str):
+        self.cache.invalidate(aidant_id)
+
+    def stats(self) -> dict:
+        return {
+            "created": self.created,
+            "duplicates": self.duplicates,
+            "cached_aidants": len(self.cache),
+        }
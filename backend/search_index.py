@@ -0,0 +1,450 @@
+"""
+Index de recherche des aidants (POST /api/services/search).
+
+Au lieu d'une requête Firestore sur `users` suivie d'un filtrage et d'un tri
+par `averageRating` à chaque appel, `AidantSearchIndex` garde en mémoire :
+
+- la fiche de résultat de chaque aidant recherchable (vérifié, ni supprimé
+  ni suspendu), déjà mise en forme ;
+- un index inversé secteur / genre / spécialité -> liste d'aidants triée
+  par note décroissante ;
+- un index d'intervalles des disponibilités (`availability`) pour le
+  créneau demandé (`jour`, `horaires`) ;
+- une grille spatiale (`geo_index`) pour la recherche par rayon.
+
+Une requête parcourt la plus petite liste concernée, vérifie l'appartenance
+aux autres et s'arrête à la fin de la page : pas de tri à la volée. Avec un
+créneau, les aidants qui le couvrent entièrement passent avant ceux qui le
+couvrent en partie, puis ceux sans disponibilités déclarées ; les autres
+sont écartés. L'index
+est rafraîchi à partir des documents `users` créés ou modifiés depuis le
+dernier filigrane (`createdAt` / `updatedAt`), et reconstruit périodiquement.
+"""
+
+import asyncio
+import bisect
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from availability import AvailabilityIndex, normalize, parse_availability, parse_slot
+from firestore_executor import FirestoreExecutor
+from geo_index import GeoGridIndex, location_of
+
+logger = logging.getLogger(__name__)
+
+USERS_COLLECTION = 'users'
+CHANGE_FIELDS = ('createdAt', 'updatedAt')
+WATERMARK_OVERLAP = timedelta(seconds=5)
+
+DEFAULT_TARIF = 22
+DEFAULT_PHOTO = 'https://images.unsplash.com/photo-1472099645785-5658abf4ff4e?w=300'
+INDIFFERENT = 'indifferent'
+UNDECLARED_TIER = 2
+
+# Clé de tri : note décroissante, puis identifiant
+RankKey = Tuple[float, str]
+# Position dans les résultats : (rang de recouvrement du créneau, clé de tri)
+Cursor = Tuple[int, RankKey]
+
+
+def is_searchable(data: dict) -> bool:
+    return bool(
+        data.get('isAidant') and data.get('isVerified')
+        and not data.get('isDeleted') and not data.get('isSuspended')
+    )
+
+
+def index_terms(data: dict) -> Set[Tuple[str, str]]:
+    terms = {('secteur', normalize(s)) for s in [data.get('secteur'), *(data.get('secteurs') or [])] if s}
+    if data.get('genre'):
+        terms.add(('genre', normalize(data['genre'])))
+    terms.update(('specialite', normalize(s)) for s in data.get('specialites') or [] if s)
+    return terms
+
+
+def to_search_result(doc_id: str, data: dict) -> dict:
+    """Même forme que la route Express historique."""
+    return {
+        'id': doc_id,
+        **data,
+        'nom': data.get('displayName') or 'Aidant',
+        'tarif': data.get('tarifHeure') or DEFAULT_TARIF,
+        'rating': data.get('averageRating') or 0,
+        'nombreAvis': data.get('totalReviews') or 0,
+        'photo': data.get('photoURL') or DEFAULT_PHOTO,
+        'specialites': data.get('specialites') or [],
+        'disponibilites': data.get('disponibilites') or [],
+        'secteurs': [data['secteur']] if data.get('secteur') else [],
+        'avis': [],
+    }
+
+
+def _rank_key(doc_id: str, data: dict) -> RankKey:
+    try:
+        rating = float(data.get('averageRating') or 0)
+    except (TypeError, ValueError):
+        rating = 0.0
+    return (-rating, doc_id)
+
+
+class _Posting:
+    """Liste d'aidants triée par note, doublée d'un ensemble pour les tests d'appartenance."""
+
+    __slots__ = ('keys', 'ids')
+
+    def __init__(self):
+        self.keys: List[RankKey] = []
+        self.ids: Set[str] = set()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key: RankKey):
+        bisect.insort(self.keys, key)
+        self.ids.add(key[1])
+
+    def remove(self, key: RankKey):
+        index = bisect.bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            del self.keys[index]
+        self.ids.discard(key[1])
+
+
+class AidantSearchIndex:
+    def __init__(
+        self,
+        db,
+        executor: FirestoreExecutor,
+        refresh_interval: float = 5.0,
+        full_rebuild_interval: float = 3600.0,
+        geo_cell_km: float = 1.0,
+    ):
+        self.db = db
+        self.executor = executor
+        self.refresh_interval = refresh_interval
+        self.full_rebuild_interval = full_rebuild_interval
+        self.geo_cell_km = geo_cell_km
+
+        self._results: Dict[str, dict] = {}
+        self._keys: Dict[str, RankKey] = {}
+        self._terms: Dict[str, Set[Tuple[str, str]]] = {}
+        self._all = _Posting()
+        self._postings: Dict[Tuple[str, str], _Posting] = {}
+        self._availability = AvailabilityIndex()
+        self._undeclared: Set[str] = set()
+        self._geo = GeoGridIndex(self.geo_cell_km)
+        self._watermarks: Dict[str, datetime] = {}
+        self._loaded = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._last_full_rebuild: Optional[float] = None
+        self._listeners: List[Callable[[str, Optional[dict]], None]] = []
+        # Dernière version appliquée de chaque document `users`
+        self._documents: Dict[str, dict] = {}
+
+        self.queries = 0
+        self.refreshes = 0
+        self.documents_applied = 0
+        self.documents_unchanged = 0
+        self.last_refresh_ms = 0.0
+        self.last_full_rebuild_ms = 0.0
+
+    # -- cycle de vie ---------------------------------------------------------
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="aidant-search-index")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"❌ Erreur rafraîchissement index de recherche: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def ready(self):
+        """Attend le premier chargement (le déclenche si la boucle ne tourne pas)."""
+        if not self._loaded.is_set():
+            await self.refresh()
+
+    def add_listener(self, callback: Callable[[str, Optional[dict]], None]):
+        """`callback(doc_id, data)` est appelé pour chaque document `users` relu."""
+        self._listeners.append(callback)
+
+    # -- chargement -----------------------------------------------------------
+
+    async def refresh(self):
+        async with self._lock:
+            if (self._last_full_rebuild is None
+                    or time.monotonic() - self._last_full_rebuild >= self.full_rebuild_interval):
+                await self._full_rebuild()
+            else:
+                await self._incremental_refresh()
+            self._loaded.set()
+
+    async def _full_rebuild(self):
+        started = time.perf_counter()
+        scan_started = datetime.now(timezone.utc)
+        query = self.db.collection(USERS_COLLECTION).where('isAidant', '==', True)
+        documents = await self.executor.run(
+            lambda: [(doc.id, doc.to_dict()) for doc in query.stream()],
+            collection=USERS_COLLECTION, operation='search_full_scan'
+        )
+
+        self._results, self._keys, self._terms = {}, {}, {}
+        self._all, self._postings, self._watermarks = _Posting(), {}, {}
+        self._availability = AvailabilityIndex()
+        self._undeclared = set()
+        self._geo = GeoGridIndex(self.geo_cell_km)
+        self._documents = {}
+        for doc_id, data in documents:
+            self.apply(doc_id, data)
+        # Sans horodatage observé, les changements sont suivis depuis le scan
+        for field in CHANGE_FIELDS:
+            self._watermarks.setdefault(field, scan_started)
+
+        self._last_full_rebuild = time.monotonic()
+        self.last_full_rebuild_ms = round((time.perf_counter() - started) * 1000, 3)
+        self.documents_applied += len(documents)
+        logger.info(
+            f"✅ Index de recherche reconstruit en {self.last_full_rebuild_ms} ms "
+            f"({len(self._results)} aidants recherchables)"
+        )
+
+    async def _incremental_refresh(self):
+        started = time.perf_counter()
+
+        async def changes(field):
+            since = self._watermarks.get(field)
+            if since is None:
+                return []
+            query = self.db.collection(USERS_COLLECTION).where(field, '>=', since - WATERMARK_OVERLAP)
+            return await self.executor.run(
+                lambda: [(doc.id, doc.to_dict()) for doc in query.stream()],
+                collection=USERS_COLLECTION, operation='search_changes'
+            )
+
+        results = await asyncio.gather(*(changes(field) for field in CHANGE_FIELDS), return_exceptions=True)
+        applied = unchanged = 0
+        for documents in results:
+            if isinstance(documents, Exception):
+                logger.warning(f"⚠️ Changements users illisibles pour l'index: {documents}")
+                continue
+            for doc_id, data in documents:
+                # Le recouvrement relit les derniers documents : sans changement,
+                # ni réindexation ni notification des abonnés
+                if self._documents.get(doc_id) == data:
+                    unchanged += 1
+                    continue
+                self.apply(doc_id, data)
+                applied += 1
+
+        self.refreshes += 1
+        self.documents_applied += applied
+        self.documents_unchanged += unchanged
+        self.last_refresh_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    def apply(self, doc_id: str, data: Optional[dict]):
+        """Met à jour l'index pour un document `users` (None = supprimé)."""
+        # Disponibilités remplacées sur place, sans retrait préalable : le
+        # cache des créneaux n'est invalidé que si elles changent
+        self._unindex(doc_id)
+        for callback in self._listeners:
+            callback(doc_id, data)
+        if not data:
+            self._documents.pop(doc_id, None)
+            self._availability.remove(doc_id)
+            return
+        self._documents[doc_id] = data
+        self._advance_watermarks(data)
+        if not is_searchable(data):
+            self._availability.remove(doc_id)
+            return
+
+        key = _rank_key(doc_id, data)
+        terms = index_terms(data)
+        self._results[doc_id] = to_search_result(doc_id, data)
+        self._keys[doc_id] = key
+        self._terms[doc_id] = terms
+        self._all.add(key)
+        availability = parse_availability(data)
+        self._availability.set(doc_id, availability)
+        if not availability:
+            self._undeclared.add(doc_id)
+        self._geo.set(doc_id, location_of(data))
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = _Posting()
+            posting.add(key)
+
+    def remove(self, doc_id: str):
+        self._unindex(doc_id)
+        self._availability.remove(doc_id)
+
+    def _unindex(self, doc_id: str):
+        key = self._keys.pop(doc_id, None)
+        if key is None:
+            return
+        del self._results[doc_id]
+        self._all.remove(key)
+        self._undeclared.discard(doc_id)
+        self._geo.remove(doc_id)
+        for term in self._terms.pop(doc_id):
+            posting = self._postings[term]
+            posting.remove(key)
+            if not posting:
+                del self._postings[term]
+
+    def _advance_watermarks(self, data: dict):
+        for field in CHANGE_FIELDS:
+            value = data.get(field)
+            if isinstance(value, datetime):
+                if value.tzinfo is None:
+                    value = value.replace(tzinfo=timezone.utc)
+                current = self._watermarks.get(field)
+                if current is None or value > current:
+                    self._watermarks[field] = value
+
+    # -- recherche ------------------------------------------------------------
+
+    def search(
+        self,
+        secteur: Optional[str] = None,
+        genre: Optional[str] = None,
+        specialites: Iterable[str] = (),
+        jour: Optional[str] = None,
+        horaires: Optional[str] = None,
+        limit: int = 20,
+        after: Optional[Cursor] = None,
+    ) -> Tuple[List[dict], int, Optional[Cursor]]:
+        """
+        Retourne (page, total, position du dernier élément si une page suit).
+        `after` est la position retournée par la page précédente.
+        """
+        self.queries += 1
+        postings = self._postings_for(secteur, genre, specialites)
+        if postings is None:
+            return [], 0, None
+        postings.sort(key=len)
+        driver = postings[0] if postings else self._all
+        others = [posting.ids for posting in postings[1:]]
+
+        slot = parse_slot(jour, horaires)
+        match = self._availability.match(*slot) if slot else None
+        if match is None:
+            tiers = [None]
+        else:
+            # Couvre tout le créneau, en partie, ou disponibilités non déclarées
+            tiers = [match.full, match.partial, self._undeclared]  # UNDECLARED_TIER en dernier
+
+        total = 0
+        page_keys: List[Cursor] = []
+        for tier, members in enumerate(tiers):
+            sets = others + ([members] if members is not None else [])
+            if not sets:
+                matches = None
+                total += len(driver)
+            else:
+                matches = driver.ids.intersection(*sets)
+                total += len(matches)
+            if len(page_keys) > limit or (after and tier < after[0]):
+                continue
+            start = bisect.bisect_right(driver.keys, after[1]) if after and tier == after[0] else 0
+            if matches is None:
+                page_keys.extend((tier, key) for key in driver.keys[start:start + limit + 1])
+                continue
+            for index in range(start, len(driver.keys)):
+                key = driver.keys[index]
+                if key[1] in matches:
+                    page_keys.append((tier, key))
+                    if len(page_keys) > limit:
+                        break
+
+        has_more = len(page_keys) > limit
+        page_keys = page_keys[:limit]
+        page = []
+        for tier, key in page_keys:
+            result = self._results[key[1]]
+            if match is not None:
+                # None : disponibilités non déclarées
+                minutes = self._availability.overlap(key[1], *slot) if tier < UNDECLARED_TIER else None
+                result = {**result, 'recouvrementMinutes': minutes}
+            page.append(result)
+        return page, total, (page_keys[-1] if has_more and page_keys else None)
+
+    def nearby(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        secteur: Optional[str] = None,
+        genre: Optional[str] = None,
+        specialites: Iterable[str] = (),
+        jour: Optional[str] = None,
+        horaires: Optional[str] = None,
+        limit: int = 20,
+    ) -> List[dict]:
+        """Aidants les plus proches dans le rayon, avec les mêmes filtres que `search`."""
+        self.queries += 1
+        postings = self._postings_for(secteur, genre, specialites)
+        if postings is None:
+            return []
+        filters = sorted((posting.ids for posting in postings), key=len)
+        slot = parse_slot(jour, horaires)
+        if slot:
+            match = self._availability.match(*slot)
+            # Créneau couvert en tout ou partie, ou disponibilités non déclarées
+            slot_sets = [match.full, match.partial, self._undeclared]
+        else:
+            slot_sets = None
+
+        def accept(aidant_id: str) -> bool:
+            if not all(aidant_id in ids for ids in filters):
+                return False
+            return slot_sets is None or any(aidant_id in ids for ids in slot_sets)
+
+        nearest = self._geo.nearest(latitude, longitude, radius_km, limit, accept if filters or slot_sets else None)
+        return [
+            {**self._results[aidant_id], 'distanceKm': round(distance, 2)}
+            for distance, aidant_id in nearest
+        ]
+
+    def _postings_for(self, secteur, genre, specialites) -> Optional[List[_Posting]]:
+        """Listes concernées par les critères ; None si l'un d'eux ne correspond à personne."""
+        terms = []
+        if secteur:
+            terms.append(('secteur', normalize(secteur)))
+        if genre and normalize(genre) != INDIFFERENT:
+            terms.append(('genre', normalize(genre)))
+        terms.extend(('specialite', normalize(s)) for s in specialites if s)
+        postings = [self._postings.get(term) for term in terms]
+        if any(posting is None for posting in postings):
+            return None
+        return postings
+
+    def stats(self) -> dict:
+        return {
+            "aidants": len(self._results),
+            "terms": len(self._postings),
+            "with_availability": len(self._availability),
+            "with_location": len(self._geo),
+            "queries": self.queries,
+            "refreshes": self.refreshes,
+            "documents_applied": self.documents_applied,
+            "documents_unchanged": self.documents_unchanged,
+            "last_refresh_ms": self.last_refresh_ms,
+            "last_full_rebuild_ms": self.last_full_rebuild_ms,
+        }
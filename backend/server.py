@@ -1,22 +1,47 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
 import os
+import asyncio
+import json
+import base64
 import logging
+import time
+import importlib.util
 from pathlib import Path
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError, field_serializer
 from typing import List, Optional
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 from contextlib import asynccontextmanager
 
-# Firebase Admin SDK
-try:
-    import firebase_admin
-    from firebase_admin import credentials, firestore
-    FIREBASE_AVAILABLE = True
-except ImportError:
-    FIREBASE_AVAILABLE = False
+from connection import DatabaseConnection, DatabaseUnavailable
+from resilience import CircuitBreaker, ResilientExecutor, is_transient
+from memory_store import InMemoryFirestore
+from repository import FirestoreStatusRepository, StatusRepository
+from batching import FIRESTORE_BATCH_LIMIT
+from write_behind import WriteBehindBuffer
+from health import HealthMonitor
+from statistics_service import StatsEngine
+from search_index import AidantSearchIndex
+from reviews import ReviewService, review_to_json
+from profiles import ProfileService
+import conversations
+from conversations import position_of
+from realtime import create_hub
+from chat import ChatWriter
+from status_rollups import StatusRollups
+import fastjson
+from fastjson import FastJSONResponse
+from cache import LRUCache, NamespacedCache
+from generations import GenerationCounters
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY, PrometheusMiddleware
+
+# Firebase Admin SDK : importé à la connexion (en tâche de fond), pas au démarrage
+FIREBASE_AVAILABLE = importlib.util.find_spec('firebase_admin') is not None
+if not FIREBASE_AVAILABLE:
     print("⚠️ firebase-admin non installé. Installez avec: pip install firebase-admin")
 
 ROOT_DIR = Path(__file__).parent
@@ -29,20 +54,35 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Firebase initialization
-db = None
+# Sélection du stockage : Firestore (défaut) ou client en mémoire
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'firestore').lower()
+STORAGE_FALLBACK = os.environ.get('STORAGE_FALLBACK', '').lower()
+
+# Le stockage en mémoire reproduit les index composites déployés sur Firestore
+FIRESTORE_INDEXES_PATH = ROOT_DIR.parent / 'firestore.indexes.json'
+
+def connect_memory() -> InMemoryFirestore:
+    memory_db = InMemoryFirestore()
+    if FIRESTORE_INDEXES_PATH.exists():
+        logger.info(f"🗂️ {memory_db.load_indexes(FIRESTORE_INDEXES_PATH)} index composites chargés")
+    return memory_db
+
+def connect_firestore():
+    """Initialise Firebase Admin et crée le client (sur le pool, depuis le lifespan)"""
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    firebase_project_id = os.environ.get('FIREBASE_PROJECT_ID')
+    if not firebase_project_id:
+        raise ValueError("FIREBASE_PROJECT_ID n'est pas défini")
 
-if FIREBASE_AVAILABLE:
     try:
-        # Initialiser Firebase Admin
-        firebase_project_id = os.environ.get('FIREBASE_PROJECT_ID')
-        
-        if not firebase_project_id:
-            raise ValueError("FIREBASE_PROJECT_ID n'est pas défini")
-        
+        # Application déjà initialisée par une tentative précédente
+        firebase_admin.get_app()
+    except ValueError:
         # Vérifier si service-account.json existe
         service_account_path = ROOT_DIR / 'service-account.json'
-        
+
         if service_account_path.exists():
             # Utiliser le fichier service account
             cred = credentials.Certificate(str(service_account_path))
@@ -52,39 +92,264 @@ if FIREBASE_AVAILABLE:
             # Utiliser les credentials par défaut (utile en production avec variables d'environnement)
             firebase_admin.initialize_app()
             logger.info("✅ Firebase initialisé avec credentials par défaut")
-        
-        db = firestore.client()
-        logger.info(f"✅ Firestore connecté au projet: {firebase_project_id}")
-        
-    except Exception as e:
-        logger.error(f"❌ Erreur lors de l'initialisation de Firebase: {e}")
-        logger.warning("⚠️ L'application démarrera sans base de données")
+
+    client = firestore.client()
+    logger.info(f"✅ Firestore connecté au projet: {firebase_project_id}")
+    return client
+
+def close_firestore(client):
+    if isinstance(client, InMemoryFirestore):
+        return
+    import firebase_admin
+    firebase_admin.delete_app(firebase_admin.get_app())
+    logger.info("✅ Firebase Admin fermé proprement")
+
+# Plusieurs workers (voir launcher.py) : générations de cache partagées par
+# fichier, pour qu'une écriture invalide les caches de tous les workers
+WORKER_GENERATIONS_FILE = os.environ.get('WORKER_GENERATIONS_FILE')
+cache_generations = GenerationCounters(WORKER_GENERATIONS_FILE) if WORKER_GENERATIONS_FILE else None
+# Préchauffage avant d'accepter du trafic (connexion, index, statistiques)
+WORKER_WARMUP = os.environ.get('WORKER_WARMUP', 'false').lower() in ('1', 'true', 'yes')
+WORKER_WARMUP_TIMEOUT = float(os.environ.get('WORKER_WARMUP_TIMEOUT', 30))
+
+# Pool dédié aux appels Firestore (le SDK est synchrone), avec délais,
+# nouvelles tentatives des lectures et disjoncteur
+db_executor = ResilientExecutor(
+    breaker=CircuitBreaker(
+        failure_ratio=float(os.environ.get('FIRESTORE_BREAKER_FAILURE_RATIO', 0.5)),
+        min_calls=int(os.environ.get('FIRESTORE_BREAKER_MIN_CALLS', 20)),
+        window=float(os.environ.get('FIRESTORE_BREAKER_WINDOW', 30)),
+        open_for=float(os.environ.get('FIRESTORE_BREAKER_OPEN_SECONDS', 10))
+    ),
+    read_deadline=float(os.environ.get('FIRESTORE_READ_DEADLINE', 5)),
+    write_deadline=float(os.environ.get('FIRESTORE_WRITE_DEADLINE', 10)),
+    scan_deadline=float(os.environ.get('FIRESTORE_SCAN_DEADLINE', 120)),
+    max_attempts=int(os.environ.get('FIRESTORE_READ_ATTEMPTS', 3))
+)
+logger.info(f"🧵 Pool Firestore: {db_executor.max_workers} threads")
+
+# Connexion établie en tâche de fond depuis le lifespan : `db` est faux
+# (routes en 503) jusqu'à ce qu'elle aboutisse
+db: Optional[DatabaseConnection] = None
+DB_RETRY = dict(
+    retry_initial=float(os.environ.get('FIRESTORE_CONNECT_RETRY_INITIAL', 1)),
+    retry_max=float(os.environ.get('FIRESTORE_CONNECT_RETRY_MAX', 30))
+)
+
+if STORAGE_BACKEND == 'memory':
+    db = DatabaseConnection(connect_memory, db_executor, **DB_RETRY)
+    db.connect_now()
+    logger.info("🧪 Stockage en mémoire (STORAGE_BACKEND=memory)")
+elif FIREBASE_AVAILABLE:
+    db = DatabaseConnection(
+        connect_firestore,
+        db_executor,
+        fallback=connect_memory if STORAGE_FALLBACK == 'memory' else None,
+        close=close_firestore,
+        **DB_RETRY
+    )
+elif STORAGE_FALLBACK == 'memory':
+    db = DatabaseConnection(connect_memory, db_executor, **DB_RETRY)
+    logger.warning("⚠️ Firebase Admin SDK non disponible : repli sur le stockage en mémoire (STORAGE_FALLBACK=memory)")
 else:
     logger.warning("⚠️ Firebase Admin SDK non disponible")
+    logger.warning("⚠️ L'application démarrera sans base de données")
+
+status_repository: Optional[StatusRepository] = FirestoreStatusRepository(db, db_executor) if db is not None else None
+
+# Écriture différée optionnelle des status checks
+STATUS_WRITE_BEHIND = os.environ.get('STATUS_WRITE_BEHIND', 'false').lower() in ('1', 'true', 'yes')
+
+# Cache des pages de GET /api/status, invalidé à chaque écriture
+status_cache = NamespacedCache(
+    LRUCache(int(os.environ.get('STATUS_CACHE_MAX_ENTRIES', 256)), name="status"),
+    "status",
+    ttl=float(os.environ.get('STATUS_CACHE_TTL', 30)),
+    generations=cache_generations
+)
+
+async def flush_status_checks(documents):
+    errors = await status_repository.add_many(documents)
+    status_cache.invalidate()
+    return errors
+
+# Statistiques agrégées de façon incrémentale
+stats_engine = StatsEngine(
+    db,
+    db_executor,
+    refresh_interval=float(os.environ.get('STATS_REFRESH_INTERVAL', 10)),
+    full_rebuild_interval=float(os.environ.get('STATS_FULL_REBUILD_INTERVAL', 3600))
+) if db is not None else None
+
+# Index de recherche des aidants, rafraîchi depuis `users`
+aidant_search_index = AidantSearchIndex(
+    db,
+    db_executor,
+    refresh_interval=float(os.environ.get('SEARCH_INDEX_REFRESH_INTERVAL', 5)),
+    full_rebuild_interval=float(os.environ.get('SEARCH_INDEX_FULL_REBUILD_INTERVAL', 3600)),
+    geo_cell_km=float(os.environ.get('SEARCH_GEO_CELL_KM', 1))
+) if db is not None else None
+
+# Avis et agrégats de notes par aidant
+review_service = ReviewService(
+    db,
+    db_executor,
+    cache_entries=int(os.environ.get('REVIEW_CACHE_MAX_ENTRIES', 1000)),
+    cache_ttl=float(os.environ.get('REVIEW_CACHE_TTL', 60)),
+    generations=cache_generations
+) if db is not None else None
+
+# Profils aidants : cache par aidant et chargements simultanés mutualisés
+profile_service = ProfileService(
+    db,
+    db_executor,
+    review_service,
+    cache_entries=int(os.environ.get('PROFILE_CACHE_MAX_ENTRIES', 1000)),
+    cache_ttl=float(os.environ.get('PROFILE_CACHE_TTL', 60)),
+    generations=cache_generations
+) if db is not None else None
+# Diffusion en direct : une source Firestore par sujet, partagée par les clients
+realtime_hub = create_hub(
+    db,
+    db_executor,
+    queue_size=int(os.environ.get('REALTIME_QUEUE_SIZE', 100))
+) if db is not None else None
+# Messages de chat (WebSocket) écrits par lots avec la conversation
+chat_writer = ChatWriter(
+    db,
+    db_executor,
+    window=float(os.environ.get('CHAT_BATCH_WINDOW', 0.02)),
+    metadata_interval=float(os.environ.get('CHAT_METADATA_INTERVAL', 1))
+) if db is not None else None
+if profile_service:
+    # Profil modifié dans `users` : vu au rafraîchissement de l'index de recherche
+    aidant_search_index.add_listener(profile_service.user_changed)
+
+health_monitor = HealthMonitor(
+    lambda: status_repository.probe(),
+    interval=float(os.environ.get('HEALTH_PROBE_INTERVAL', 10)),
+    timeout=float(os.environ.get('HEALTH_PROBE_TIMEOUT', 2)),
+    ttl=float(os.environ.get('HEALTH_CACHE_TTL', 30))
+)
+
+# Agrégats minute/heure/jour des status checks et conservation des documents bruts
+status_rollups = StatusRollups(
+    db,
+    db_executor,
+    status_repository,
+    interval=float(os.environ.get('STATUS_ROLLUP_INTERVAL', 60)),
+    lag=float(os.environ.get('STATUS_ROLLUP_LAG', 60)),
+    retention_days=float(os.environ.get('STATUS_RETENTION_DAYS', 0)),
+    on_prune=status_cache.invalidate
+) if db is not None else None
+
+status_buffer = None
+if STATUS_WRITE_BEHIND:
+    status_buffer = WriteBehindBuffer(
+        flush_status_checks,
+        max_size=int(os.environ.get('STATUS_WRITE_BEHIND_QUEUE_SIZE', 10000)),
+        flush_size=int(os.environ.get('STATUS_WRITE_BEHIND_FLUSH_SIZE', FIRESTORE_BATCH_LIMIT)),
+        flush_interval=float(os.environ.get('STATUS_WRITE_BEHIND_FLUSH_INTERVAL', 0.5)),
+        name="status-write-behind"
+    )
 
 # Lifespan context manager
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 Démarrage de l'application")
+    if status_buffer:
+        status_buffer.start()
+    if db is not None:
+        # Tâches qui lisent la base : lancées une fois la connexion établie
+        db.on_ready(stats_engine.start)
+        db.on_ready(aidant_search_index.start)
+        db.on_ready(status_rollups.start)
+        db.start()
+        health_monitor.start()
+        if WORKER_WARMUP:
+            await warm_up()
     yield
     # Shutdown
     logger.info("🛑 Arrêt de l'application")
-    if FIREBASE_AVAILABLE:
-        try:
-            firebase_admin.delete_app(firebase_admin.get_app())
-            logger.info("✅ Firebase Admin fermé proprement")
-        except:
-            pass
+    await health_monitor.stop()
+    if stats_engine:
+        await stats_engine.stop()
+    if aidant_search_index:
+        await aidant_search_index.stop()
+    if status_rollups:
+        await status_rollups.stop()
+    if chat_writer:
+        await chat_writer.stop()
+    if status_buffer:
+        await status_buffer.stop()
+    if db is not None:
+        await db.stop()
+    db_executor.shutdown()
+    if cache_generations:
+        cache_generations.close()
+
+async def warm_up():
+    """
+    Préchauffage du worker : le serveur n'accepte des connexions qu'après
+    le démarrage du lifespan, donc les premières requêtes trouvent l'index
+    de recherche, l'instantané des statistiques et la sonde de santé prêts.
+    Borné par WORKER_WARMUP_TIMEOUT : une base injoignable ne bloque pas le
+    démarrage (les routes répondent 503 en attendant).
+    """
+    started = time.perf_counter()
+    deadline = started + WORKER_WARMUP_TIMEOUT
+    if not await db.wait(WORKER_WARMUP_TIMEOUT):
+        logger.warning(f"⚠️ Préchauffage: base non connectée après {WORKER_WARMUP_TIMEOUT}s")
+        return
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(
+                aidant_search_index.ready(),
+                stats_engine.get_snapshot(),
+                health_monitor.probe_once()
+            ),
+            max(deadline - time.perf_counter(), 0)
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ Préchauffage incomplet: {e!r}")
+        return
+    logger.info(f"🔥 Worker {os.getpid()} préchauffé en {(time.perf_counter() - started) * 1000:.0f} ms")
 
 # Create the main app with lifespan
 app = FastAPI(
     title="API Mise en Relation",
     description="API pour l'application A La Case Nout Gramoun",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
+@app.exception_handler(DatabaseUnavailable)
+async def database_unavailable_handler(request: Request, exc: DatabaseUnavailable):
+    """Base indisponible non interceptée par la route : 503 plutôt que 500"""
+    return JSONResponse(status_code=503, content={"detail": "Base de données non disponible"})
+
+# Pagination des status checks
+STATUS_PAGE_SIZE_MAX = 1000
+STATUS_STREAM_PAGE_SIZE = 500
+STATUS_BATCH_MAX_ITEMS = 10000
+STATUS_ROLLUP_MAX_BUCKETS = 10000
+
+# Fenêtre maximale des séries statistiques (mois)
+STATS_SERIES_MONTHS_MAX = 60
+
+# Pagination de la recherche d'aidants
+SEARCH_PAGE_SIZE_DEFAULT = 50
+SEARCH_PAGE_SIZE_MAX = 200
+SEARCH_RADIUS_KM_MAX = 200
+
+# Historique des messages et diffusion en direct
+MESSAGES_PAGE_SIZE_DEFAULT = 50
+MESSAGES_PAGE_SIZE_MAX = 200
+MESSAGES_WAIT_MAX_S = 30
+REALTIME_HEARTBEAT_S = float(os.environ.get('REALTIME_HEARTBEAT', 15))
+
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
@@ -94,21 +359,104 @@ class StatusCheck(BaseModel):
     client_name: str
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    @field_serializer('timestamp')
+    def serialize_timestamp(self, value: datetime) -> str:
+        return value.isoformat()
 
 class StatusCheckCreate(BaseModel):
     client_name: str
 
+class StatusBatchItemResult(BaseModel):
+    index: int
+    success: bool
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+class StatusBatchResult(BaseModel):
+    created: int
+    failed: int
+    batches: int
+    results: List[StatusBatchItemResult]
+
+class ServiceSearchRequest(BaseModel):
+    secteur: Optional[str] = None
+    jour: Optional[str] = None
+    horaires: Optional[str] = None
+    etatCivil: Optional[str] = None
+    preferenceAidant: Optional[str] = None
+    specialites: List[str] = Field(default_factory=list)
+    limit: int = Field(SEARCH_PAGE_SIZE_DEFAULT, ge=1, le=SEARCH_PAGE_SIZE_MAX)
+    cursor: Optional[str] = None
+
+class NearbySearchRequest(BaseModel):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    rayonKm: float = Field(10, gt=0, le=SEARCH_RADIUS_KM_MAX)
+    secteur: Optional[str] = None
+    jour: Optional[str] = None
+    horaires: Optional[str] = None
+    preferenceAidant: Optional[str] = None
+    specialites: List[str] = Field(default_factory=list)
+    limit: int = Field(SEARCH_PAGE_SIZE_DEFAULT, ge=1, le=SEARCH_PAGE_SIZE_MAX)
+
+class ChatMessageIn(BaseModel):
+    texte: str = Field(..., min_length=1, max_length=5000)
+    expediteurId: Optional[str] = None
+    clientMessageId: Optional[str] = Field(None, max_length=100)
+
+class ReviewCreate(BaseModel):
+    aidantId: str = Field(..., min_length=1)
+    rating: int = Field(..., ge=1, le=5)
+    comment: Optional[str] = Field(None, max_length=2000)
+    clientId: Optional[str] = None
+    clientName: Optional[str] = None
+    serviceId: Optional[str] = None
+
+def review_stats_to_json(stats: dict) -> dict:
+    return {
+        "aidantId": stats.get('aidantId'),
+        "averageRating": stats.get('averageRating', 0),
+        "totalReviews": stats.get('ratingCount', 0),
+        "histogram": stats.get('histogram', {}),
+        "avis": [review_to_json(review) for review in stats.get('recentReviews', [])]
+    }
+
+def status_document_to_json(data: dict) -> dict:
+    """
+    Projette un document `status_checks` sur les champs de StatusCheck.
+
+    Les documents ont été validés à l'écriture : la réponse est construite
+    directement, sans repasser par le modèle Pydantic.
+    """
+    timestamp = data.get('timestamp')
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.isoformat()
+    return {"id": data.get('id'), "client_name": data.get('client_name'), "timestamp": timestamp}
+
+def status_to_document(status_obj: StatusCheck) -> dict:
+    """Convertit un StatusCheck en document Firestore (timestamp ISO)"""
+    status_dict = status_obj.model_dump()
+    if isinstance(status_dict.get('timestamp'), datetime):
+        status_dict['timestamp'] = status_dict['timestamp'].isoformat()
+    return status_dict
+
+def storage_label() -> str:
+    if not db:
+        return "Non connectée"
+    return "Mémoire (local)" if isinstance(db.client, InMemoryFirestore) else "Firebase Firestore"
+
+def error_status(e: Exception) -> int:
+    """503 si la base est indisponible (non connectée, délai dépassé, disjoncteur ouvert,
+    erreur transitoire), 500 sinon"""
+    return 503 if isinstance(e, DatabaseUnavailable) or is_transient(e) else 500
+
 # Routes
 @api_router.get("/")
 async def root():
     return {
         "message": "API Mise en Relation - Bienvenue",
         "version": "1.0.0",
-        "database": "Firebase Firestore" if db else "Non connectée"
+        "database": storage_label()
     }
 
 @api_router.post("/status", response_model=StatusCheck)
@@ -119,18 +467,25 @@ async def create_status_check(input: StatusCheckCreate):
             detail="Base de données non disponible"
         )
     
+    if status_buffer:
+        # Mode write-behind : acquittement dès la mise en file
+        status_obj = StatusCheck(**input.model_dump())
+        if not status_buffer.offer((status_obj.id, status_to_document(status_obj))):
+            raise HTTPException(
+                status_code=503,
+                detail="File d'écriture saturée, réessayez plus tard",
+                headers={"Retry-After": "1"}
+            )
+        return status_obj
+    
     try:
         # Créer l'objet status
         status_obj = StatusCheck(**input.model_dump())
-        status_dict = status_obj.model_dump()
-        
-        # Convertir datetime en string pour Firestore
-        if isinstance(status_dict.get('timestamp'), datetime):
-            status_dict['timestamp'] = status_dict['timestamp'].isoformat()
+        status_dict = status_to_document(status_obj)
         
         # Enregistrer dans Firestore
-        doc_ref = db.collection('status_checks').document(status_obj.id)
-        doc_ref.set(status_dict)
+        await status_repository.add(status_dict)
+        status_cache.invalidate()
         
         logger.info(f"✅ Status check créé: {status_obj.id}")
         return status_obj
@@ -138,43 +493,739 @@ async def create_status_check(input: StatusCheckCreate):
     except Exception as e:
         logger.error(f"❌ Erreur lors de la création du status check: {e}")
         raise HTTPException(
-            status_code=500,
+            status_code=error_status(e),
             detail=f"Erreur lors de la création: {str(e)}"
         )
 
+def parse_status_batch_body(body: bytes, content_type: str) -> list:
+    """Décode un corps JSON (liste) ou NDJSON (un objet par ligne)"""
+    if 'ndjson' in content_type:
+        items = []
+        for line in body.decode('utf-8').splitlines():
+            line = line.strip()
+            if line:
+                items.append(json.loads(line))
+        return items
+    items = json.loads(body or b'[]')
+    if not isinstance(items, list):
+        raise ValueError("Le corps doit être une liste de status checks")
+    return items
+
+@api_router.post("/status/batch", response_model=StatusBatchResult)
+async def create_status_checks_batch(request: Request):
+    """
+    Création groupée de status checks.
+
+    Accepte une liste JSON de `StatusCheckCreate` ou un corps NDJSON
+    (`application/x-ndjson`). Les écritures sont regroupées en WriteBatch
+    de 500 documents validés en parallèle ; le résultat est donné par élément.
+    """
+    if not db:
+        raise HTTPException(
+            status_code=503,
+            detail="Base de données non disponible"
+        )
+    
+    try:
+        raw_items = parse_status_batch_body(
+            await request.body(),
+            request.headers.get('content-type', '')
+        )
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Corps invalide: {str(e)}")
+    
+    if len(raw_items) > STATUS_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Maximum {STATUS_BATCH_MAX_ITEMS} status checks par requête"
+        )
+    
+    results: List[Optional[StatusBatchItemResult]] = [None] * len(raw_items)
+    documents = []
+    positions = []
+    for index, raw in enumerate(raw_items):
+        try:
+            status_obj = StatusCheck(**StatusCheckCreate.model_validate(raw).model_dump())
+        except ValidationError as e:
+            message = "; ".join(
+                f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()
+            )
+            results[index] = StatusBatchItemResult(index=index, success=False, error=message)
+            continue
+        documents.append((status_obj.id, status_to_document(status_obj)))
+        positions.append(index)
+    
+    errors = await status_repository.add_many(documents)
+    if documents:
+        status_cache.invalidate()
+    
+    for index, (doc_id, _), error in zip(positions, documents, errors):
+        results[index] = StatusBatchItemResult(
+            index=index,
+            success=error is None,
+            id=doc_id if error is None else None,
+            error=error
+        )
+    
+    created = sum(1 for result in results if result.success)
+    logger.info(f"✅ Batch status checks: {created}/{len(results)} créés")
+    return StatusBatchResult(
+        created=created,
+        failed=len(results) - created,
+        batches=-(-len(documents) // FIRESTORE_BATCH_LIMIT),
+        results=results
+    )
+
+def encode_status_cursor(data: dict) -> str:
+    """Encode la position (timestamp, id) du dernier document d'une page"""
+    timestamp = data.get('timestamp')
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.isoformat()
+    payload = json.dumps({"t": timestamp, "id": data.get('id')}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_status_cursor(cursor: str) -> dict:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return {"timestamp": payload["t"], "id": payload["id"]}
+    except Exception:
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+
+def status_filter_timestamp(value: Optional[datetime]) -> Optional[str]:
+    """Borne de fenêtre au format stocké : ISO en UTC sans fuseau"""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+async def stream_status_checks(page_size: int, cursor: Optional[dict], filters: dict):
+    """Générateur NDJSON : une page en mémoire à la fois"""
+    total = 0
+    while True:
+        try:
+            page = await status_repository.page(page_size, cursor, **filters)
+        except Exception as e:
+            logger.error(f"❌ Erreur pendant le streaming des status checks: {e}")
+            return
+        for data in page:
+            yield fastjson.dumps(status_document_to_json(data)) + b"\n"
+        total += len(page)
+        if len(page) < page_size:
+            break
+        cursor = {"timestamp": page[-1].get('timestamp'), "id": page[-1].get('id')}
+    logger.info(f"✅ {total} status checks streamés")
+
 @api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
+async def get_status_checks(
+    page_size: int = Query(STATUS_PAGE_SIZE_MAX, ge=1, le=STATUS_PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    client_name: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    order: str = Query("asc", pattern="^(asc|desc)$")
+):
+    """
+    Liste paginée des status checks.
+
+    Le curseur de la page suivante est renvoyé dans l'en-tête `X-Next-Cursor`.
+    Avec `format=ndjson`, toute la collection est streamée à partir du curseur.
+    `client_name`, `since` (inclus) et `until` (exclu) restreignent la liste
+    via les index composites (client_name, timestamp) ; `order=desc` part des
+    plus récents.
+    """
     if not db:
         raise HTTPException(
             status_code=503,
             detail="Base de données non disponible"
         )
     
+    start = decode_status_cursor(cursor) if cursor else None
+    filters = {
+        "client_name": client_name,
+        "since": status_filter_timestamp(since),
+        "until": status_filter_timestamp(until),
+        "descending": order == "desc",
+    }
+
+    if format == "ndjson":
+        return StreamingResponse(
+            stream_status_checks(min(page_size, STATUS_STREAM_PAGE_SIZE), start, filters),
+            media_type="application/x-ndjson"
+        )
+
+    async def load_page():
+        docs = await status_repository.page(page_size, start, **filters)
+        # Corps déjà encodé : mis en cache tel quel, sans double validation
+        body = fastjson.dumps([status_document_to_json(data) for data in docs])
+        next_cursor = encode_status_cursor(docs[-1]) if len(docs) == page_size else None
+        logger.info(f"✅ {len(docs)} status checks récupérés")
+        return body, next_cursor
+
     try:
-        # Récupérer tous les status checks depuis Firestore
-        docs = db.collection('status_checks').limit(1000).stream()
-        
-        status_checks = []
-        for doc in docs:
-            data = doc.to_dict()
-            # Convertir la string timestamp en datetime si nécessaire
-            if isinstance(data.get('timestamp'), str):
-                data['timestamp'] = datetime.fromisoformat(data['timestamp'])
-            status_checks.append(StatusCheck(**data))
-        
-        logger.info(f"✅ {len(status_checks)} status checks récupérés")
-        return status_checks
+        body, next_cursor = await status_cache.get_or_load(
+            json.dumps([page_size, cursor, filters], separators=(',', ':')), load_page
+        )
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+        return Response(content=body, media_type="application/json", headers=headers)
         
     except Exception as e:
         logger.error(f"❌ Erreur lors de la récupération: {e}")
         raise HTTPException(
-            status_code=500,
+            status_code=error_status(e),
             detail=f"Erreur lors de la récupération: {str(e)}"
         )
 
+@api_router.get("/status/rollups")
+async def get_status_rollups(
+    since: datetime,
+    until: Optional[datetime] = None,
+    client_name: Optional[str] = None,
+    resolution: Optional[str] = Query(None, pattern="^(minute|hour|day)$")
+):
+    """
+    Nombre de status checks par client et par intervalle sur [since, until).
+
+    Sans `resolution`, la plus fine (minute, heure, jour) qui tient dans
+    STATUS_ROLLUP_MAX_BUCKETS intervalles est choisie ; les intervalles pas
+    encore agrégés sont calculés à partir des documents bruts.
+    """
+    if not db:
+        raise HTTPException(
+            status_code=503,
+            detail="Base de données non disponible"
+        )
+
+    try:
+        return await status_rollups.query(
+            since,
+            until or datetime.now(timezone.utc),
+            client_name=client_name,
+            resolution=resolution,
+            max_buckets=STATUS_ROLLUP_MAX_BUCKETS
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Erreur lors de la lecture des agrégats: {e}")
+        raise HTTPException(
+            status_code=error_status(e),
+            detail=f"Erreur lors de la récupération: {str(e)}"
+        )
+
+def encode_search_cursor(position: tuple) -> str:
+    """Encode la position (rang de créneau, note, id) du dernier aidant d'une page"""
+    tier, (rating, aidant_id) = position
+    payload = json.dumps({"s": tier, "r": rating, "id": aidant_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_search_cursor(cursor: str) -> tuple:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (int(payload.get("s", 0)), (float(payload["r"]), str(payload["id"])))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+
+@api_router.post("/services/search")
+async def search_aidants(criteres: ServiceSearchRequest):
+    """Recherche d'aidants servie par l'index en mémoire (créneau, puis note)"""
+    if not db:
+        raise HTTPException(
+            status_code=503,
+            detail="Base de données non disponible"
+        )
+    
+    after = decode_search_cursor(criteres.cursor) if criteres.cursor else None
+    try:
+        await aidant_search_index.ready()
+    except Exception as e:
+        logger.error(f"❌ Erreur recherche aidants: {e}")
+        raise HTTPException(
+            status_code=error_status(e),
+            detail="Erreur lors de la recherche"
+        )
+    
+    results, total, last_key = aidant_search_index.search(
+        secteur=criteres.secteur,
+        genre=criteres.preferenceAidant,
+        specialites=criteres.specialites,
+        jour=criteres.jour,
+        horaires=criteres.horaires,
+        limit=criteres.limit,
+        after=after
+    )
+    return {
+        "success": True,
+        "results": results,
+        "count": total,
+        "nextCursor": encode_search_cursor(last_key) if last_key else None,
+        "criteres": criteres.model_dump(include={'secteur', 'jour', 'horaires', 'etatCivil', 'preferenceAidant'})
+    }
+
+@api_router.post("/services/search/nearby")
+async def search_aidants_nearby(criteres: NearbySearchRequest):
+    """Aidants les plus proches du client dans un rayon donné"""
+    if not db:
+        raise HTTPException(
+            status_code=503,
+            detail="Base de données non disponible"
+        )
+    
+    try:
+        await aidant_search_index.ready()
+    except Exception as e:
+        logger.error(f"❌ Erreur recherche aidants par rayon: {e}")
+        raise HTTPException(
+            status_code=error_status(e),
+            detail="Erreur lors de la recherche"
+        )
+    
+    results = aidant_search_index.nearby(
+        criteres.latitude,
+        criteres.longitude,
+        criteres.rayonKm,
+        secteur=criteres.secteur,
+        genre=criteres.preferenceAidant,
+        specialites=criteres.specialites,
+        jour=criteres.jour,
+        horaires=criteres.horaires,
+        limit=criteres.limit
+    )
+    return {
+        "success": True,
+        "results": results,
+        "count": len(results),
+        "criteres": criteres.model_dump(exclude={'specialites', 'limit'})
+    }
+
+@api_router.get("/services/profile/{aidant_id}")
+async def get_aidant_profile(aidant_id: str):
+    """Profil d'un aidant et derniers avis (cache par aidant, lectures mutualisées)"""
+    if not db:
+        raise HTTPException(
+            status_code=503,
+            detail="Base de données non disponible"
+        )
+    
+    try:
+        profile = await profile_service.get(aidant_id)
+    except Exception as e:
+        logger.error(f"❌ Erreur récupération profil: {e}")
+        raise HTTPException(
+            status_code=error_status(e),
+            detail="Erreur lors de la récupération du profil"
+        )
+    if profile is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Profil aidant non disponible"
+        )
+    return {"success": True, "profile": profile}
+
+def encode_message_cursor(position: tuple) -> str:
+    """Encode la position (createdAt, id) d'un message"""
+    created, message_id = position
+    payload = json.dumps({"t": created.isoformat(), "id": message_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_message_cursor(cursor: str) -> tuple:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created = datetime.fromisoformat(payload["t"])
+        if created.tzinfo is None:
+            created = created.replace(tzinfo=timezone.utc)
+        return (created, str(payload["id"]))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+
+async def wait_for_messages(conversation_id: str, after: tuple, timeout: float) -> List[dict]:
+    """Long polling : messages postérieurs à `after` arrivés avant `timeout`"""
+    subscriber = await realtime_hub.subscribe(f"conversation:{conversation_id}")
+    try:
+        # Message écrit entre la lecture de la page et l'abonnement
+        messages, _ = await conversations.page(db, db_executor, conversation_id, MESSAGES_PAGE_SIZE_MAX, after=after)
+        if messages:
+            return messages
+        try:
+            first = await subscriber.get(timeout)
+        except asyncio.TimeoutError:
+            return []
+        received = [first]
+        while len(subscriber):
+            received.append(subscriber.get_nowait())
+        return [message for message in received if (position_of(message) or after) > after]
+    finally:
+        await asyncio.shield(realtime_hub.unsubscribe(subscriber))
+
+@api_router.get("/messages/conversation/{conversation_id}")
+async def get_conversation_messages(
+    conversation_id: str,
+    limit: int = Query(MESSAGES_PAGE_SIZE_DEFAULT, ge=1, le=MESSAGES_PAGE_SIZE_MAX),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    wait: float = Query(0, ge=0, le=MESSAGES_WAIT_MAX_S)
+):
+    """
+    Historique paginé d'une conversation, en ordre chronologique.
+
+    Sans curseur : les messages les plus récents. `before` remonte vers les
+    plus anciens, `after` lit les suivants ; avec `after` et `wait`, la
+    requête attend jusqu'à `wait` secondes qu'un nouveau message arrive.
+    """
+    if not db:
+        raise HTTPException(
+            status_code=503,
+            detail="Base de données non disponible"
+        )
+    if before and after:
+        raise HTTPException(status_code=400, detail="`before` et `after` sont exclusifs")
+    
+    before_position = decode_message_cursor(before) if before else None
+    after_position = decode_message_cursor(after) if after else None
+    try:
+        messages, has_more = await conversations.page(
+            db, db_executor, conversation_id, limit, before=before_position, after=after_position
+        )
+        if not messages and after_position and wait:
+            messages = (await wait_for_messages(conversation_id, after_position, wait))[:limit]
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Erreur récupération messages: {e}")
+        raise HTTPException(
+            status_code=error_status(e),
+            detail="Erreur lors de la récupération des messages"
+        )
+    
+    positions = [position for position in map(position_of, messages) if position]
+    return {
+        "success": True,
+        "messages": messages,
+        "conversation_id": conversation_id,
+        "hasMore": has_more,
+        "cursors": {
+            "before": encode_message_cursor(positions[0]) if positions else before,
+            "after": encode_message_cursor(positions[-1]) if positions else after
+        }
+    }
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+# Position de départ d'une conversation encore vide
+FIRST_MESSAGE_POSITION = (datetime.min.replace(tzinfo=timezone.utc), "")
+
+async def messages_after(conversation_id: str, after: tuple):
+    """Pages de messages postérieurs à `after`, jusqu'au plus récent"""
+    while True:
+        messages, has_more = await conversations.page(
+            db, db_executor, conversation_id, MESSAGES_PAGE_SIZE_MAX, after=after
+        )
+        if messages:
+            yield messages
+            after = position_of(messages[-1]) or after
+        if not has_more:
+            break
+
+def sse_event(event: str, data, event_id: Optional[str] = None) -> bytes:
+    header = f"id: {event_id}\n" if event_id else ""
+    return f"{header}event: {event}\ndata: ".encode() + fastjson.dumps(data) + b"\n\n"
+
+def sse_message(message: dict) -> bytes:
+    position = position_of(message)
+    return sse_event("message", message, encode_message_cursor(position) if position else None)
+
+async def open_subscription(topic: str):
+    """
+    Abonnement ouvert avant la réponse : une base injoignable ou un
+    disjoncteur ouvert donne un 503, pas un flux 200 interrompu.
+    """
+    try:
+        return await realtime_hub.subscribe(topic)
+    except Exception as e:
+        logger.error(f"❌ Abonnement {topic}: {e}")
+        raise HTTPException(
+            status_code=error_status(e),
+            detail="Diffusion en direct indisponible"
+        )
+
+def sse_response(stream, subscriber) -> StreamingResponse:
+    # Désabonnement aussi après la réponse : un client parti avant le premier
+    # octet n'entre jamais dans le générateur (unsubscribe est idempotent)
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+        background=BackgroundTask(realtime_hub.unsubscribe, subscriber)
+    )
+
+async def stream_conversation(conversation_id: str, subscriber, last: tuple):
+    """Flux SSE : rattrapage depuis `last`, puis messages diffusés par l'écouteur partagé"""
+    try:
+        async def catch_up():
+            nonlocal last
+            async for messages in messages_after(conversation_id, last):
+                last = position_of(messages[-1]) or last
+                yield b"".join(sse_message(message) for message in messages)
+
+        async for event in catch_up():
+            yield event
+        yield b"retry: 3000\n\n"
+
+        dropped = subscriber.dropped
+        while True:
+            try:
+                batch = await subscriber.get_batch(REALTIME_HEARTBEAT_S)
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+            if subscriber.dropped != dropped:
+                # File saturée, messages écartés : relecture depuis le dernier envoyé
+                dropped = subscriber.dropped
+                async for event in catch_up():
+                    yield event
+            events = []
+            for message in batch:
+                position = position_of(message)
+                if position is not None and position <= last:
+                    continue
+                last = position or last
+                events.append(sse_message(message))
+            if events:
+                # Une rafale en une seule écriture sur la connexion
+                yield b"".join(events)
+    finally:
+        await asyncio.shield(realtime_hub.unsubscribe(subscriber))
+
+@api_router.get("/messages/conversation/{conversation_id}/stream")
+async def stream_conversation_messages(
+    conversation_id: str,
+    request: Request,
+    after: Optional[str] = None
+):
+    """
+    Nouveaux messages d'une conversation en Server-Sent Events.
+
+    À la reconnexion, l'en-tête `Last-Event-ID` (ou `after`) fait renvoyer
+    les messages manqués avant la diffusion en direct.
+    """
+    if not db:
+        raise HTTPException(
+            status_code=503,
+            detail="Base de données non disponible"
+        )
+    
+    cursor = request.headers.get("last-event-id") or after
+    start = decode_message_cursor(cursor) if cursor else None
+    subscriber = await open_subscription(f"conversation:{conversation_id}")
+    if start is None:
+        # Nouveau client : seulement les messages à venir
+        try:
+            latest, _ = await conversations.page(db, db_executor, conversation_id, 1)
+        except Exception as e:
+            await realtime_hub.unsubscribe(subscriber)
+            logger.error(f"❌ Erreur lecture conversation {conversation_id}: {e}")
+            raise HTTPException(
+                status_code=error_status(e),
+                detail="Erreur lors de la récupération des messages"
+            )
+        start = position_of(latest[-1]) if latest else FIRST_MESSAGE_POSITION
+    return sse_response(stream_conversation(conversation_id, subscriber, start), subscriber)
+
+@api_router.websocket("/messages/ws/{conversation_id}")
+async def chat_socket(websocket: WebSocket, conversation_id: str):
+    """
+    Chat d'une conversation sur une connexion persistante.
+
+    Le client envoie {"texte", "expediteurId", "clientMessageId"} ; les
+    messages sont écrits par lots avec la mise à jour de la conversation et
+    acquittés par lots : {"type": "ack", "acks": [{clientMessageId, id,
+    timestamp}]}. Les nouveaux messages de la conversation (y compris les
+    siens, une fois écrits) arrivent en {"type": "messages", "messages": [...]}.
+    La conversation doit exister, et l'expéditeur en être participant.
+    """
+    if not db:
+        await websocket.close(code=1013, reason="Base de données non disponible")
+        return
+    try:
+        conversation = await db_executor.run(
+            db.collection(conversations.CONVERSATIONS_COLLECTION).document(conversation_id).get,
+            collection=conversations.CONVERSATIONS_COLLECTION, operation='get'
+        )
+    except Exception as e:
+        logger.error(f"❌ Lecture de la conversation {conversation_id}: {e}")
+        await websocket.close(code=1013, reason="Base de données non disponible")
+        return
+    if not conversation.exists:
+        await websocket.close(code=4404, reason="Conversation introuvable")
+        return
+    participants = (conversation.to_dict() or {}).get('participants')
+    await websocket.accept()
+    subscriber = await realtime_hub.subscribe(f"conversation:{conversation_id}")
+    send_lock = asyncio.Lock()
+    acks: List[dict] = []
+    acks_ready = asyncio.Event()
+
+    async def send(payload: dict):
+        async with send_lock:
+            await websocket.send_text(fastjson.dumps(payload).decode())
+
+    def on_written(client_message_id, future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            acks.append({"clientMessageId": client_message_id, "ok": False, "error": "Erreur lors de l'envoi du message"})
+        else:
+            written = future.result()
+            acks.append({"clientMessageId": client_message_id, "ok": True, "id": written["id"], "timestamp": written["timestamp"]})
+        acks_ready.set()
+
+    async def receive_messages():
+        while True:
+            try:
+                incoming = ChatMessageIn.model_validate_json(await websocket.receive_text())
+            except ValidationError as e:
+                await send({"type": "error", "error": "Message invalide", "details": e.errors(include_url=False, include_context=False)})
+                continue
+            if participants is not None and incoming.expediteurId not in participants:
+                await send({"type": "error", "clientMessageId": incoming.clientMessageId, "error": "Expéditeur hors de la conversation"})
+                continue
+            future = chat_writer.submit(conversation_id, incoming.texte, incoming.expediteurId)
+            future.add_done_callback(lambda done, client_id=incoming.clientMessageId: on_written(client_id, done))
+
+    async def send_acks():
+        while True:
+            await acks_ready.wait()
+            acks_ready.clear()
+            batch, acks[:] = list(acks), []
+            # Tous les envois validés par un même commit : une seule trame
+            await send({"type": "ack", "acks": batch})
+
+    async def send_messages():
+        last = None
+        dropped = subscriber.dropped
+        while True:
+            try:
+                messages = await subscriber.get_batch(REALTIME_HEARTBEAT_S)
+            except asyncio.TimeoutError:
+                await send({"type": "ping"})
+                continue
+            if subscriber.dropped != dropped and last is not None:
+                # File saturée : relecture depuis le dernier message envoyé
+                dropped = subscriber.dropped
+                async for page in messages_after(conversation_id, last):
+                    last = position_of(page[-1]) or last
+                    await send({"type": "messages", "messages": page})
+            fresh = [message for message in messages if last is None or (position_of(message) or last) > last]
+            if fresh:
+                last = position_of(fresh[-1]) or last
+                await send({"type": "messages", "messages": fresh})
+
+    tasks = [asyncio.create_task(loop()) for loop in (receive_messages, send_acks, send_messages)]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                logger.error(f"❌ Erreur WebSocket chat ({conversation_id}): {error}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Désabonnement protégé : le gestionnaire peut être annulé à la déconnexion
+        await asyncio.shield(realtime_hub.unsubscribe(subscriber))
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def stream_state(subscriber):
+    """Flux SSE d'un sujet d'état : valeur courante, puis chaque changement"""
+    try:
+        yield b"retry: 3000\n\n"
+        while True:
+            try:
+                batch = await subscriber.get_batch(REALTIME_HEARTBEAT_S)
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+            # États intermédiaires inutiles : seul le dernier est envoyé
+            yield sse_event("state", batch[-1])
+    finally:
+        await asyncio.shield(realtime_hub.unsubscribe(subscriber))
+
+@api_router.get("/services/{service_id}/stream")
+async def stream_service_status(service_id: str):
+    """Statut d'un service en Server-Sent Events (vérifié, terminé…)"""
+    if not db:
+        raise HTTPException(
+            status_code=503,
+            detail="Base de données non disponible"
+        )
+    subscriber = await open_subscription(f"service:{service_id}")
+    return sse_response(stream_state(subscriber), subscriber)
+
+@api_router.get("/payments/{transaction_id}/stream")
+async def stream_payment_status(transaction_id: str):
+    """Statut d'un paiement (`transactions`) en Server-Sent Events"""
+    if not db:
+        raise HTTPException(
+            status_code=503,
+            detail="Base de données non disponible"
+        )
+    subscriber = await open_subscription(f"payment:{transaction_id}")
+    return sse_response(stream_state(subscriber), subscriber)
+
+@api_router.post("/reviews")
+async def create_review(input: ReviewCreate):
+    """Enregistre un avis et met à jour les agrégats de l'aidant (transaction)"""
+    if not db:
+        raise HTTPException(
+            status_code=503,
+            detail="Base de données non disponible"
+        )
+    
+    try:
+        review, stats, created = await review_service.add(input.model_dump(exclude_none=True))
+        if created:
+            profile_service.invalidate(input.aidantId)
+    except Exception as e:
+        logger.error(f"❌ Erreur enregistrement avis: {e}")
+        raise HTTPException(
+            status_code=error_status(e),
+            detail="Erreur lors de l'enregistrement de l'avis"
+        )
+    
+    return FastJSONResponse(
+        status_code=201 if created else 200,
+        content={
+            "success": True,
+            "created": created,
+            "review": review_to_json(review),
+            "stats": review_stats_to_json(stats)
+        }
+    )
+
+@api_router.get("/reviews/{aidant_id}")
+async def get_reviews(aidant_id: str):
+    """Note moyenne, histogramme et derniers avis d'un aidant (un seul document)"""
+    if not db:
+        raise HTTPException(
+            status_code=503,
+            detail="Base de données non disponible"
+        )
+    
+    try:
+        stats = await review_service.get_stats(aidant_id)
+    except Exception as e:
+        logger.error(f"❌ Erreur lecture avis: {e}")
+        raise HTTPException(
+            status_code=error_status(e),
+            detail="Erreur lors de la récupération des avis"
+        )
+    return {"success": True, **review_stats_to_json(stats)}
+
 @api_router.get("/health")
 async def health_check():
-    """Endpoint de santé pour vérifier l'état de l'API et de la base de données"""
+    """Endpoint de santé pour vérifier l'état de l'API et de la base de données (résultat en cache)"""
     health_status = {
         "status": "healthy",
         "database": "disconnected",
@@ -183,19 +1234,112 @@ async def health_check():
     }
     
     if db:
-        try:
-            # Tester la connexion Firestore
-            test_ref = db.collection('_health_check').document('test')
-            test_ref.set({'timestamp': datetime.utcnow().isoformat()})
-            health_status["database"] = "connected"
-            logger.info("✅ Health check: Base de données OK")
-        except Exception as e:
-            health_status["database"] = f"error: {str(e)}"
+        health_status.update(health_monitor.snapshot())
+        if not health_monitor.ready:
             health_status["status"] = "unhealthy"
-            logger.error(f"❌ Health check: Erreur base de données - {e}")
     
+    if db is not None:
+        health_status["connection"] = {**db.stats(), "last_error": db.last_error}
+    health_status["executor"] = db_executor.stats()
+    health_status["status_cache"] = status_cache.stats()
+    health_status["worker"] = {"pid": os.getpid(), "warmup": WORKER_WARMUP}
+    if cache_generations:
+        health_status["cache_generations"] = cache_generations.stats()
+    if status_buffer:
+        health_status["write_behind"] = status_buffer.stats()
     return health_status
 
+@api_router.get("/health/live")
+async def health_live():
+    """Liveness : le processus répond, sans aucun accès à la base"""
+    return {"status": "alive"}
+
+@api_router.get("/health/ready")
+async def health_ready():
+    """Readiness : dernière sonde base de données réussie et récente"""
+    if not db:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "not_ready", "database": "disconnected"}
+        )
+    snapshot = health_monitor.snapshot()
+    if not health_monitor.ready:
+        return JSONResponse(status_code=503, content={"status": "not_ready", **snapshot})
+    return {"status": "ready", **snapshot}
+
+@api_router.get("/stats")
+async def get_stats():
+    """Statistiques de la plateforme, servies depuis l'instantané matérialisé"""
+    if not db:
+        raise HTTPException(
+            status_code=503,
+            detail="Base de données non disponible"
+        )
+    
+    try:
+        return await stats_engine.get_snapshot()
+    except Exception as e:
+        logger.error(f"❌ Erreur stats: {e}")
+        raise HTTPException(
+            status_code=error_status(e),
+            detail="Erreur lors de la récupération des statistiques"
+        )
+
+@api_router.get("/stats/series")
+async def get_stats_series(months: int = Query(12, ge=1, le=STATS_SERIES_MONTHS_MAX)):
+    """Séries mensuelles de revenus et d'inscriptions, recalculées quand les données changent"""
+    if not db:
+        raise HTTPException(
+            status_code=503,
+            detail="Base de données non disponible"
+        )
+    
+    try:
+        return await stats_engine.get_series(months)
+    except Exception as e:
+        logger.error(f"❌ Erreur séries stats: {e}")
+        raise HTTPException(
+            status_code=error_status(e),
+            detail="Erreur lors du calcul des séries"
+        )
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Métriques au format texte Prometheus"""
+    return Response(content=REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+def _stats_gauges(prefix: str, documentation: str, source):
+    """Expose les valeurs numériques de `source()` comme jauges"""
+    return REGISTRY.gauge(
+        prefix, documentation, ("metric",),
+        callback=lambda: {(key,): value for key, value in source().items()
+                          if isinstance(value, (int, float)) and not isinstance(value, bool)}
+    )
+
+_stats_gauges("firestore_executor", "Pool de threads Firestore", db_executor.stats)
+if db is not None:
+    _stats_gauges("database_connection", "Connexion à la base (tentatives, délai)", db.stats)
+_stats_gauges("health_probe", "Sonde de santé de la base", health_monitor.snapshot)
+_stats_gauges("status_cache", "Cache de lecture des status checks", status_cache.stats)
+if aidant_search_index:
+    _stats_gauges("aidant_search_index", "Index de recherche des aidants", aidant_search_index.stats)
+if review_service:
+    _stats_gauges("review_service", "Avis et agrégats de notes", review_service.stats)
+if status_rollups:
+    _stats_gauges("status_rollups", "Agrégation et conservation des status checks", status_rollups.stats)
+if chat_writer:
+    _stats_gauges("chat_writer", "Écriture groupée des messages de chat", chat_writer.stats)
+if realtime_hub:
+    _stats_gauges("realtime_hub", "Diffusion en direct (sujets, abonnés, pertes)", realtime_hub.stats)
+if profile_service:
+    _stats_gauges("profile_service", "Cache et mutualisation des profils aidants", profile_service.stats)
+if stats_engine:
+    _stats_gauges("stats_engine", "Moteur de statistiques incrémental", stats_engine.stats)
+if cache_generations:
+    _stats_gauges("cache_generations", "Générations de cache partagées entre workers", cache_generations.stats)
+if status_buffer:
+    _stats_gauges("status_write_behind", "Tampon d'écriture différée des status checks", status_buffer.stats)
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -210,12 +1354,14 @@ if not allowed_origins or allowed_origins == ['']:
     ]
     logger.warning("⚠️ CORS configuré avec des origines par défaut (développement)")
 
+app.add_middleware(PrometheusMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 logger.info("✅ Serveur FastAPI initialisé avec succès")
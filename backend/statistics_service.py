@@ -0,0 +1,473 @@
+"""
+Statistiques de la plateforme (équivalent Python de statisticsService.js).
+
+Au lieu de relire `users`, `services`, `avis`, `conversations` et
+`transactions` à chaque requête, `StatsEngine` garde pour chaque document
+sa contribution aux compteurs (totaux, secteurs, buckets mensuels). Un
+rafraîchissement ne lit que les documents créés ou modifiés depuis le
+dernier filigrane (`createdAt` / `updatedAt`), retire leur ancienne
+contribution et ajoute la nouvelle. `/api/stats` sert un instantané
+matérialisé, quel que soit le volume des collections.
+
+Les suppressions physiques et les documents sans horodatage exploitable ne
+sont visibles qu'à la reconstruction complète, planifiée périodiquement.
+
+`generation` change à chaque rafraîchissement qui modifie les données : les
+séries complètes (`stats_columnar`, un parcours de `transactions` et
+`users`) sont gardées par (nombre de mois, mois courant, génération).
+"""
+
+import asyncio
+import logging
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from firestore_executor import FirestoreExecutor
+
+logger = logging.getLogger(__name__)
+
+MONTHS = ['Jan', 'Fév', 'Mar', 'Avr', 'Mai', 'Jun', 'Jul', 'Aoû', 'Sep', 'Oct', 'Nov', 'Déc']
+SERVICE_DONE = {'termine', 'evalue', 'paiement_complet'}
+SERVICE_INPROGRESS = {'en_cours', 'acompte_paye', 'a_venir'}
+SERVICE_CANCELED = {'annule', 'cancelled'}
+CONVERSATION_CLOSED = {'termine', 'annule', 'cancelled'}
+APP_COMMISSION_RATE = 0.4
+UNSPECIFIED_SECTOR = 'Non spécifié'
+
+COLLECTIONS = ('users', 'services', 'avis', 'conversations', 'transactions')
+CHANGE_FIELDS = ('createdAt', 'updatedAt')
+# Recouvrement des filigranes : les horodatages serveur ne sont pas
+# forcément visibles dans l'ordre de leur valeur.
+WATERMARK_OVERLAP = timedelta(seconds=5)
+
+Contribution = Dict[Any, float]
+
+
+def to_datetime(value) -> Optional[datetime]:
+    """Timestamp Firestore, {seconds}, ou chaîne ISO -> datetime local ; None sinon."""
+    try:
+        if value is None:
+            return None
+        if isinstance(value, datetime):
+            result = value
+        elif isinstance(value, dict) and isinstance(value.get('seconds'), (int, float)):
+            result = datetime.fromtimestamp(value['seconds'], tz=timezone.utc)
+        elif isinstance(value, str):
+            result = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        else:
+            return None
+        if result.tzinfo is None:
+            result = result.replace(tzinfo=timezone.utc)
+        return result.astimezone()
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+
+def to_number(value) -> float:
+    try:
+        number = float(value if value is not None else 0)
+    except (TypeError, ValueError):
+        return 0.0
+    return number if math.isfinite(number) else 0.0
+
+
+def _js_round(value: float, digits: int = 0) -> float:
+    """Math.round de JavaScript (arrondi au supérieur sur .5)."""
+    factor = 10 ** digits
+    return math.floor(to_number(value) * factor + 0.5) / factor
+
+
+def r2(value) -> float:
+    return _js_round(value, 2)
+
+
+def r1(value) -> float:
+    return _js_round(value, 1)
+
+
+def r0(value) -> int:
+    return int(_js_round(value, 0))
+
+
+def _lower(value) -> str:
+    return str(value or '').lower()
+
+
+# ---------------------------------------------------------------------------
+# Contribution de chaque document aux compteurs
+# ---------------------------------------------------------------------------
+
+def user_contribution(user: dict) -> Contribution:
+    if user.get('isDeleted'):
+        return {}
+    c: Contribution = {'users_active': 1}
+    if user.get('isAidant'):
+        c['aidants'] = 1
+        c['aidants_verifies' if user.get('isVerified') else 'aidants_en_attente'] = 1
+        c[('secteur_aidants', user.get('secteur') or UNSPECIFIED_SECTOR)] = 1
+    else:
+        c['clients'] = 1
+    if user.get('isSuspended'):
+        c['comptes_suspendus'] = 1
+    created = to_datetime(user.get('createdAt'))
+    if created:
+        c[('signups', created.year, created.month)] = 1
+    return c
+
+
+def service_contribution(service: dict) -> Contribution:
+    c: Contribution = {'services_total': 1}
+    status = _lower(service.get('status'))
+    if status in SERVICE_DONE:
+        montant = to_number(service.get('montant'))
+        secteur = service.get('secteur') or UNSPECIFIED_SECTOR
+        c['services_done'] = 1
+        c['services_done_montant'] = montant
+        c[('secteur_revenue', secteur)] = montant
+        c[('secteur_services', secteur)] = 1
+        when = to_datetime(service.get('completedAt') or service.get('createdAt'))
+        if when:
+            c[('services_month', when.year, when.month)] = 1
+            c[('revenue_month', when.year, when.month)] = montant
+    elif status in SERVICE_INPROGRESS:
+        c['services_en_cours'] = 1
+    elif status in SERVICE_CANCELED:
+        c['services_annules'] = 1
+    return c
+
+
+def avis_contribution(avis: dict) -> Contribution:
+    c: Contribution = {'avis_total': 1}
+    try:
+        rating = float(avis.get('rating') or 0)
+    except (TypeError, ValueError):
+        rating = math.nan
+    if math.isfinite(rating):
+        c['avis_notes'] = 1
+        c['avis_rating_sum'] = rating
+    return c
+
+
+def conversation_contribution(conversation: dict) -> Contribution:
+    status = _lower(conversation.get('status') or 'conversation')
+    return {} if status in CONVERSATION_CLOSED else {'conversations_actives': 1}
+
+
+def transaction_contribution(transaction: dict) -> Contribution:
+    if _lower(transaction.get('status')) not in ('completed', 'succeeded'):
+        return {}
+    if _lower(transaction.get('type')) not in ('final', 'final_payment'):
+        return {}
+    amount = to_number(transaction.get('amount', transaction.get('montant')))
+    commission = transaction.get('commission')
+    return {
+        'tx_final_count': 1,
+        'tx_final_amount': amount,
+        'tx_final_commission': to_number(commission) if commission is not None else amount * APP_COMMISSION_RATE,
+    }
+
+
+CONTRIBUTIONS = {
+    'users': user_contribution,
+    'services': service_contribution,
+    'avis': avis_contribution,
+    'conversations': conversation_contribution,
+    'transactions': transaction_contribution,
+}
+
+
+# ---------------------------------------------------------------------------
+# Moteur d'agrégation
+# ---------------------------------------------------------------------------
+
+class StatsEngine:
+    def __init__(
+        self,
+        db,
+        executor: FirestoreExecutor,
+        refresh_interval: float = 10.0,
+        full_rebuild_interval: float = 3600.0,
+    ):
+        self.db = db
+        self.executor = executor
+        self.refresh_interval = refresh_interval
+        self.full_rebuild_interval = full_rebuild_interval
+
+        self._contributions: Dict[str, Dict[str, Contribution]] = {name: {} for name in COLLECTIONS}
+        self._totals: Dict[Any, float] = {}
+        self._watermarks: Dict[tuple, datetime] = {}
+        self._snapshot: Optional[dict] = None
+        self._series: Dict[tuple, dict] = {}
+        self._series_lock = asyncio.Lock()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._last_full_rebuild: Optional[float] = None
+
+        self.generation = 0
+        self.refreshes = 0
+        self.documents_applied = 0
+        self.series_computations = 0
+        self.last_refresh_ms = 0.0
+        self.last_full_rebuild_ms = 0.0
+
+    # -- cycle de vie ---------------------------------------------------------
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="stats-engine")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"❌ Erreur rafraîchissement statistiques: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def get_snapshot(self) -> dict:
+        """Instantané courant ; le premier appel attend le chargement initial."""
+        if self._snapshot is None:
+            await self.refresh()
+        return self._snapshot
+
+    async def get_series(self, months: int) -> dict:
+        """
+        Séries mensuelles recalculées en colonnes, au plus une fois par
+        génération des données : les requêtes suivantes sont servies du cache.
+        """
+        today = datetime.now().astimezone()
+        key = (months, today.year, today.month, self.generation)
+        series = self._series.get(key)
+        if series is None:
+            # Un seul parcours à la fois : les requêtes simultanées l'attendent
+            async with self._series_lock:
+                series = self._series.get(key)
+                if series is None:
+                    # numpy n'est chargé qu'au premier calcul, pas au démarrage
+                    from stats_columnar import compute_series
+                    series = await compute_series(self.db, self.executor, months, today)
+                    self._series = {k: v for k, v in self._series.items() if k[1:] == key[1:]}
+                    self._series[key] = series
+                    self.series_computations += 1
+        return series
+
+    # -- chargement -----------------------------------------------------------
+
+    async def refresh(self):
+        async with self._lock:
+            if (self._last_full_rebuild is None
+                    or time.monotonic() - self._last_full_rebuild >= self.full_rebuild_interval):
+                await self._full_rebuild()
+            else:
+                await self._incremental_refresh()
+            self._snapshot = self._build_snapshot()
+
+    async def _full_rebuild(self):
+        started = time.perf_counter()
+        scan_started = datetime.now(timezone.utc)
+        contributions = {name: {} for name in COLLECTIONS}
+        watermarks: Dict[tuple, datetime] = {}
+
+        async def load(name):
+            query = self.db.collection(name)
+            return await self.executor.run(
+                lambda: [(doc.id, doc.to_dict()) for doc in query.stream()],
+                collection=name, operation='stats_full_scan'
+            )
+
+        results = await asyncio.gather(*(load(name) for name in COLLECTIONS), return_exceptions=True)
+        for name, documents in zip(COLLECTIONS, results):
+            if isinstance(documents, Exception):
+                # Comme le JS : une collection illisible compte pour vide
+                logger.warning(f"⚠️ Collection {name} illisible pour les stats: {documents}")
+                continue
+            for doc_id, data in documents:
+                contributions[name][doc_id] = CONTRIBUTIONS[name](data)
+                self._advance_watermarks(watermarks, name, data)
+
+        # Sans horodatage observé (ex. aucun `updatedAt`), les changements
+        # sont suivis à partir du début du scan
+        for name in COLLECTIONS:
+            for field in CHANGE_FIELDS:
+                watermarks.setdefault((name, field), scan_started)
+
+        totals: Dict[Any, float] = {}
+        for documents in contributions.values():
+            for contribution in documents.values():
+                _add(totals, contribution, 1)
+
+        self._contributions, self._totals, self._watermarks = contributions, totals, watermarks
+        self.generation += 1
+        self._last_full_rebuild = time.monotonic()
+        self.last_full_rebuild_ms = round((time.perf_counter() - started) * 1000, 3)
+        self.documents_applied += sum(len(documents) for documents in contributions.values())
+        logger.info(
+            f"✅ Statistiques reconstruites en {self.last_full_rebuild_ms} ms "
+            f"({sum(len(d) for d in contributions.values())} documents)"
+        )
+
+    async def _incremental_refresh(self):
+        started = time.perf_counter()
+
+        async def changes(name, field):
+            since = self._watermarks.get((name, field))
+            if since is None:
+                return []
+            query = self.db.collection(name).where(field, '>=', since - WATERMARK_OVERLAP)
+            return await self.executor.run(
+                lambda: [(doc.id, doc.to_dict()) for doc in query.stream()],
+                collection=name, operation='stats_changes'
+            )
+
+        pairs = [(name, field) for name in COLLECTIONS for field in CHANGE_FIELDS]
+        results = await asyncio.gather(*(changes(name, field) for name, field in pairs), return_exceptions=True)
+
+        applied = changed = 0
+        for (name, _), documents in zip(pairs, results):
+            if isinstance(documents, Exception):
+                logger.warning(f"⚠️ Changements {name} illisibles: {documents}")
+                continue
+            for doc_id, data in documents:
+                changed += self._apply(name, doc_id, data)
+                self._advance_watermarks(self._watermarks, name, data)
+                applied += 1
+
+        # Le recouvrement relit toujours les derniers documents : seule une
+        # contribution modifiée change la génération
+        if changed:
+            self.generation += 1
+        self.refreshes += 1
+        self.documents_applied += applied
+        self.last_refresh_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    def _apply(self, name: str, doc_id: str, data: dict) -> bool:
+        """Remplace la contribution du document ; False si elle est inchangée."""
+        new = CONTRIBUTIONS[name](data)
+        old = self._contributions[name].get(doc_id)
+        if old == new:
+            return False
+        if old is not None:
+            _add(self._totals, old, -1)
+        _add(self._totals, new, 1)
+        self._contributions[name][doc_id] = new
+        return True
+
+    @staticmethod
+    def _advance_watermarks(watermarks: Dict[tuple, datetime], name: str, data: dict):
+        for field in CHANGE_FIELDS:
+            value = data.get(field)
+            # Seuls les horodatages natifs peuvent servir de borne de requête
+            if isinstance(value, datetime):
+                if value.tzinfo is None:
+                    value = value.replace(tzinfo=timezone.utc)
+                current = watermarks.get((name, field))
+                if current is None or value > current:
+                    watermarks[(name, field)] = value
+
+    # -- instantané -----------------------------------------------------------
+
+    def _build_snapshot(self) -> dict:
+        t = self._totals
+        get = lambda key: t.get(key, 0)  # noqa: E731
+
+        tx_final_amount = get('tx_final_amount')
+        chiffre_affaires = r2(tx_final_amount) if tx_final_amount > 0 else r2(get('services_done_montant'))
+        commission = (
+            r2(get('tx_final_commission')) if get('tx_final_count')
+            else r2(chiffre_affaires * APP_COMMISSION_RATE)
+        )
+        services_realises = int(get('services_done'))
+        services_total = get('services_total')
+        notes = get('avis_notes')
+        evaluation_moyenne = r1(get('avis_rating_sum') / notes if notes else 0)
+
+        secteurs: Dict[str, dict] = {}
+        for key, value in t.items():
+            if isinstance(key, tuple) and key[0] in ('secteur_aidants', 'secteur_revenue', 'secteur_services'):
+                entry = secteurs.setdefault(key[1], {'count': 0, 'revenue': 0.0, 'services': 0})
+                field = {'secteur_aidants': 'count', 'secteur_revenue': 'revenue', 'secteur_services': 'services'}[key[0]]
+                entry[field] += value
+        secteurs_populaires = sorted(
+            (
+                {'secteur': secteur, 'count': int(v['count']), 'revenue': r0(v['revenue']), 'services': int(v['services'])}
+                for secteur, v in secteurs.items()
+                if v['count'] or v['services']
+            ),
+            key=lambda item: -item['revenue']
+        )[:5]
+
+        today = datetime.now().astimezone()
+        evolution_mensuelle = []
+        for offset in range(5, -1, -1):
+            year, month = _shift_month(today.year, today.month, -offset)
+            evolution_mensuelle.append({
+                'mois': f"{MONTHS[month - 1]} {year}",
+                'services': int(get(('services_month', year, month))),
+                'revenue': r0(get(('revenue_month', year, month))),
+            })
+
+        return {
+            'totalAidants': int(get('aidants')),
+            'totalClients': int(get('clients')),
+            'aidantsVerifies': int(get('aidants_verifies')),
+            'aidantsEnAttente': int(get('aidants_en_attente')),
+            'comptesSuspendus': int(get('comptes_suspendus')),
+            'nouveauxUtilisateurs': int(get(('signups', today.year, today.month))),
+
+            'servicesRealises': services_realises,
+            'servicesEnCours': int(get('services_en_cours')),
+            'servicesAnnules': int(get('services_annules')),
+            'tauxConversion': r0(services_realises / services_total * 100 if services_total else 0),
+
+            'chiffreAffaires': chiffre_affaires,
+            'commissionPerçue': commission,
+            'panierMoyen': r2(chiffre_affaires / services_realises if services_realises else 0),
+
+            'evaluationMoyenne': evaluation_moyenne,
+            'totalAvis': int(get('avis_total')),
+
+            'conversationsActives': int(get('conversations_actives')),
+            'secteursPopulaires': secteurs_populaires,
+            'evolutionMensuelle': evolution_mensuelle,
+
+            'tauxSatisfactionGlobal': r1(evaluation_moyenne),
+            'evolutionRevenus': [{'mois': m['mois'], 'revenus': m['revenue']} for m in evolution_mensuelle],
+
+            'lastUpdate': datetime.utcnow().isoformat() + 'Z',
+        }
+
+    def stats(self) -> dict:
+        return {
+            "documents": sum(len(documents) for documents in self._contributions.values()),
+            "refreshes": self.refreshes,
+            "documents_applied": self.documents_applied,
+            "generation": self.generation,
+            "series_computations": self.series_computations,
+            "last_refresh_ms": self.last_refresh_ms,
+            "last_full_rebuild_ms": self.last_full_rebuild_ms,
+        }
+
+
+def _add(totals: Dict[Any, float], contribution: Contribution, sign: int):
+    for key, value in contribution.items():
+        updated = totals.get(key, 0) + sign * value
+        if updated:
+            totals[key] = updated
+        else:
+            totals.pop(key, None)
+
+
+def _shift_month(year: int, month: int, delta: int):
+    index = year * 12 + (month - 1) + delta
+    return index // 12, index % 12 + 1
@@ -0,0 +1,267 @@
+"""
+Calcul en colonnes des séries mensuelles (revenus, inscriptions).
+
+Pour les recalculs et rattrapages de `evolutionRevenus` / `evolutionMensuelle`,
+les transactions et utilisateurs sont chargés une seule fois dans des
+tableaux typés (montant, commission, horodatage, codes de statut et de type).
+Les filtres `completed` / `final`, le découpage par mois et la répartition
+commission / part aidant sont ensuite des opérations vectorisées NumPy,
+au lieu d'un filtrage des dicts document par document pour chaque mois.
+
+NumPy est optionnel : sans lui, les mêmes colonnes sont des listes Python
+et les séries sont calculées en une seule passe.
+"""
+
+import asyncio
+import math
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+
+from firestore_executor import FirestoreExecutor
+from statistics_service import APP_COMMISSION_RATE, MONTHS, _shift_month, r0, r2, to_datetime, to_number
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+TX_COMPLETED = ('completed', 'succeeded')
+TX_FINAL = ('final', 'final_payment')
+
+# Mois absent ou horodatage illisible
+NO_MONTH = -1
+
+
+def month_index(year: int, month: int) -> int:
+    """Numéro de mois absolu (janvier 1970 = 0), comme numpy datetime64[M]."""
+    return (year - 1970) * 12 + (month - 1)
+
+
+def _epoch_seconds(value) -> float:
+    # Chemin rapide : Timestamp Firestore (datetime avec fuseau)
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.timestamp()
+    when = to_datetime(value)
+    return when.timestamp() if when else math.nan
+
+
+def _local_offset_seconds() -> float:
+    # Les buckets suivent le fuseau du serveur, comme getMonth() côté JS ;
+    # le décalage courant est appliqué à tout l'historique (écart possible
+    # d'une heure autour des changements d'heure en fin de mois).
+    return datetime.now().astimezone().utcoffset().total_seconds()
+
+
+def _months_from_epoch(seconds) -> "np.ndarray":
+    months = np.full(len(seconds), NO_MONTH, dtype=np.int32)
+    valid = ~np.isnan(seconds)
+    local = (seconds[valid] + _local_offset_seconds()).astype('datetime64[s]')
+    months[valid] = local.astype('datetime64[M]').astype(np.int32)
+    return months
+
+
+def _month_from_seconds(seconds: float) -> int:
+    if math.isnan(seconds):
+        return NO_MONTH
+    local = datetime.fromtimestamp(seconds + _local_offset_seconds(), tz=timezone.utc)
+    return month_index(local.year, local.month)
+
+
+class _Categories:
+    """Encodage d'une colonne texte en petits entiers (statut, type)."""
+
+    def __init__(self):
+        self.codes = {}
+
+    def encode(self, value) -> int:
+        key = str(value or '').lower()
+        code = self.codes.get(key)
+        if code is None:
+            code = self.codes[key] = len(self.codes)
+        return code
+
+    def lookup(self, values) -> List[int]:
+        return [self.codes[value] for value in values if value in self.codes]
+
+
+class TransactionColumns:
+    """Transactions en colonnes : amount, commission (NaN si absente), seconds, status, type."""
+
+    def __init__(self, amount, commission, seconds, status, type_, status_categories, type_categories):
+        self.amount = amount
+        self.commission = commission
+        self.seconds = seconds
+        self.status = status
+        self.type = type_
+        self.status_categories = status_categories
+        self.type_categories = type_categories
+        self._months = None
+
+    def __len__(self):
+        return len(self.amount)
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[dict]) -> "TransactionColumns":
+        statuses, types = _Categories(), _Categories()
+        amount, commission, seconds, status, type_ = [], [], [], [], []
+        for data in documents:
+            amount.append(to_number(data.get('amount', data.get('montant'))))
+            value = data.get('commission')
+            commission.append(to_number(value) if value is not None else math.nan)
+            seconds.append(_epoch_seconds(data.get('completedAt') or data.get('createdAt')))
+            status.append(statuses.encode(data.get('status')))
+            type_.append(types.encode(data.get('type')))
+        if NUMPY_AVAILABLE:
+            amount = np.asarray(amount, dtype=np.float64)
+            commission = np.asarray(commission, dtype=np.float64)
+            seconds = np.asarray(seconds, dtype=np.float64)
+            status = np.asarray(status, dtype=np.int16)
+            type_ = np.asarray(type_, dtype=np.int16)
+        return cls(amount, commission, seconds, status, type_, statuses, types)
+
+    @property
+    def months(self):
+        if self._months is None:
+            if NUMPY_AVAILABLE:
+                self._months = _months_from_epoch(self.seconds)
+            else:
+                self._months = [_month_from_seconds(s) for s in self.seconds]
+        return self._months
+
+
+class UserColumns:
+    """Utilisateurs en colonnes : seconds (createdAt), deleted, aidant."""
+
+    def __init__(self, seconds, deleted, aidant):
+        self.seconds = seconds
+        self.deleted = deleted
+        self.aidant = aidant
+        self._months = None
+
+    def __len__(self):
+        return len(self.seconds)
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[dict]) -> "UserColumns":
+        seconds, deleted, aidant = [], [], []
+        for data in documents:
+            seconds.append(_epoch_seconds(data.get('createdAt')))
+            deleted.append(bool(data.get('isDeleted')))
+            aidant.append(bool(data.get('isAidant')))
+        if NUMPY_AVAILABLE:
+            seconds = np.asarray(seconds, dtype=np.float64)
+            deleted = np.asarray(deleted, dtype=bool)
+            aidant = np.asarray(aidant, dtype=bool)
+        return cls(seconds, deleted, aidant)
+
+    @property
+    def months(self):
+        if self._months is None:
+            if NUMPY_AVAILABLE:
+                self._months = _months_from_epoch(self.seconds)
+            else:
+                self._months = [_month_from_seconds(s) for s in self.seconds]
+        return self._months
+
+
+def _window(months: int, today: Optional[datetime]):
+    today = today or datetime.now().astimezone()
+    first_year, first_month = _shift_month(today.year, today.month, -(months - 1))
+    labels = []
+    for offset in range(months):
+        year, month = _shift_month(first_year, first_month, offset)
+        labels.append(f"{MONTHS[month - 1]} {year}")
+    return month_index(first_year, first_month), labels
+
+
+def revenue_series(transactions: TransactionColumns, months: int = 6,
+                   today: Optional[datetime] = None) -> List[dict]:
+    """Revenus des paiements finaux réussis par mois, avec la répartition de la commission."""
+    start, labels = _window(months, today)
+
+    if NUMPY_AVAILABLE:
+        completed = np.isin(transactions.status, transactions.status_categories.lookup(TX_COMPLETED))
+        final = np.isin(transactions.type, transactions.type_categories.lookup(TX_FINAL))
+        bucket = transactions.months - start
+        mask = completed & final & (bucket >= 0) & (bucket < months)
+        idx = bucket[mask]
+        amount = transactions.amount[mask]
+        commission = transactions.commission[mask]
+        commission = np.where(np.isnan(commission), amount * APP_COMMISSION_RATE, commission)
+        counts = np.bincount(idx, minlength=months).tolist()
+        revenus = np.bincount(idx, weights=amount, minlength=months).tolist()
+        commissions = np.bincount(idx, weights=commission, minlength=months).tolist()
+    else:
+        completed = set(transactions.status_categories.lookup(TX_COMPLETED))
+        final = set(transactions.type_categories.lookup(TX_FINAL))
+        counts, revenus, commissions = [0] * months, [0.0] * months, [0.0] * months
+        for amount, commission, month, status, type_ in zip(
+            transactions.amount, transactions.commission, transactions.months,
+            transactions.status, transactions.type
+        ):
+            bucket = month - start
+            if status in completed and type_ in final and 0 <= bucket < months:
+                counts[bucket] += 1
+                revenus[bucket] += amount
+                commissions[bucket] += amount * APP_COMMISSION_RATE if math.isnan(commission) else commission
+
+    return [
+        {
+            'mois': label,
+            'transactions': int(counts[i]),
+            'revenus': r0(revenus[i]),
+            'commission': r2(commissions[i]),
+            'partAidants': r2(revenus[i] - commissions[i]),
+        }
+        for i, label in enumerate(labels)
+    ]
+
+
+def signup_series(users: UserColumns, months: int = 6,
+                  today: Optional[datetime] = None) -> List[dict]:
+    """Inscriptions (comptes non supprimés) par mois, aidants et clients séparés."""
+    start, labels = _window(months, today)
+
+    if NUMPY_AVAILABLE:
+        bucket = users.months - start
+        mask = ~users.deleted & (bucket >= 0) & (bucket < months)
+        aidants = np.bincount(bucket[mask & users.aidant], minlength=months).tolist()
+        clients = np.bincount(bucket[mask & ~users.aidant], minlength=months).tolist()
+    else:
+        aidants, clients = [0] * months, [0] * months
+        for month, deleted, aidant in zip(users.months, users.deleted, users.aidant):
+            bucket = month - start
+            if not deleted and 0 <= bucket < months:
+                (aidants if aidant else clients)[bucket] += 1
+
+    return [
+        {
+            'mois': label,
+            'inscriptions': int(aidants[i] + clients[i]),
+            'aidants': int(aidants[i]),
+            'clients': int(clients[i]),
+        }
+        for i, label in enumerate(labels)
+    ]
+
+
+async def compute_series(db, executor: FirestoreExecutor, months: int = 6,
+                         today: Optional[datetime] = None) -> dict:
+    """Relit transactions et utilisateurs, puis recalcule les deux séries."""
+    def load(name, columns):
+        query = db.collection(name)
+        return columns.from_documents(doc.to_dict() for doc in query.stream())
+
+    transactions, users = await asyncio.gather(
+        executor.run(load, 'transactions', TransactionColumns, collection='transactions', operation='stats_columns'),
+        executor.run(load, 'users', UserColumns, collection='users', operation='stats_columns'),
+    )
+    return {
+        'evolutionRevenus': revenue_series(transactions, months, today),
+        'inscriptions': signup_series(users, months, today),
+        'transactions': len(transactions),
+        'utilisateurs': len(users),
+        'moteur': 'numpy' if NUMPY_AVAILABLE else 'python',
+    }
@@ -0,0 +1,382 @@
+"""
+Agrégats des status checks par client et par intervalle de temps.
+
+Une tâche de fond lit les nouveaux documents de `status_checks` dans l'ordre
+(timestamp, id) et tient à jour, dans `status_rollups`, un document par
+(résolution, client, intervalle) pour les résolutions minute, heure et jour :
+nombre de checks, premier et dernier horodatage vus. Chaque page est
+appliquée dans une transaction qui avance aussi la position de lecture
+(`rollup_state/status_checks`) : plusieurs processus peuvent faire tourner
+la tâche sans compter deux fois un document.
+
+Seuls les documents antérieurs à `maintenant - lag` (arrondi à la minute)
+sont agrégés, pour laisser aux écritures différées le temps d'arriver ; un
+document écrit après ce délai avec un horodatage plus ancien n'est pas
+compté. `rolled_until` marque la limite en deçà de laquelle tout est agrégé.
+
+`query()` répond avec la plus fine résolution dont le nombre d'intervalles
+tient dans la limite demandée, complète les intervalles non encore agrégés à partir des
+documents bruts, et `prune()` supprime par lots les documents bruts plus
+anciens que la durée de conservation (jamais ceux qui restent à agréger).
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from firestore_executor import FirestoreExecutor
+from repository import StatusRepository
+from memory_store import transactional_for
+
+logger = logging.getLogger(__name__)
+
+ROLLUPS_COLLECTION = 'status_rollups'
+STATE_COLLECTION = 'rollup_state'
+STATE_DOCUMENT = 'status_checks'
+
+# Résolutions, de la plus fine à la plus grosse (secondes par intervalle)
+RESOLUTIONS = {'minute': 60, 'hour': 3600, 'day': 86400}
+
+# 3 intervalles par document au plus, plus l'état : < 500 écritures par transaction
+ROLLUP_PAGE_SIZE = 150
+PRUNE_BATCH_SIZE = 500
+RAW_PAGE_SIZE = 500
+
+_EPOCH = datetime(1970, 1, 1)
+
+# (résolution, client, début d'intervalle ISO)
+BucketKey = Tuple[str, str, str]
+
+
+def to_naive_utc(value) -> Optional[datetime]:
+    """Horodatage d'un status check (ISO sans fuseau ou datetime) en UTC sans fuseau."""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def floor_to(value: datetime, seconds: int) -> datetime:
+    elapsed = int((value - _EPOCH).total_seconds())
+    return _EPOCH + timedelta(seconds=elapsed - elapsed % seconds)
+
+
+def ceil_to(value: datetime, seconds: int) -> datetime:
+    floored = floor_to(value, seconds)
+    return floored if floored == value else floored + timedelta(seconds=seconds)
+
+
+def bucket_count(since: datetime, until: datetime, resolution: str) -> int:
+    """Nombre d'intervalles de [since, until) une fois les bornes élargies aux intervalles."""
+    seconds = RESOLUTIONS[resolution]
+    return int((ceil_to(until, seconds) - floor_to(since, seconds)).total_seconds()) // seconds
+
+
+def finest_resolution(since: datetime, until: datetime, max_buckets: Optional[int] = None) -> str:
+    """Plus fine résolution dont la plage compte au plus `max_buckets` intervalles (le jour sinon)."""
+    for resolution in RESOLUTIONS:
+        if max_buckets is None or bucket_count(since, until, resolution) <= max_buckets:
+            return resolution
+    return 'day'
+
+
+def bucket_id(key: BucketKey) -> str:
+    resolution, client_name, bucket = key
+    # Le nom du client peut contenir des caractères interdits dans un id
+    digest = hashlib.sha1(client_name.encode('utf-8')).hexdigest()[:20]
+    return f"{resolution}:{bucket}:{digest}"
+
+
+def aggregate(documents, resolutions=tuple(RESOLUTIONS)) -> Dict[BucketKey, dict]:
+    """Agrégats des status checks par (résolution, client, intervalle)."""
+    buckets: Dict[BucketKey, dict] = {}
+    for data in documents:
+        timestamp = to_naive_utc(data.get('timestamp'))
+        client_name = data.get('client_name')
+        if timestamp is None or not isinstance(client_name, str):
+            continue
+        seen = timestamp.isoformat()
+        for resolution in resolutions:
+            bucket = floor_to(timestamp, RESOLUTIONS[resolution]).isoformat()
+            merge_bucket(buckets, (resolution, client_name, bucket), {'count': 1, 'first_seen': seen, 'last_seen': seen})
+    return buckets
+
+
+def merge_bucket(buckets: Dict[BucketKey, dict], key: BucketKey, delta: dict):
+    current = buckets.get(key)
+    if current is None:
+        resolution, client_name, bucket = key
+        buckets[key] = {'resolution': resolution, 'client_name': client_name, 'bucket': bucket, **delta}
+        return
+    current['count'] += delta['count']
+    current['first_seen'] = min(current['first_seen'], delta['first_seen'])
+    current['last_seen'] = max(current['last_seen'], delta['last_seen'])
+
+
+class StatusRollups:
+    def __init__(
+        self,
+        db,
+        executor: FirestoreExecutor,
+        repository: StatusRepository,
+        interval: float = 60.0,
+        lag: float = 60.0,
+        retention_days: float = 0,
+        on_prune: Optional[Callable[[], None]] = None,
+    ):
+        self.db = db
+        self.executor = executor
+        self.repository = repository
+        self.interval = interval
+        self.lag = lag
+        self.retention = timedelta(days=retention_days) if retention_days > 0 else None
+        self.on_prune = on_prune
+        self._task: Optional[asyncio.Task] = None
+
+        self.runs = 0
+        self.failures = 0
+        self.rolled_documents = 0
+        self.bucket_writes = 0
+        self.conflicts = 0
+        self.pruned = 0
+        self.queries = 0
+        self.query_rollup_documents = 0
+        self.query_raw_documents = 0
+        self.last_run_ms = 0.0
+        self.rolled_until: Optional[str] = None
+
+    @property
+    def state_ref(self):
+        return self.db.collection(STATE_COLLECTION).document(STATE_DOCUMENT)
+
+    # -- tâche de fond --------------------------------------------------------
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="status-rollups")
+            logger.info(f"✅ Agrégation des status checks démarrée (toutes les {self.interval}s)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self):
+        started = time.perf_counter()
+        try:
+            rolled = await self.roll_up()
+            pruned = await self.prune()
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"❌ Agrégation des status checks: {e}")
+            return
+        self.runs += 1
+        self.last_run_ms = round((time.perf_counter() - started) * 1000, 3)
+        if rolled or pruned:
+            logger.info(f"📈 Status checks: {rolled} agrégés, {pruned} supprimés ({self.last_run_ms} ms)")
+
+    # -- agrégation -----------------------------------------------------------
+
+    async def read_state(self) -> dict:
+        snapshot = await self.executor.run(self.state_ref.get, collection=STATE_COLLECTION, operation='get')
+        state = (snapshot.to_dict() if snapshot.exists else None) or {}
+        self.rolled_until = state.get('rolled_until')
+        return state
+
+    async def roll_up(self, now: Optional[datetime] = None) -> int:
+        """Agrège les status checks antérieurs à `now - lag` ; retourne le nombre de documents lus."""
+        now = to_naive_utc(now or datetime.now(timezone.utc))
+        horizon = floor_to(now - timedelta(seconds=self.lag), RESOLUTIONS['minute']).isoformat()
+        state = await self.read_state()
+        if state.get('rolled_until') and state['rolled_until'] >= horizon:
+            return 0
+        position = state.get('position')
+        rolled = 0
+        while True:
+            page = await self.repository.page(ROLLUP_PAGE_SIZE, position, until=horizon)
+            complete = len(page) < ROLLUP_PAGE_SIZE
+            applied = await self.executor.run(
+                self._apply_sync, page, position, horizon if complete else None,
+                collection=ROLLUPS_COLLECTION, operation='rollup_transaction'
+            )
+            if not applied:
+                # Un autre processus a avancé la position : reprendre depuis la sienne
+                self.conflicts += 1
+                position = (await self.read_state()).get('position')
+                continue
+            rolled += len(page)
+            self.rolled_documents += len(page)
+            if page:
+                position = {'timestamp': page[-1].get('timestamp'), 'id': page[-1].get('id')}
+            if complete:
+                self.rolled_until = horizon
+                return rolled
+
+    def _apply_sync(self, page: List[dict], position: Optional[dict], rolled_until: Optional[str]) -> bool:
+        transaction = self.db.transaction()
+        transactional = transactional_for(transaction)
+        if transactional is None:
+            raise RuntimeError("Transactions Firestore indisponibles")
+        deltas = aggregate(page)
+        collection = self.db.collection(ROLLUPS_COLLECTION)
+        refs = {key: collection.document(bucket_id(key)) for key in deltas}
+        new_position = {'timestamp': page[-1].get('timestamp'), 'id': page[-1].get('id')} if page else position
+
+        @transactional
+        def apply(transaction):
+            # Toutes les lectures avant les écritures
+            state_snapshot = self.state_ref.get(transaction=transaction)
+            state = (state_snapshot.to_dict() if state_snapshot.exists else None) or {}
+            if state.get('position') != position:
+                return False
+            snapshots = self.db.get_all(list(refs.values()), transaction=transaction) if refs else []
+            existing = {snapshot.id: snapshot.to_dict() for snapshot in snapshots if snapshot.exists}
+            for key, delta in deltas.items():
+                ref = refs[key]
+                buckets = {key: existing[ref.id]} if ref.id in existing else {}
+                merge_bucket(buckets, key, delta)
+                transaction.set(ref, buckets[key])
+            state = {'position': new_position, 'rolled_until': rolled_until or state.get('rolled_until')}
+            transaction.set(self.state_ref, state)
+            return True
+
+        applied = apply(transaction)
+        if applied:
+            self.bucket_writes += len(deltas)
+        return applied
+
+    # -- conservation ---------------------------------------------------------
+
+    async def prune(self, now: Optional[datetime] = None) -> int:
+        """Supprime les status checks plus anciens que la durée de conservation et déjà agrégés."""
+        if self.retention is None or not self.rolled_until:
+            return 0
+        now = to_naive_utc(now or datetime.now(timezone.utc))
+        # query() relit les documents bruts à partir du début du jour de rolled_until
+        rolled_day = floor_to(to_naive_utc(self.rolled_until), RESOLUTIONS['day'])
+        cutoff = min(now - self.retention, rolled_day).isoformat()
+        pruned = 0
+        while True:
+            deleted = await self.repository.delete_before(cutoff, PRUNE_BATCH_SIZE)
+            pruned += deleted
+            if deleted < PRUNE_BATCH_SIZE:
+                break
+        if pruned:
+            self.pruned += pruned
+            if self.on_prune:
+                self.on_prune()
+        return pruned
+
+    # -- lecture --------------------------------------------------------------
+
+    async def query(
+        self,
+        since: datetime,
+        until: datetime,
+        client_name: Optional[str] = None,
+        resolution: Optional[str] = None,
+        max_buckets: Optional[int] = None,
+    ) -> dict:
+        """
+        Intervalles de [since, until) par client, bornes élargies aux
+        intervalles de la résolution. Sans `resolution`, la plus fine qui
+        tient dans `max_buckets` intervalles. ValueError si la plage en
+        compte davantage.
+        """
+        since, until = to_naive_utc(since), to_naive_utc(until)
+        if until <= since:
+            raise ValueError("Plage vide")
+        if resolution is None:
+            resolution = finest_resolution(since, until, max_buckets)
+        seconds = RESOLUTIONS[resolution]
+        since, until = floor_to(since, seconds), ceil_to(until, seconds)
+        if max_buckets is not None and bucket_count(since, until, resolution) > max_buckets:
+            raise ValueError(f"Plus de {max_buckets} intervalles '{resolution}' dans la plage")
+
+        # Intervalles complets dans les agrégats : ceux qui finissent avant rolled_until
+        state = await self.read_state()
+        rolled_until = to_naive_utc(state.get('rolled_until'))
+        split = floor_to(rolled_until, seconds) if rolled_until else since
+        split = min(max(split, since), until)
+
+        buckets: Dict[BucketKey, dict] = {}
+        if split > since:
+            query = self.db.collection(ROLLUPS_COLLECTION).where('resolution', '==', resolution)
+            if client_name is not None:
+                query = query.where('client_name', '==', client_name)
+            query = (
+                query.where('bucket', '>=', since.isoformat())
+                .where('bucket', '<', split.isoformat())
+                .order_by('bucket')
+            )
+            documents = await self.executor.run(
+                lambda: [doc.to_dict() for doc in query.stream()],
+                collection=ROLLUPS_COLLECTION, operation='query'
+            )
+            self.query_rollup_documents += len(documents)
+            for data in documents:
+                buckets[(resolution, data['client_name'], data['bucket'])] = data
+
+        # Reste de la plage : documents bruts pas encore agrégés
+        raw = 0
+        if split < until:
+            position = None
+            while True:
+                page = await self.repository.page(
+                    RAW_PAGE_SIZE, position, client_name=client_name,
+                    since=split.isoformat(), until=until.isoformat()
+                )
+                raw += len(page)
+                for key, delta in aggregate(page, (resolution,)).items():
+                    merge_bucket(buckets, key, delta)
+                if len(page) < RAW_PAGE_SIZE:
+                    break
+                position = {'timestamp': page[-1].get('timestamp'), 'id': page[-1].get('id')}
+            self.query_raw_documents += raw
+        self.queries += 1
+
+        series = sorted(buckets.values(), key=lambda data: (data['bucket'], data['client_name']))
+        return {
+            'resolution': resolution,
+            'since': since.isoformat(),
+            'until': until.isoformat(),
+            'rolled_until': state.get('rolled_until'),
+            'total': sum(data['count'] for data in series),
+            'raw_documents': raw,
+            'buckets': [
+                {key: data[key] for key in ('client_name', 'bucket', 'count', 'first_seen', 'last_seen')}
+                for data in series
+            ],
+        }
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "rolled_documents": self.rolled_documents,
+            "bucket_writes": self.bucket_writes,
+            "conflicts": self.conflicts,
+            "pruned": self.pruned,
+            "queries": self.queries,
+            "query_rollup_documents": self.query_rollup_documents,
+            "query_raw_documents": self.query_raw_documents,
+            "last_run_ms": self.last_run_ms,
+        }
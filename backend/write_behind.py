@@ -0,0 +1,151 @@
+"""
+Tampon d'écriture différée (write-behind) pour les écritures à haute fréquence.
+
+Les requêtes sont acquittées dès que le document est ajouté à une file
+bornée en mémoire. Une tâche de fond vide la file par lots, dès que
+`flush_size` documents sont accumulés ou que `flush_interval` secondes se
+sont écoulées depuis le premier document du lot. La file est vidée à l'arrêt.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+Document = Tuple[str, dict]
+FlushFn = Callable[[Sequence[Document]], Awaitable[List[Optional[str]]]]
+
+
+class WriteBehindBuffer:
+    """File bornée + tâche de vidage périodique par lots."""
+
+    def __init__(
+        self,
+        flush_fn: FlushFn,
+        max_size: int = 10000,
+        flush_size: int = 500,
+        flush_interval: float = 0.5,
+        name: str = "write-behind",
+    ):
+        self.name = name
+        self.max_size = max_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._flush_fn = flush_fn
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._batch: List[Document] = []
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._closed = False
+
+        self.accepted = 0
+        self.rejected = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._flush_total = 0.0
+
+    def offer(self, document: Document) -> bool:
+        """Ajoute un document à la file ; False si la file est pleine ou fermée."""
+        # Le lot en cours de constitution compte dans la capacité
+        if self._closed or self._queue.qsize() + len(self._batch) >= self.max_size:
+            self.rejected += 1
+            return False
+        self._queue.put_nowait(document)
+        self.accepted += 1
+        return True
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=self.name)
+            logger.info(
+                f"✅ {self.name} démarré (file {self.max_size}, lots {self.flush_size}, "
+                f"intervalle {self.flush_interval}s)"
+            )
+
+    async def stop(self):
+        """Ferme la file puis écrit tout ce qui reste avant de rendre la main."""
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._inflight is not None and not self._inflight.done():
+            await self._inflight
+
+        while not self._queue.empty():
+            self._batch.append(self._queue.get_nowait())
+        while self._batch:
+            batch, self._batch = self._batch[:self.flush_size], self._batch[self.flush_size:]
+            await self._flush(batch)
+        logger.info(f"✅ {self.name} vidé ({self.written} écrits, {self.dropped} perdus)")
+
+    async def _run(self):
+        while True:
+            await self._collect()
+            batch, self._batch = self._batch, []
+            # Le lot en cours d'écriture n'est pas interrompu par l'arrêt
+            self._inflight = asyncio.ensure_future(self._flush(batch))
+            await asyncio.shield(self._inflight)
+
+    async def _collect(self):
+        """Remplit `self._batch` jusqu'au seuil de taille ou de temps."""
+        loop = asyncio.get_running_loop()
+        self._batch.append(await self._queue.get())
+        deadline = loop.time() + self.flush_interval
+        while len(self._batch) < self.flush_size:
+            try:
+                self._batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                self._batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+    async def _flush(self, batch: Sequence[Document]):
+        started = time.perf_counter()
+        try:
+            errors = await self._flush_fn(batch)
+        except Exception as e:
+            logger.error(f"❌ {self.name}: échec du vidage de {len(batch)} documents: {e}")
+            errors = [str(e)] * len(batch)
+        elapsed = time.perf_counter() - started
+
+        failed = sum(1 for error in errors if error is not None)
+        self.failed += failed
+        self.written += len(batch) - failed
+        self.flushes += 1
+        self._flush_total += elapsed
+        self.last_flush_ms = elapsed * 1000
+        self.max_flush_ms = max(self.max_flush_ms, self.last_flush_ms)
+
+    @property
+    def dropped(self) -> int:
+        return self.rejected + self.failed
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize() + len(self._batch),
+            "capacity": self.max_size,
+            "accepted": self.accepted,
+            "written": self.written,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "flush_last_ms": round(self.last_flush_ms, 3),
+            "flush_max_ms": round(self.max_flush_ms, 3),
+            "flush_avg_ms": round(self._flush_total / self.flushes * 1000, 3) if self.flushes else 0.0,
+        }
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Test de charge du backend FastAPI - A La Case Nout Gramoun
+Rejoue les scénarios de BackendTester (status, santé, recherche, statistiques)
+en parallèle, à concurrence et débit donnés, avec httpx + asyncio.
+
+Exemples :
+    # Application en processus, stockage en mémoire, aucun service externe
+    python backend_load_test.py --in-process --concurrency 50 --requests 5000
+
+    # Serveur local déjà démarré (uvicorn server:app --port 8001)
+    python backend_load_test.py --base-url http://localhost:8001 --rate 200 --duration 30
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+from backend_test import HEADERS, SEARCH_CRITERIA
+
+ROOT_DIR = Path(__file__).parent
+
+# Scénarios : nom -> (méthode, chemin, corps JSON, poids)
+SCENARIOS = {
+    "Status Create": ("POST", "/api/status", lambda: {"client_name": f"load-{random.randrange(100)}"}, 3),
+    "Status List": ("GET", "/api/status?page_size=100", None, 3),
+    "Health": ("GET", "/api/health", None, 2),
+    "Services Search": ("POST", "/api/services/search", lambda: SEARCH_CRITERIA, 2),
+    "Statistics": ("GET", "/api/stats", None, 1),
+}
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(int(len(sorted_values) * q), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class LoadTester:
+    def __init__(self, client, scenarios, concurrency, rate=0.0, total_requests=None,
+                 duration=None, seed=None):
+        self.client = client
+        self.scenarios = scenarios
+        self.concurrency = concurrency
+        self.rate = rate
+        self.total_requests = total_requests
+        self.duration = duration
+        self.random = random.Random(seed)
+        self.names = list(scenarios)
+        self.weights = [scenarios[name][3] for name in self.names]
+        self.latencies = {name: [] for name in self.names}
+        self.statuses = {name: Counter() for name in self.names}
+        self.errors = Counter()
+        self._issued = 0
+
+    def _next_slot(self):
+        """Réserve l'indice de la prochaine requête, ou None si le test est terminé."""
+        if self.total_requests is not None and self._issued >= self.total_requests:
+            return None
+        if self.duration is not None and time.perf_counter() - self.started >= self.duration:
+            return None
+        slot = self._issued
+        self._issued += 1
+        return slot
+
+    async def _worker(self):
+        while True:
+            slot = self._next_slot()
+            if slot is None:
+                return
+            if self.rate:
+                # Débit ouvert : la requête n est planifiée à t0 + n / rate
+                delay = self.started + slot / self.rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            name = self.random.choices(self.names, self.weights)[0]
+            method, path, body, _ = self.scenarios[name]
+            started = time.perf_counter()
+            try:
+                response = await self.client.request(
+                    method, path, json=body() if body else None, headers=HEADERS
+                )
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            self.latencies[name].append((time.perf_counter() - started) * 1000)
+            self.statuses[name][str(status)] += 1
+            if not isinstance(status, int) or status >= 400:
+                self.errors[name] += 1
+
+    async def run(self):
+        self.started = time.perf_counter()
+        await asyncio.gather(*(self._worker() for _ in range(self.concurrency)))
+        self.elapsed = time.perf_counter() - self.started
+
+    def report(self, max_error_rate):
+        results = []
+        for name in self.names:
+            latencies = sorted(self.latencies[name])
+            count = len(latencies)
+            if not count:
+                continue
+            errors = self.errors[name]
+            error_rate = errors / count
+            details = {
+                "requests": count,
+                "errors": errors,
+                "error_rate": round(error_rate, 4),
+                "throughput_rps": round(count / self.elapsed, 2),
+                "status_codes": dict(self.statuses[name]),
+                "latency_ms": {
+                    "mean": round(sum(latencies) / count, 3),
+                    "p50": round(percentile(latencies, 0.50), 3),
+                    "p90": round(percentile(latencies, 0.90), 3),
+                    "p99": round(percentile(latencies, 0.99), 3),
+                    "max": round(latencies[-1], 3),
+                },
+            }
+            success = error_rate <= max_error_rate
+            message = (f"{count} requêtes, {details['throughput_rps']} req/s, "
+                       f"p99 {details['latency_ms']['p99']} ms, erreurs {error_rate:.1%}")
+            results.append({
+                "test": name,
+                "success": success,
+                "message": message,
+                "timestamp": datetime.now().isoformat(),
+                "details": details,
+            })
+            status = "✅" if success else "❌"
+            print(f"{status} {name}: {message}")
+
+        total = sum(len(values) for values in self.latencies.values())
+        passed = sum(1 for result in results if result["success"])
+        return {
+            "summary": {
+                "passed": passed,
+                "total": len(results),
+                "success_rate": passed / len(results) if results else 0.0,
+                "requests": total,
+                "duration_s": round(self.elapsed, 3),
+                "throughput_rps": round(total / self.elapsed, 2) if self.elapsed else 0.0,
+                "concurrency": self.concurrency,
+                "target_rate": self.rate or None,
+            },
+            "timestamp": datetime.now().isoformat(),
+            "results": results,
+        }
+
+
+@asynccontextmanager
+async def make_client(args):
+    if not args.in_process:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as client:
+            yield client
+        return
+
+    # Application chargée dans ce processus, sur le stockage en mémoire
+    os.environ.setdefault("STORAGE_BACKEND", "memory")
+    sys.path.insert(0, str(ROOT_DIR / "backend"))
+    from server import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver",
+                                     timeout=args.timeout) as client:
+            yield client
+
+
+async def main(args):
+    scenarios = SCENARIOS
+    if args.scenarios:
+        scenarios = {name: SCENARIOS[name] for name in args.scenarios}
+
+    print("🚀 Démarrage du test de charge backend FastAPI")
+    print(f"   Cible: {'application en processus' if args.in_process else args.base_url}")
+    print(f"   Concurrence: {args.concurrency} | Débit: {args.rate or 'max'} req/s")
+    print("=" * 60)
+
+    async with make_client(args) as client:
+        tester = LoadTester(
+            client, scenarios, args.concurrency, rate=args.rate,
+            total_requests=args.requests, duration=args.duration, seed=args.seed
+        )
+        await tester.run()
+
+    report = tester.report(args.max_error_rate)
+    print("=" * 60)
+    summary = report["summary"]
+    print(f"📊 {summary['requests']} requêtes en {summary['duration_s']} s "
+          f"({summary['throughput_rps']} req/s) - {summary['passed']}/{summary['total']} scénarios OK")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"💾 Rapport: {args.output}")
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Test de charge du backend FastAPI")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--base-url", default="http://localhost:8001")
+    target.add_argument("--in-process", action="store_true",
+                        help="Charger backend/server.py dans ce processus (stockage en mémoire)")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rate", type=float, default=0.0, help="Débit cible en req/s (0 = maximum)")
+    parser.add_argument("--requests", type=int, default=None, help="Nombre total de requêtes")
+    parser.add_argument("--duration", type=float, default=None, help="Durée du test en secondes")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=None)
+    parser.add_argument("--timeout", type=float, default=15.0)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=None)
+    # Rapport hors du dépôt par défaut
+    parser.add_argument("--output", default=os.path.join(tempfile.gettempdir(), "backend_load_test_results.json"))
+    args = parser.parse_args(argv)
+    if args.requests is None and args.duration is None:
+        args.requests = 1000
+    return args
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -14,6 +14,15 @@ from datetime import datetime
 BASE_URL = "http://localhost:3000"
 HEADERS = {"Content-Type": "application/json"}
 
+# Critères de recherche partagés avec le test de charge (backend_load_test.py)
+SEARCH_CRITERIA = {
+    "secteur": "Aide à domicile",
+    "jour": "lundi",
+    "horaires": "matin",
+    "etatCivil": "celibataire",
+    "preferenceAidant": "indifferent"
+}
+
 class BackendTester:
     def __init__(self):
         self.results = []
@@ -173,16 +182,8 @@ class BackendTester:
         
         # Test recherche d'aidants
         try:
-            search_data = {
-                "secteur": "Aide à domicile",
-                "jour": "lundi",
-                "horaires": "matin",
-                "etatCivil": "celibataire",
-                "preferenceAidant": "indifferent"
-            }
-            
             response = requests.post(f"{BASE_URL}/api/services/search", 
-                                   json=search_data, headers=HEADERS, timeout=15)
+                                   json=SEARCH_CRITERIA, headers=HEADERS, timeout=15)
             
             if response.status_code == 200:
                 data = response.json()
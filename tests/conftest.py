@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Les modules du backend s'importent par leur nom (lancés depuis backend/)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
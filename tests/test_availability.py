@@ -0,0 +1,29 @@
+from availability import AvailabilityIndex, parse_availability, parse_slot
+from search_index import AidantSearchIndex
+
+
+def test_unchanged_availability_keeps_cached_slots():
+    index = AvailabilityIndex()
+    index.set('a1', parse_availability({'disponibilites': ['Lundi 8h-12h']}))
+    slot = parse_slot('lundi', '9h-11h')
+    match = index.match(*slot)
+    assert match.full == {'a1'}
+
+    index.set('a1', parse_availability({'disponibilites': ['Lundi 8h-12h']}))
+    assert index.match(*slot) is match
+
+    index.set('a1', parse_availability({'disponibilites': ['Mardi 8h-12h']}))
+    assert index.match(*slot).full == set()
+
+
+def test_search_index_keeps_cached_slots_when_only_the_profile_changes():
+    index = AidantSearchIndex(db=None, executor=None)
+    profile = {'isAidant': True, 'isVerified': True, 'disponibilites': ['Lundi 8h-12h']}
+    index.apply('a1', profile)
+    slot = parse_slot('lundi', '9h-11h')
+    match = index._availability.match(*slot)
+
+    index.apply('a1', {**profile, 'averageRating': 4.5})
+    assert index._availability.match(*slot) is match
+    index.apply('a1', {**profile, 'isSuspended': True})
+    assert index._availability.match(*slot).full == set()
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from chat import MAX_METADATA_ATTEMPTS, ChatWriter
+from firestore_executor import FirestoreExecutor
+from memory_store import InMemoryFirestore, NotFound
+
+
+class Unavailable(Exception):
+    pass
+
+
+class CountingExecutor(FirestoreExecutor):
+    def __init__(self):
+        super().__init__(2)
+        self.commits = 0
+        self.failing = set()
+
+    async def run(self, fn, *args, **kwargs):
+        if kwargs.get('operation') == 'chat_batch_commit':
+            self.commits += 1
+            if self.commits in self.failing:
+                raise Unavailable("503")
+        return await super().run(fn, *args, **kwargs)
+
+
+@pytest.fixture
+def executor():
+    executor = CountingExecutor()
+    yield executor
+    executor.shutdown()
+
+
+def test_failed_batch_is_not_retried_in_a_loop(executor):
+    db = InMemoryFirestore()
+    writer = ChatWriter(db, executor, window=0.001, metadata_interval=0.01)
+
+    async def scenario():
+        future = writer.submit('absente', 'bonjour', 'u1')
+        with pytest.raises(NotFound):
+            await future
+        await asyncio.sleep(0.2)
+
+    asyncio.run(scenario())
+    # Message non écrit : aucune mise à jour de conversation à rejouer
+    assert executor.commits == 1
+    assert writer.stats()['failed'] == 1
+    assert writer.stats()['pending_conversations'] == 0
+
+
+def test_failed_update_is_retried_with_backoff_then_dropped(executor):
+    db = InMemoryFirestore()
+    conversation = db.collection('conversations').document('c1')
+    conversation.set({'participants': ['u1', 'u2']})
+    writer = ChatWriter(db, executor, window=0.001, metadata_interval=0.02)
+
+    async def scenario():
+        await writer.submit('c1', 'premier', 'u1')
+        # Dans l'intervalle : message écrit seul, mise à jour différée
+        await writer.submit('c1', 'second', 'u1')
+        conversation.delete()
+        await asyncio.sleep(0.5)
+        return executor.commits
+
+    commits = asyncio.run(scenario())
+    # Deux lots de messages, puis des tentatives espacées et bornées
+    assert commits == 2 + MAX_METADATA_ATTEMPTS
+    assert writer.stats()['dropped_updates'] == 1
+    assert writer.stats()['pending_conversations'] == 0
+
+
+def test_conversation_keeps_the_last_written_message(executor):
+    db = InMemoryFirestore()
+    conversation = db.collection('conversations').document('c1')
+    conversation.set({'participants': ['u1', 'u2']})
+    writer = ChatWriter(db, executor, window=0.001, metadata_interval=0.02)
+    executor.failing = {2}
+
+    async def scenario():
+        await writer.submit('c1', 'premier', 'u1')
+        with pytest.raises(Unavailable):
+            await writer.submit('c1', 'second', 'u1')
+        await writer.stop()
+
+    asyncio.run(scenario())
+    assert conversation.get().to_dict()['lastMessage']['texte'] == 'premier'
@@ -0,0 +1,163 @@
+import random
+
+import pytest
+
+from memory_store import Aborted, InMemoryFirestore, NotFound, transactional
+
+
+@pytest.fixture
+def db():
+    db = InMemoryFirestore()
+    for n, (client_name, timestamp) in enumerate([
+        ('a', '2024-01-01T00:00:03'),
+        ('b', '2024-01-01T00:00:01'),
+        ('a', '2024-01-01T00:00:02'),
+        ('c', '2024-01-01T00:00:02'),
+        ('b', '2024-01-01T00:00:05'),
+    ]):
+        db.collection('status_checks').document(f"d{n}").set({'client_name': client_name, 'timestamp': timestamp})
+    return db
+
+
+def ids(query):
+    return [snapshot.id for snapshot in query.stream()]
+
+
+def test_filters_orders_and_limit(db):
+    checks = db.collection('status_checks')
+    assert ids(checks.where('client_name', '==', 'a').order_by('timestamp')) == ['d2', 'd0']
+    assert ids(checks.order_by('timestamp', direction='DESCENDING').limit(2)) == ['d4', 'd0']
+    # Égalité de timestamp : départage par id, comme Firestore
+    assert ids(checks.where('timestamp', '==', '2024-01-01T00:00:02')) == ['d2', 'd3']
+    assert ids(checks.where('client_name', 'in', ['b', 'c']).order_by('timestamp')) == ['d1', 'd3', 'd4']
+
+
+def test_cursor_pagination_visits_each_document_once(db):
+    query = db.collection('status_checks').order_by('timestamp').order_by('__name__')
+    seen, cursor = [], None
+    while True:
+        page = (query.start_after(cursor) if cursor else query).limit(2).get()
+        seen += [snapshot.id for snapshot in page]
+        if len(page) < 2:
+            break
+        cursor = {'timestamp': page[-1].get('timestamp'), '__name__': page[-1].id}
+    assert seen == ['d1', 'd2', 'd3', 'd0', 'd4']
+
+
+def test_start_at_snapshot_is_inclusive(db):
+    query = db.collection('status_checks').order_by('timestamp')
+    start = db.document('status_checks/d3').get()
+    assert ids(query.start_at(start)) == ['d3', 'd0', 'd4']
+    assert ids(query.start_after(start)) == ['d0', 'd4']
+
+
+def test_batch_is_atomic(db):
+    batch = db.batch()
+    batch.set(db.document('status_checks/new'), {'client_name': 'z'})
+    batch.update(db.document('status_checks/missing'), {'client_name': 'z'})
+    with pytest.raises(NotFound):
+        batch.commit()
+    assert not db.document('status_checks/new').get().exists
+
+
+def test_transaction_retries_after_concurrent_write(db):
+    counter = db.document('counters/c')
+    counter.set({'value': 0})
+    attempts = []
+
+    @transactional
+    def increment(transaction):
+        value = counter.get(transaction=transaction).to_dict()['value']
+        attempts.append(value)
+        if len(attempts) == 1:
+            # Écriture concurrente entre la lecture et le commit
+            counter.set({'value': 10})
+        transaction.set(counter, {'value': value + 1})
+
+    increment(db.transaction())
+    assert attempts == [0, 10]
+    assert counter.get().to_dict() == {'value': 11}
+
+
+def test_transaction_gives_up_after_max_attempts(db):
+    counter = db.document('counters/c')
+    counter.set({'value': 0})
+
+    @transactional
+    def always_conflicting(transaction):
+        value = counter.get(transaction=transaction).to_dict()['value']
+        counter.set({'value': value + 100})
+        transaction.set(counter, {'value': value + 1})
+
+    with pytest.raises(Aborted):
+        always_conflicting(db.transaction(max_attempts=3))
+
+
+def test_transaction_reads_must_precede_writes(db):
+    counter = db.document('counters/c')
+
+    @transactional
+    def write_then_read(transaction):
+        transaction.set(counter, {'value': 1})
+        counter.get(transaction=transaction)
+
+    with pytest.raises(ValueError):
+        write_then_read(db.transaction())
+
+
+def indexed_and_plain(documents):
+    indexed, plain = InMemoryFirestore(), InMemoryFirestore()
+    indexed.add_index('status_checks', ['client_name', 'timestamp'])
+    for store in (indexed, plain):
+        for doc_id, data in documents.items():
+            store.collection('status_checks').document(doc_id).set(data)
+    return indexed, plain
+
+
+def test_index_slicing_matches_full_scan():
+    rng = random.Random(7)
+    documents = {
+        f"d{n:03}": {'client_name': rng.choice('abc'), 'timestamp': f"2024-01-01T00:{rng.randrange(60):02}:00"}
+        for n in range(300)
+    }
+    indexed, plain = indexed_and_plain(documents)
+    # Index maintenu à l'écriture : modifications et suppressions
+    for store in (indexed, plain):
+        store.document('status_checks/d000').set({'client_name': 'c', 'timestamp': '2024-01-01T00:30:30'})
+        store.document('status_checks/d001').delete()
+
+    for _ in range(300):
+        client_name = rng.choice('abc')
+        since, until = sorted(f"2024-01-01T00:{rng.randrange(60):02}:00" for _ in range(2))
+        direction = rng.choice(['ASCENDING', 'DESCENDING'])
+        cursor = rng.choice([None, f"2024-01-01T00:{rng.randrange(60):02}:00"])
+        limit = rng.randrange(1, 20)
+
+        def build(store):
+            query = (
+                store.collection('status_checks')
+                .where('client_name', '==', client_name)
+                .where('timestamp', '>=', since)
+                .where('timestamp', '<', until)
+                .order_by('timestamp', direction=direction)
+                .order_by('__name__', direction=direction)
+            )
+            if cursor:
+                query = query.start_after({'timestamp': cursor, '__name__': 'd150'})
+            return query.limit(limit)
+
+        assert ids(build(indexed)) == ids(build(plain))
+
+
+def test_index_plan_is_exact_for_prefix_and_range():
+    indexed, _ = indexed_and_plain({
+        'd1': {'client_name': 'a', 'timestamp': '2024-01-01T00:00:01'},
+        'd2': {'client_name': 'a', 'timestamp': '2024-01-01T00:00:02'},
+        'd3': {'client_name': 'b', 'timestamp': '2024-01-01T00:00:03'},
+    })
+    index = indexed._indexes_for('status_checks')[0]
+    filters = [('client_name', '==', 'a'), ('timestamp', '>', '2024-01-01T00:00:01')]
+    orders = [('timestamp', 'ASCENDING'), ('__name__', 'ASCENDING')]
+    assert index.plan(filters, orders, None, False, None) == (['d2'], True)
+    # Champ hors de l'index : pas de plan
+    assert index.plan([('status', '==', 'ok')], orders, None, False, None) is None
@@ -0,0 +1,129 @@
+import asyncio
+import time
+
+import pytest
+
+from resilience import CircuitBreaker, CircuitOpen, DeadlineExceeded, ResilientExecutor
+
+
+class ServiceUnavailable(Exception):
+    """Même nom que l'erreur transitoire du SDK."""
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def breaker(clock, **options):
+    return CircuitBreaker(failure_ratio=0.5, min_calls=4, window=10, open_for=5, clock=clock, **options)
+
+
+def test_breaker_opens_on_failure_ratio(clock):
+    circuit = breaker(clock)
+    for success in (True, False, True):
+        circuit.record(success)
+    assert circuit.state == CircuitBreaker.CLOSED
+    circuit.record(False)
+    assert circuit.state == CircuitBreaker.OPEN
+    assert not circuit.allow()
+    assert circuit.rejected == 1
+
+
+def test_breaker_needs_min_calls(clock):
+    circuit = breaker(clock)
+    for _ in range(3):
+        circuit.record(False)
+    assert circuit.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_forgets_failures_outside_the_window(clock):
+    circuit = breaker(clock)
+    for _ in range(3):
+        circuit.record(False)
+    clock.now += 20
+    circuit.record(False)
+    assert circuit.state == CircuitBreaker.CLOSED
+    assert circuit.stats()['window_calls'] == 1
+
+
+def test_half_open_trial_closes_or_reopens(clock):
+    circuit = breaker(clock)
+    for _ in range(4):
+        circuit.record(False)
+    clock.now += 5
+    assert circuit.allow()
+    assert circuit.state == CircuitBreaker.HALF_OPEN
+    # Un seul appel d'essai à la fois
+    assert not circuit.allow()
+    circuit.record(False, trial=True)
+    assert circuit.state == CircuitBreaker.OPEN
+
+    clock.now += 5
+    assert circuit.allow()
+    circuit.record(True, trial=True)
+    assert circuit.state == CircuitBreaker.CLOSED
+    assert circuit.transitions == 5
+
+
+@pytest.fixture
+def executor(clock):
+    executor = ResilientExecutor(2, breaker(clock), read_deadline=0.2, write_deadline=0.2, retry_base=0.001)
+    yield executor
+    executor.shutdown()
+
+
+def flaky(failures):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise ServiceUnavailable("503")
+        return len(calls)
+
+    return fn, calls
+
+
+def test_reads_are_retried(executor):
+    fn, calls = flaky(2)
+    assert asyncio.run(executor.run(fn, collection='c', operation='query')) == 3
+    assert executor.retries == 2
+
+
+def test_writes_are_not_retried(executor):
+    fn, calls = flaky(1)
+    with pytest.raises(ServiceUnavailable):
+        asyncio.run(executor.run(fn, collection='c', operation='set'))
+    assert len(calls) == 1 and executor.retries == 0
+
+
+def test_non_transient_errors_are_not_retried_nor_counted(executor):
+    def fn():
+        raise KeyError('absent')
+
+    with pytest.raises(KeyError):
+        asyncio.run(executor.run(fn, collection='c', operation='get'))
+    assert executor.retries == 0
+    assert executor.breaker.stats()['window_failures'] == 0
+
+
+def test_deadline_then_open_circuit(executor):
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(executor.run(time.sleep, 0.5, collection='c', operation='batch_commit'))
+    assert executor.deadline_exceeded == 1
+
+    fn, _ = flaky(100)
+    with pytest.raises(ServiceUnavailable):
+        asyncio.run(executor.run(fn, collection='c', operation='query'))
+    assert executor.breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpen):
+        asyncio.run(executor.run(lambda: 1, collection='c', operation='get'))
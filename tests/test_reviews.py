@@ -0,0 +1,89 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from firestore_executor import FirestoreExecutor
+from memory_store import InMemoryFirestore
+from profiles import ProfileService
+from reviews import RECENT_REVIEWS, ReviewService
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def db():
+    db = InMemoryFirestore()
+    db.collection('users').document('a1').set({'isAidant': True, 'displayName': 'Alice'})
+    # Avis antérieurs aux agrégats `aidant_stats`
+    for n, rating in enumerate([5, 4, 3, 5, 4, 3, 5, 4, 3, 5, 4, 2]):
+        db.collection('avis').document(f"r{n:02}").set({
+            'aidantId': 'a1', 'rating': rating, 'createdAt': START + timedelta(days=n),
+        })
+    db.collection('avis').document('other').set({'aidantId': 'a2', 'rating': 1, 'createdAt': START})
+    return db
+
+
+@pytest.fixture
+def executor():
+    executor = FirestoreExecutor(2)
+    yield executor
+    executor.shutdown()
+
+
+def test_profile_reads_avis_when_recent_reviews_are_missing(db, executor):
+    db.collection('aidant_stats').document('a1').set({'averageRating': 3.92, 'totalReviews': 12})
+    reviews = ReviewService(db, executor)
+    profile = asyncio.run(ProfileService(db, executor, reviews).get('a1'))
+    assert [avis['id'] for avis in profile['avis']] == [f"r{n:02}" for n in range(11, 1, -1)]
+    assert len(profile['avis']) == RECENT_REVIEWS
+
+
+def test_profile_reads_avis_without_aggregates(db, executor):
+    reviews = ReviewService(db, executor)
+    profile = asyncio.run(ProfileService(db, executor, reviews).get('a1'))
+    assert profile['avis'][0]['id'] == 'r11'
+    assert profile['avis'][0]['note'] == 2
+
+
+def add_review(db, executor, rating=5):
+    reviews = ReviewService(db, executor)
+    review = {'aidantId': 'a1', 'rating': rating, 'clientId': 'c1', 'serviceId': 's1',
+              'createdAt': START + timedelta(days=30)}
+    return reviews, asyncio.run(reviews.add(review))
+
+
+def test_legacy_aggregates_are_backfilled_before_the_increment(db, executor):
+    db.collection('aidant_stats').document('a1').set({
+        'averageRating': 3.92, 'totalReviews': 12, 'lastReviewAt': START + timedelta(days=11),
+    })
+    _, (_, stats, created) = add_review(db, executor)
+    assert created
+    assert (stats['ratingCount'], stats['ratingSum'], stats['averageRating']) == (13, 52, 4.0)
+    assert stats['histogram'] == {'1': 0, '2': 1, '3': 3, '4': 4, '5': 5}
+    assert stats['recentReviews'][0]['id'] == 's1_c1'
+    user = db.collection('users').document('a1').get().to_dict()
+    assert (user['averageRating'], user['totalReviews']) == (4.0, 13)
+
+
+def test_missing_aggregates_count_existing_avis(db, executor):
+    add_review(db, executor, rating=2)
+    stored = db.collection('aidant_stats').document('a1').get().to_dict()
+    assert (stored['ratingCount'], stored['ratingSum']) == (13, 49)
+    assert db.collection('users').document('a1').get().to_dict()['totalReviews'] == 13
+
+
+def test_users_aggregates_never_lose_reviews(db, executor):
+    # Avis historiques absents de `avis` : 20 avis comptés, 12 retrouvés
+    db.collection('aidant_stats').document('a1').set({'averageRating': 4.0, 'totalReviews': 20})
+    db.collection('users').document('a1').update({'averageRating': 4.0, 'totalReviews': 20})
+    _, (_, stats, _) = add_review(db, executor)
+    assert (stats['ratingCount'], stats['ratingSum']) == (21, 85.0)
+    assert db.collection('users').document('a1').get().to_dict()['totalReviews'] == 21
+
+
+def test_legacy_aggregates_are_read_in_the_current_shape(db, executor):
+    db.collection('aidant_stats').document('a1').set({'averageRating': 3.92, 'totalReviews': 12})
+    stats = asyncio.run(ReviewService(db, executor).get_stats('a1'))
+    assert (stats['aidantId'], stats['ratingCount'], stats['averageRating']) == ('a1', 12, 3.92)
+    assert len(stats['recentReviews']) == RECENT_REVIEWS
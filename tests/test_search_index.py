@@ -0,0 +1,47 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from firestore_executor import FirestoreExecutor
+from memory_store import InMemoryFirestore
+from search_index import AidantSearchIndex
+
+
+def aidant(**fields):
+    now = datetime.now(timezone.utc)
+    return {'isAidant': True, 'isVerified': True, 'secteur': 'Paris', 'createdAt': now, 'updatedAt': now, **fields}
+
+
+@pytest.fixture
+def index():
+    db = InMemoryFirestore()
+    db.collection('users').document('a1').set(aidant(displayName='Alice'))
+    executor = FirestoreExecutor(2)
+    index = AidantSearchIndex(db, executor)
+    index.changed = []
+    index.add_listener(lambda doc_id, data: index.changed.append(doc_id))
+    yield index
+    executor.shutdown()
+
+
+async def refreshes(index, count):
+    for _ in range(count):
+        await index.refresh()
+
+
+def test_unchanged_documents_are_not_reapplied(index):
+    asyncio.run(refreshes(index, 1))
+    assert index.changed == ['a1']
+    # Le recouvrement relit a1 à chaque rafraîchissement
+    asyncio.run(refreshes(index, 3))
+    assert index.changed == ['a1']
+    assert index.stats()['documents_unchanged'] >= 3
+
+
+def test_modified_document_is_reapplied(index):
+    asyncio.run(refreshes(index, 1))
+    index.db.collection('users').document('a1').set(aidant(displayName='Alice B.'))
+    asyncio.run(refreshes(index, 1))
+    assert index.changed == ['a1', 'a1']
+    assert index._results['a1']['nom'] == 'Alice B.'
@@ -0,0 +1,65 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from firestore_executor import FirestoreExecutor
+from memory_store import InMemoryFirestore
+from statistics_service import StatsEngine
+
+
+@pytest.fixture
+def engine():
+    db = InMemoryFirestore()
+    now = datetime.now(timezone.utc)
+    db.collection('users').document('u1').set({'isAidant': True, 'createdAt': now, 'updatedAt': now})
+    db.collection('transactions').document('t1').set({
+        'amount': 100, 'status': 'completed', 'type': 'final', 'createdAt': now,
+    })
+    executor = FirestoreExecutor(2)
+    yield StatsEngine(db, executor)
+    executor.shutdown()
+
+
+async def refreshes(engine, count):
+    for _ in range(count):
+        await engine.refresh()
+
+
+def test_noop_refreshes_keep_the_generation(engine):
+    asyncio.run(refreshes(engine, 1))
+    generation = engine.generation
+    # Les derniers documents sont relus (recouvrement des filigranes), sans changement
+    asyncio.run(refreshes(engine, 3))
+    assert engine.generation == generation
+    assert engine.stats()['documents_applied'] > 2
+
+
+def test_changed_document_bumps_the_generation(engine):
+    asyncio.run(refreshes(engine, 1))
+    generation = engine.generation
+    engine.db.collection('users').document('u2').set({
+        'isAidant': False, 'createdAt': datetime.now(timezone.utc), 'updatedAt': datetime.now(timezone.utc),
+    })
+    asyncio.run(refreshes(engine, 1))
+    assert engine.generation == generation + 1
+    assert engine._snapshot['totalClients'] == 1
+
+
+def test_noop_refresh_keeps_the_cached_series(engine):
+    async def scenario():
+        await engine.refresh()
+        first = await engine.get_series(6)
+        await engine.refresh()
+        second = await engine.get_series(6)
+        engine.db.collection('users').document('u2').set({
+            'isAidant': True, 'createdAt': datetime.now(timezone.utc), 'updatedAt': datetime.now(timezone.utc),
+        })
+        await engine.refresh()
+        await engine.get_series(6)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert second is first
+    # Seule la modification réelle recalcule les séries
+    assert engine.series_computations == 2
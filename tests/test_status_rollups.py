@@ -0,0 +1,119 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from firestore_executor import FirestoreExecutor
+from memory_store import InMemoryFirestore
+from repository import FirestoreStatusRepository
+from status_rollups import StatusRollups, aggregate, bucket_count, ceil_to, finest_resolution, floor_to
+
+
+@pytest.fixture
+def rollups():
+    db = InMemoryFirestore()
+    executor = FirestoreExecutor(2)
+    yield StatusRollups(db, executor, FirestoreStatusRepository(db, executor), lag=0)
+    executor.shutdown()
+
+
+def add_checks(rollups, timestamps, client_name='app'):
+    for n, timestamp in enumerate(timestamps):
+        document = {'id': f"{client_name}-{n}", 'client_name': client_name, 'timestamp': timestamp.isoformat()}
+        asyncio.run(rollups.repository.add(document))
+
+
+def test_finest_resolution_fits_max_buckets():
+    since = datetime(2024, 1, 1)
+    assert finest_resolution(since, since + timedelta(days=6), 10000) == 'minute'
+    assert finest_resolution(since, since + timedelta(days=8), 10000) == 'hour'
+    assert finest_resolution(since, since + timedelta(days=500), 10000) == 'day'
+
+
+def test_bucket_count_widens_to_bucket_edges():
+    since = datetime(2024, 1, 1, 10, 30)
+    assert bucket_count(since, since + timedelta(minutes=1), 'hour') == 1
+    assert bucket_count(since, since + timedelta(hours=1), 'hour') == 2
+    assert bucket_count(since, since + timedelta(hours=1), 'day') == 1
+
+
+def test_unaligned_until_over_several_weeks(rollups):
+    since = datetime(2024, 1, 1)
+    until = datetime(2024, 1, 29, 13, 47, 12, 345678)
+    add_checks(rollups, [since + timedelta(days=day, minutes=7) for day in range(28)])
+
+    result = asyncio.run(rollups.query(since, until, max_buckets=10000))
+
+    assert result['resolution'] == 'hour'
+    assert result['since'] == '2024-01-01T00:00:00'
+    assert result['until'] == '2024-01-29T14:00:00'
+    assert result['total'] == 28
+
+
+def test_explicit_resolution_over_max_buckets_is_rejected(rollups):
+    with pytest.raises(ValueError):
+        asyncio.run(rollups.query(datetime(2024, 1, 1), datetime(2024, 2, 1), resolution='minute', max_buckets=10000))
+
+
+def test_floor_and_ceil_to_bucket_edges():
+    value = datetime(2024, 3, 5, 14, 27, 31)
+    assert floor_to(value, 60) == datetime(2024, 3, 5, 14, 27)
+    assert floor_to(value, 86400) == datetime(2024, 3, 5)
+    assert ceil_to(value, 3600) == datetime(2024, 3, 5, 15)
+    assert ceil_to(datetime(2024, 3, 5), 86400) == datetime(2024, 3, 5)
+
+
+def test_aggregate_counts_per_resolution_and_client():
+    buckets = aggregate([
+        {'client_name': 'a', 'timestamp': '2024-01-01T10:00:10'},
+        {'client_name': 'a', 'timestamp': '2024-01-01T10:00:50'},
+        {'client_name': 'a', 'timestamp': '2024-01-01T10:30:00'},
+        {'client_name': 'b', 'timestamp': '2024-01-01T23:59:59'},
+        {'client_name': 'b'},
+    ])
+    assert buckets[('minute', 'a', '2024-01-01T10:00:00')]['count'] == 2
+    assert buckets[('hour', 'a', '2024-01-01T10:00:00')]['count'] == 3
+    assert buckets[('day', 'a', '2024-01-01T00:00:00')]['first_seen'] == '2024-01-01T10:00:10'
+    assert buckets[('day', 'a', '2024-01-01T00:00:00')]['last_seen'] == '2024-01-01T10:30:00'
+    assert buckets[('day', 'b', '2024-01-01T00:00:00')]['count'] == 1
+
+
+def test_query_joins_rollups_and_raw_at_rolled_until(rollups):
+    start = datetime(2024, 1, 1)
+    add_checks(rollups, [start + timedelta(hours=hour, minutes=5) for hour in range(10)])
+    asyncio.run(rollups.roll_up(now=start + timedelta(hours=5)))
+    assert rollups.rolled_until == '2024-01-01T05:00:00'
+    # Écrits après l'agrégation : lus depuis les documents bruts
+    add_checks(rollups, [start + timedelta(hours=7, minutes=30)], client_name='late')
+
+    result = asyncio.run(rollups.query(start, start + timedelta(hours=10), resolution='hour'))
+
+    assert result['rolled_until'] == '2024-01-01T05:00:00'
+    assert result['total'] == 11
+    assert result['raw_documents'] == 6
+    assert [bucket['count'] for bucket in result['buckets'] if bucket['client_name'] == 'app'] == [1] * 10
+    assert rollups.query_rollup_documents == 5
+
+
+def test_roll_up_is_idempotent(rollups):
+    start = datetime(2024, 1, 1)
+    add_checks(rollups, [start + timedelta(minutes=minute) for minute in range(30)])
+    now = start + timedelta(hours=1)
+    assert asyncio.run(rollups.roll_up(now=now)) == 30
+    assert asyncio.run(rollups.roll_up(now=now)) == 0
+    result = asyncio.run(rollups.query(start, now, resolution='hour'))
+    assert result['total'] == 30 and result['raw_documents'] == 0
+
+
+def test_prune_keeps_documents_not_yet_rolled_up(rollups):
+    rollups.retention = timedelta(days=1)
+    start = datetime(2024, 1, 1)
+    add_checks(rollups, [start + timedelta(days=day) for day in range(5)])
+    asyncio.run(rollups.roll_up(now=start + timedelta(days=2, hours=12)))
+
+    pruned = asyncio.run(rollups.prune(now=start + timedelta(days=10)))
+
+    # Conservés à partir du jour de rolled_until, même au-delà de la rétention
+    assert pruned == 2
+    result = asyncio.run(rollups.query(start, start + timedelta(days=5), resolution='day'))
+    assert result['total'] == 5